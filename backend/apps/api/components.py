@@ -0,0 +1,96 @@
+# /backend/apps/api/components.py
+"""
+预测组件图数据（趋势、周季节性、外部特征影响等）的计算。
+
+这部分依赖 pandas、Prophet 和 matplotlib，只在请求组件数据时由 views 延迟导入，
+其余只读取数据库的接口不需要为此付出导入耗时和常驻内存。
+"""
+
+import pandas as pd
+
+from apps.market_data.timeseries import load_price_frame
+from apps.ml_predictions.engines import load_cached_engine
+from apps.ml_predictions.feature_store import load_btc_features
+
+
+class ComponentsError(Exception):
+    """无法生成组件数据，status 为应返回的 HTTP 状态码。"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def build_forecast_components(model_record, currency_id):
+    """为指定的模型运行生成组件图数据，返回 {组件名: {dates, values, lower_bound, upper_bound}}。"""
+    # 1. 加载指定货币的最新模型
+    engine = load_cached_engine(model_record.model_file_path)
+    if not engine.supports_components:
+        raise ComponentsError(f"{engine.name} 引擎不支持组件分解", 400)
+    model = engine.model
+
+    # 2. 获取该货币的历史数据用于预测
+    currency = model_record.currency
+    df = load_price_frame(currency.id)
+
+    if len(df) < 30:
+        raise ComponentsError("历史数据不足", 400)
+
+    # 为多变量模型准备比特币特征数据（读取共享的比特币特征文件）
+    use_btc_feature = "btc_price" in model.extra_regressors and currency_id != "bitcoin"
+    if use_btc_feature:
+        try:
+            df_btc_hist, df_btc_pred = load_btc_features()
+        except Exception as e:
+            print(f"添加比特币特征到未来数据失败: {e}")
+            raise ComponentsError("无法获取比特币预测数据", 500)
+
+        df = pd.merge(df, df_btc_hist, on="ds", how="left").dropna()
+
+    # 创建未来数据帧（预测未来3天）
+    future_df = model.make_future_dataframe(periods=3)
+
+    # 为预测添加比特币特征：make_future_dataframe 覆盖整个训练窗口，历史部分与训练时一样
+    # 使用比特币真实价格，之后的日期使用比特币预测（ML_PREDICT_HISTORY=False 时预测只覆盖最近几天）
+    if use_btc_feature:
+        df_btc = pd.concat([df_btc_hist, df_btc_pred]).drop_duplicates(
+            "ds", keep="first"
+        )
+        future_df = pd.merge(future_df, df_btc, on="ds", how="left")
+        future_df["btc_price"] = future_df["btc_price"].ffill().bfill()
+
+    forecast = model.predict(future_df)
+
+    # 3. 生成组件图的figure对象
+    fig = model.plot_components(forecast)
+
+    # 4. 从figure对象中提取数据
+    components_data = {}
+    for i, ax in enumerate(fig.axes):
+        component_name = ax.get_title()
+        if not component_name:
+            continue
+
+        # 提取线条数据 (预测值)
+        line = ax.lines[0]
+        dates = [d.strftime("%Y-%m-%d") for d in line.get_xdata()]
+        values = line.get_ydata().tolist()
+
+        # 提取置信区间数据 (填充区域)，模型未做不确定性采样时没有填充区域
+        if ax.collections:
+            collection = ax.collections[0]
+            path = collection.get_paths()[0]
+            vertices = path.vertices
+            lower_bound = vertices[: len(values), 1].tolist()
+            upper_bound = vertices[len(values) :, 1][::-1].tolist()
+        else:
+            lower_bound = upper_bound = values
+
+        components_data[component_name] = {
+            "dates": dates,
+            "values": values,
+            "lower_bound": lower_bound,
+            "upper_bound": upper_bound,
+        }
+
+    return components_data
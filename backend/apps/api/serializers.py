@@ -1,3 +1,6 @@
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
 from rest_framework import serializers
 from apps.market_data.models import Currency
 from djmoney.money import Money
@@ -60,3 +63,71 @@ class PricePredictionSerializer(serializers.ModelSerializer):
             "prediction_lower_bound",
             "prediction_upper_bound",
         ]
+
+
+class PricePredictionValuesSerializer:
+    """
+    预测数据的快速序列化器。
+
+    价格列在数据库中直接转换为浮点数，再读取 values_list 元组一次遍历输出，
+    不经过 ModelSerializer 的字段处理、Decimal / Money 对象构造和十进制字符串格式化。
+    layout="rows" 输出与 PricePredictionSerializer 相同结构的对象列表（价格为数字），
+    layout="columns" 输出 {字段名: 数组} 形式的按列数据，体积更小。
+
+    指定 limit 时只输出前 limit 行，如果还有更多数据，读取 data 后 next 为最后一行的时间
+    （下一页的游标）；last_time 是输出的最后一行的时间（datetime），流式响应按它逐批读取。
+    """
+
+    fields = (
+        "time",
+        "predicted_price",
+        "prediction_lower_bound",
+        "prediction_upper_bound",
+    )
+    layouts = ("rows", "columns")
+
+    def __init__(self, queryset, layout="rows", limit=None):
+        if layout not in self.layouts:
+            raise ValueError(f"不支持的数据布局: {layout}")
+        self.queryset = queryset
+        self.layout = layout
+        self.limit = limit
+        self.next = None
+        self.last_time = None
+
+    def _values(self):
+        """逐行产出 (时间字符串, 预测值, 下界, 上界)。"""
+        tz = timezone.get_current_timezone()
+        prices = {
+            f"{field}_float": Cast(field, FloatField()) for field in self.fields[1:]
+        }
+        rows = self.queryset.annotate(**prices).values_list("time", *prices)
+        if self.limit is not None:
+            # 多取一行用于判断是否还有下一页
+            rows = rows[: self.limit + 1]
+
+        text = None
+        for count, (time, price, low, high) in enumerate(rows):
+            if count == self.limit:
+                self.next = text
+                break
+            self.last_time = time
+            # 与 DRF 的 DateTimeField 输出一致：转换到当前时区，UTC 以 Z 结尾
+            text = time.astimezone(tz).isoformat()
+            if text.endswith("+00:00"):
+                text = text[:-6] + "Z"
+            yield text, price, low, high
+
+    @property
+    def data(self):
+        columns = tuple([] for _ in self.fields)
+        times, predicted, lower, upper = columns
+        for time, price, low, high in self._values():
+            times.append(time)
+            predicted.append(price)
+            lower.append(low)
+            upper.append(high)
+
+        if self.layout == "columns":
+            return dict(zip(self.fields, columns))
+        return [dict(zip(self.fields, row)) for row in zip(*columns)]
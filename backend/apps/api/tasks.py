@@ -0,0 +1,46 @@
+import time
+
+from celery import shared_task
+from django.conf import settings
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+# 预热时请求的接口：(路由名, 查询参数)
+WARMUP_REQUESTS = (
+    ("api:forecasts-list", {"include_historical": "true"}),
+    ("api:forecasts-list", {"include_historical": "false"}),
+)
+COMPONENTS_REQUEST = ("api:forecastcomponents-list", {})
+
+
+@shared_task(rate_limit=settings.CACHE_WARMUP_RATE_LIMIT)
+def warm_forecast_cache_task(coingecko_id, components=True):
+    """
+    新模型激活后预先生成并缓存该货币的预测接口响应（两种 include_historical）
+    以及组件图数据，第一个打开页面的用户不再承担冷启动的计算开销。
+
+    直接调用接口视图，缓存键和缓存内容与线上请求完全一致。
+    任务在 analytics 队列中按 CACHE_WARMUP_RATE_LIMIT 限速执行，不与训练争抢资源。
+    """
+    requests = list(WARMUP_REQUESTS)
+    if components:
+        requests.append(COMPONENTS_REQUEST)
+
+    factory = RequestFactory()
+    results = []
+    for route, params in requests:
+        path = reverse(route)
+        request = factory.get(path, {"currency_id": coingecko_id, **params})
+        started = time.perf_counter()
+        try:
+            response = resolve(path).func(request)
+        except Exception as e:
+            print(f"🛑 预热 {coingecko_id} 的 {path} 失败: {e}")
+            continue
+        results.append(
+            f"{request.get_full_path()} {response.status_code} "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+
+    print(f"🔥 {coingecko_id} 接口缓存已预热: {', '.join(results)}")
+    return results
@@ -1,3 +1,351 @@
-from django.test import TestCase
+import asyncio
+import functools
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.api import upstream, views
+from apps.market_data import caching
+from apps.market_data.models import (
+    Currency,
+    MarketData,
+    PredictionModel,
+    PricePrediction,
+)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ForecastQueryBudgetTests(TestCase):
+    """预测接口每次请求的数据库查询次数。"""
+
+    url = "/api/forecasts/"
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create 不触发 post_save，避免为新货币派发训练任务
+        (cls.currency,) = Currency.objects.bulk_create(
+            [Currency(coingecko_id="bitcoin", symbol="btc", name="Bitcoin")]
+        )
+        cls.model_run = PredictionModel.objects.create(
+            currency=cls.currency, model_file_path="unused", version=1
+        )
+        now = timezone.now()
+        PricePrediction.objects.bulk_create(
+            [
+                PricePrediction(
+                    time=now + timedelta(days=offset),
+                    predicted_price=Decimal("100"),
+                    prediction_lower_bound=Decimal("90"),
+                    prediction_upper_bound=Decimal("110"),
+                    model_run=cls.model_run,
+                    currency=cls.currency,
+                )
+                for offset in range(-5, 3)
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+        caching.local_cache.clear()
+
+    def test_cache_miss_runs_one_lookup_and_one_scan(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.url, {"currency_id": "bitcoin", "include_historical": "true"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 8)
+
+    def test_cache_hit_runs_no_queries(self):
+        params = {"currency_id": "bitcoin", "include_historical": "false"}
+        first = self.client.get(self.url, params)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, params)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(len(second.json()), 2)
+
+    def test_activation_invalidates_cached_forecast(self):
+        params = {"currency_id": "bitcoin", "include_historical": "true"}
+        self.client.get(self.url, params)
+
+        PredictionModel.objects.create(
+            currency=self.currency, model_file_path="unused", version=2
+        )
+        caching.invalidate(caching.FORECASTS, "bitcoin")
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.json(), [])
+
+    def test_columns_layout_returns_float_arrays(self):
+        response = self.client.get(
+            self.url,
+            {
+                "currency_id": "bitcoin",
+                "include_historical": "true",
+                "layout": "columns",
+            },
+        )
+        data = response.json()
+        self.assertEqual(len(data["time"]), 8)
+        self.assertEqual(data["predicted_price"][0], 100.0)
+        self.assertEqual(data["prediction_upper_bound"][0], 110.0)
+        self.assertTrue(data["time"][0].endswith("Z"))
+
+    def test_unknown_currency_returns_404(self):
+        response = self.client.get(self.url, {"currency_id": "unknown"})
+        self.assertEqual(response.status_code, 404)
+
+
+def _ms(value):
+    return str(int(value.timestamp() * 1000))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class DeltaSyncTests(TestCase):
+    """since= 增量同步只返回游标之后写入或更新的行。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.currency,) = Currency.objects.bulk_create(
+            [Currency(coingecko_id="bitcoin", symbol="btc", name="Bitcoin")]
+        )
+        cls.model_run = PredictionModel.objects.create(
+            currency=cls.currency, model_file_path="unused", version=3
+        )
+        now = timezone.now()
+        MarketData.objects.bulk_create(
+            [
+                MarketData(
+                    time=now - timedelta(days=offset),
+                    currency=cls.currency,
+                    open=Decimal("100"),
+                    high=Decimal("100"),
+                    low=Decimal("100"),
+                    close=Decimal("100"),
+                    volume=Decimal("1"),
+                )
+                for offset in range(3)
+            ]
+        )
+        PricePrediction.objects.bulk_create(
+            [
+                PricePrediction(
+                    time=now + timedelta(days=offset),
+                    predicted_price=Decimal("100"),
+                    prediction_lower_bound=Decimal("90"),
+                    prediction_upper_bound=Decimal("110"),
+                    model_run=cls.model_run,
+                    currency=cls.currency,
+                )
+                for offset in range(-2, 3)
+            ]
+        )
+        # 除最新的一行外，其余行都是一小时前写入的
+        cls.synced_at = now - timedelta(minutes=30)
+        hour_ago = now - timedelta(hours=1)
+        MarketData.objects.exclude(time=now).update(updated_at=hour_ago)
+        PricePrediction.objects.exclude(time=now + timedelta(days=2)).update(
+            updated_at=hour_ago
+        )
+
+    def setUp(self):
+        cache.clear()
+        caching.local_cache.clear()
+
+    def test_market_data_returns_rows_written_after_cursor(self):
+        response = self.client.get(
+            "/api/market_data/",
+            {"currency_id": "bitcoin", "since": _ms(self.synced_at)},
+        )
+        body = response.json()
+        self.assertEqual(len(body["data"]), 1)
+        self.assertGreater(body["cursor"], int(_ms(self.synced_at)))
+
+        full = self.client.get(
+            "/api/market_data/", {"currency_id": "bitcoin", "since": "0"}
+        )
+        self.assertEqual(len(full.json()["data"]), 3)
+
+    def test_forecasts_return_rows_written_after_cursor(self):
+        params = {"currency_id": "bitcoin", "include_historical": "true"}
+        response = self.client.get(
+            "/api/forecasts/", {**params, "since": f"v3:{_ms(self.synced_at)}"}
+        )
+        body = response.json()
+        self.assertEqual(len(body["results"]), 1)
+        self.assertFalse(body["replace"])
+        self.assertTrue(body["cursor"].startswith("v3:"))
+
+    def test_forecasts_replace_after_new_version(self):
+        response = self.client.get(
+            "/api/forecasts/",
+            {
+                "currency_id": "bitcoin",
+                "include_historical": "true",
+                "since": f"v2:{_ms(self.synced_at)}",
+            },
+        )
+        body = response.json()
+        self.assertTrue(body["replace"])
+        self.assertEqual(body["version"], 3)
+        self.assertEqual(len(body["results"]), 5)
+
+    def test_since_cannot_be_combined_with_paging(self):
+        response = self.client.get(
+            "/api/market_data/", {"currency_id": "bitcoin", "since": "0", "limit": 10}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_out_of_range_cursor_returns_400(self):
+        for name in ("since", "after"):
+            response = self.client.get(
+                "/api/market_data/",
+                {"currency_id": "bitcoin", name: "99999999999999999999"},
+            )
+            self.assertEqual(response.status_code, 400)
+
+
+class AsgiStreamingTests(TestCase):
+    """ASGI 下的流式响应逐批查询和发送，不先把全部数据读入内存。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        (currency,) = Currency.objects.bulk_create(
+            [Currency(coingecko_id="bitcoin", symbol="btc", name="Bitcoin")]
+        )
+        start = timezone.now() - timedelta(days=30)
+        MarketData.objects.bulk_create(
+            [
+                MarketData(
+                    time=start + timedelta(days=offset),
+                    currency=currency,
+                    open=Decimal("100"),
+                    high=Decimal("100"),
+                    low=Decimal("100"),
+                    close=Decimal("100"),
+                    volume=Decimal("1"),
+                )
+                for offset in range(7)
+            ]
+        )
+
+    async def _get(self, path, query_string, on_body):
+        """通过 ASGIHandler 发出一个 GET 请求，每收到一块响应体调用一次 on_body。"""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "root_path": "",
+            "query_string": query_string,
+            "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 12345),
+            "server": ("testserver", 80),
+        }
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # 客户端一直保持连接
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                on_body(message["body"])
+
+        await ASGIHandler()(scope, receive, send)
+
+    async def test_stream_sends_first_batch_before_reading_the_rest(self):
+        formatted = []
+        first_chunk_at = []
+        body = []
+
+        def on_body(chunk):
+            body.append(chunk)
+            if not first_chunk_at:
+                first_chunk_at.append(len(formatted))
+
+        def format_row(item):
+            formatted.append(item)
+            return original_format(item)
+
+        original_format = views._format_market_row
+        # 请求结束时 ASGIHandler 会关闭连接，测试事务中不能这样做
+        request_finished.disconnect(close_old_connections)
+        try:
+            with mock.patch.object(views, "STREAM_CHUNK_ROWS", 2), mock.patch.object(
+                views, "_format_market_row", format_row
+            ):
+                await self._get(
+                    "/api/market_data/",
+                    b"currency_id=bitcoin&stream=ndjson",
+                    on_body,
+                )
+        finally:
+            request_finished.connect(close_old_connections)
+
+        self.assertEqual(first_chunk_at, [2])
+        self.assertEqual(len(formatted), 7)
+        self.assertEqual(b"".join(body).count(b"\n"), 7)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class UpstreamClientTests(TestCase):
+    """WSGI 下的上游请求复用进程内共用的同步客户端，不为每个请求创建 AsyncClient。"""
+
+    def setUp(self):
+        cache.clear()
+        caching.local_cache.clear()
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(
+                200, json=[{"name": "Bitcoin", "current_price": 1, "market_cap": 2}]
+            )
+
+        upstream._sync_client = None
+        client_class = mock.Mock(
+            side_effect=functools.partial(
+                httpx.Client, transport=httpx.MockTransport(handler)
+            )
+        )
+        for name, value in (("Client", client_class), ("AsyncClient", mock.Mock())):
+            patcher = mock.patch.object(upstream.httpx, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: upstream._sync_client.close())
+
+    def test_wsgi_requests_share_one_sync_client(self):
+        metrics = self.client.get("/api/metrics/bitcoin/")
+        share = self.client.get("/api/market_share/")
+
+        self.assertEqual(metrics.status_code, 200)
+        self.assertEqual(metrics.json()["current_price"], 1)
+        self.assertEqual(share.json(), [{"value": 2, "name": "Bitcoin"}])
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[0].url.params["ids"], "bitcoin")
+        upstream.httpx.Client.assert_called_once()
+        upstream.httpx.AsyncClient.assert_not_called()
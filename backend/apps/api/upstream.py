@@ -0,0 +1,71 @@
+# /backend/apps/api/upstream.py
+"""
+调用 CoinGecko 等上游接口的 HTTP 客户端。
+
+ASGI worker（uvicorn）中每个进程只有一个长期运行的事件循环，每个事件循环共用一个
+带连接池和超时的 httpx.AsyncClient，所有请求复用同一组保持连接，等待上游响应时不占用 worker。
+
+WSGI（config/wsgi.py）下 Django 用 async_to_sync 为每个请求新建并在结束时关闭一个事件循环，
+按事件循环缓存的 AsyncClient 每次都要重建且不会被关闭。此时改用进程内共用的同步
+httpx.Client：阻塞的只是该请求自己的临时事件循环，连接池同样跨请求复用。
+"""
+
+import asyncio
+import threading
+import weakref
+
+import httpx
+from django.conf import settings
+
+# {事件循环: AsyncClient}，事件循环结束后对应的客户端随之释放
+_clients = weakref.WeakKeyDictionary()
+# WSGI 下所有线程共用的同步客户端
+_sync_client = None
+_sync_client_lock = threading.Lock()
+
+
+def _client_options():
+    return {
+        "base_url": settings.COINGECKO_API_URL,
+        "timeout": httpx.Timeout(
+            settings.UPSTREAM_TIMEOUT, connect=settings.UPSTREAM_CONNECT_TIMEOUT
+        ),
+        "limits": httpx.Limits(
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+        ),
+    }
+
+
+def get_client():
+    """返回当前事件循环共用的 AsyncClient。"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**_client_options())
+        _clients[loop] = client
+    return client
+
+
+def get_sync_client():
+    """返回进程内共用的同步 Client（httpx.Client 可在多个线程中同时使用）。"""
+    global _sync_client
+    with _sync_client_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_client_options())
+        return _sync_client
+
+
+async def fetch_markets(*, asgi=True, **params):
+    """
+    请求 CoinGecko 的 /coins/markets 接口（以美元计价），返回解析后的 JSON。
+    asgi 为 False 时（WSGI 请求）使用共用的同步客户端。
+    超时、连接失败和非 2xx 响应都会抛出 httpx.HTTPError。
+    """
+    params = {"vs_currency": "usd", **params}
+    if asgi:
+        response = await get_client().get("/coins/markets", params=params)
+    else:
+        response = get_sync_client().get("/coins/markets", params=params)
+    response.raise_for_status()
+    return response.json()
@@ -3,8 +3,9 @@ from django.urls import path
 from .views import (
     CurrencyListView,
     MarketDataViewSet,
-    CurrencyMetricsView,
-    MarketShareView,
+    currency_metrics_view,
+    market_share_view,
+    events_view,
     ForecastViewSet,
     ForecastComponentsView,
 )
@@ -23,13 +24,13 @@ urlpatterns = [
     # /api/metrics/<id>/
     path(
         "metrics/<str:pk>/",
-        CurrencyMetricsView.as_view({"get": "retrieve"}),
+        currency_metrics_view,
         name="metrics-detail",
     ),
     # /api/market_share/
     path(
         "market_share/",
-        MarketShareView.as_view({"get": "list"}),
+        market_share_view,
         name="marketshare-list",
     ),
     # /api/forecasts/
@@ -40,4 +41,6 @@ urlpatterns = [
         ForecastComponentsView.as_view({"get": "list"}),
         name="forecastcomponents-list",
     ),
+    # /api/events/ (SSE)
+    path("events/", events_view, name="events"),
 ]
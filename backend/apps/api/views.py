@@ -1,19 +1,28 @@
 # # /backend/apps/api/views.py
 
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from datetime import datetime
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
 from django.utils import timezone
-from django.core.cache import cache
-import requests
+from django.views.decorators.http import require_GET
+import httpx
 
 # --- Django REST Framework Imports ---
 from rest_framework import viewsets, generics
 from rest_framework.response import Response
 from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 
 # --- Database Function and Model Imports ---
 from django.db.models import Min, Max, Sum, F
 from .db_functions import TimeBucket, First, Last
+from . import upstream
+from apps.market_data import caching, events
 from apps.market_data.models import (
     MarketData,
     Currency,
@@ -21,11 +30,167 @@ from apps.market_data.models import (
     PricePrediction,
 )
 
-import joblib
-import pandas as pd
-
 # --- Serializer Imports ---
-from .serializers import CurrencySerializer, PricePredictionSerializer
+from .serializers import (
+    CurrencySerializer,
+    PricePredictionSerializer,
+    PricePredictionValuesSerializer,
+)
+
+
+def _json_bytes(data):
+    """按 DRF 默认的 JSON 格式把响应数据编码为字节串，缓存中保存的就是这个结果。"""
+    return JSONRenderer().render(data)
+
+
+def _cached_response(body):
+    """直接以缓存的字节串作为响应体，不再反序列化和重新编码。"""
+    return HttpResponse(body, content_type="application/json")
+
+
+# 分页参数 limit 的上限
+MAX_PAGE_SIZE = 10000
+# 流式响应的格式，以及每次编码输出的行数
+STREAM_FORMATS = ("json", "ndjson")
+STREAM_CHUNK_ROWS = 1000
+
+
+def _parse_cursor(value):
+    """把游标（毫秒时间戳或 ISO 时间）解析为带时区的 datetime。"""
+    try:
+        if value.isdigit():
+            cursor = datetime.fromtimestamp(int(value) / 1000, tz=dt_timezone.utc)
+        else:
+            cursor = datetime.fromisoformat(value)
+    except (ValueError, OverflowError, OSError):
+        # 超出范围的时间戳会抛出 OverflowError / OSError
+        raise ParseError(f"无效的游标: {value}")
+    if timezone.is_naive(cursor):
+        cursor = timezone.make_aware(cursor)
+    return cursor
+
+
+def _since_params(request):
+    """
+    解析增量同步参数 since，返回 (since, version)，没有 since 时返回 (None, None)。
+
+    since 是上一次响应返回的 cursor，形如 "<毫秒时间戳>" 或 "v<模型版本>:<毫秒时间戳>"
+    （预测接口的游标带模型版本），也可以直接传毫秒时间戳或 ISO 时间。
+    增量同步不能与分页或流式参数同时使用。
+    """
+    since = request.query_params.get("since")
+    if not since:
+        return None, None
+    if any(request.query_params.get(name) for name in ("after", "limit", "stream")):
+        raise ParseError("since 不能与 after、limit、stream 同时使用")
+
+    version = None
+    if since.startswith("v") and ":" in since:
+        version, since = since[1:].split(":", 1)
+        if not version.isdigit():
+            raise ParseError(f"无效的游标: v{version}:{since}")
+        version = int(version)
+    return _parse_cursor(since), version
+
+
+def _next_since(since):
+    """
+    返回本次增量同步之后的新游标（毫秒时间戳）。
+
+    updated_at 由写入方的时钟在提交前生成，提交较晚的行可能带着较早的时间，
+    因此游标只推进到当前时间之前 DELTA_SYNC_LAG_SECONDS 秒：这段时间内的行下次会再返回一次，
+    客户端按时间戳覆盖即可，不会漏掉数据。
+    """
+    cursor = timezone.now() - timedelta(seconds=settings.DELTA_SYNC_LAG_SECONDS)
+    if since is not None:
+        cursor = max(cursor, since)
+    return int(cursor.timestamp() * 1000)
+
+
+def _page_params(request):
+    """
+    解析分页和流式参数，返回 (after, limit, stream)。
+    after 是上一页返回的 next 游标（ISO 时间或毫秒时间戳），只返回该时间之后的数据。
+    """
+    after = request.query_params.get("after")
+    limit = request.query_params.get("limit")
+    stream = request.query_params.get("stream")
+
+    after = _parse_cursor(after) if after else None
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ParseError(f"无效的 limit: {limit}")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ParseError(f"limit 必须在 1 到 {MAX_PAGE_SIZE} 之间")
+
+    if stream is not None:
+        if stream not in STREAM_FORMATS:
+            raise ParseError(f"不支持的流式格式: {stream}")
+        if limit is not None:
+            raise ParseError("stream 与 limit 不能同时使用")
+
+    return after, limit, stream
+
+
+def _stream_response(request, fetch_batch, stream, prefix=b"[", suffix=b"]"):
+    """
+    按时间键集逐批读取并编码后流式返回，内存占用与数据范围无关。
+    fetch_batch(after) 返回 time 在 after 之后（after 为 None 时从头开始）的至多
+    STREAM_CHUNK_ROWS 行以及其中最后一行的时间；每批是一次独立的查询，不占用数据库游标。
+    json 格式输出 prefix + 逗号分隔的行 + suffix，ndjson 格式每行一个 JSON 对象。
+
+    ASGI 下 StreamingHttpResponse 会把同步迭代器一次性读成列表再发送，
+    因此 ASGI 请求使用异步生成器，每批通过 sync_to_async 查询。
+    """
+
+    def encode(batch, first):
+        if stream == "ndjson":
+            return "".join(
+                json.dumps(row, separators=(",", ":"), ensure_ascii=False) + "\n"
+                for row in batch
+            ).encode("utf-8")
+        body = _json_bytes(batch)[1:-1]
+        return body if first else b"," + body
+
+    def chunks():
+        if stream == "json":
+            yield prefix
+        after = None
+        first = True
+        while True:
+            batch, after = fetch_batch(after)
+            if batch:
+                yield encode(batch, first)
+                first = False
+            if len(batch) < STREAM_CHUNK_ROWS:
+                break
+        if stream == "json":
+            yield suffix
+
+    async def achunks():
+        if stream == "json":
+            yield prefix
+        after = None
+        first = True
+        while True:
+            batch, after = await sync_to_async(fetch_batch)(after)
+            if batch:
+                yield encode(batch, first)
+                first = False
+            if len(batch) < STREAM_CHUNK_ROWS:
+                break
+        if stream == "json":
+            yield suffix
+
+    is_asgi = isinstance(getattr(request, "_request", request), ASGIRequest)
+    content_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+    return StreamingHttpResponse(
+        achunks() if is_asgi else chunks(), content_type=content_type
+    )
+
 
 # --- 视图类定义 ---
 
@@ -39,9 +204,48 @@ class CurrencyListView(generics.ListAPIView):
     serializer_class = CurrencySerializer
 
 
+def _format_market_row(item):
+    """把一条行情记录格式化为前端K线图使用的数组。"""
+    timestamp = int(item.time.timestamp() * 1000)
+    return [
+        timestamp,
+        float(item.open.amount),
+        float(item.close.amount),
+        float(item.low.amount),
+        float(item.high.amount),
+        float(item.volume or 0),
+        float(item.ma_7d) if item.ma_7d is not None else None,
+        float(item.ma_30d) if item.ma_30d is not None else None,
+        float(item.rsi) if item.rsi is not None else None,
+        float(item.macd_line) if item.macd_line is not None else None,
+        float(item.macd_signal) if item.macd_signal is not None else None,
+        float(item.macd_hist) if item.macd_hist is not None else None,
+    ]
+
+
+def _format_market_rows(queryset):
+    """格式化行情记录，返回 (行列表, 最后一行的时间)。"""
+    formatted_data = []
+    last_time = None
+    for item in queryset:
+        formatted_data.append(_format_market_row(item))
+        last_time = item.time
+    return formatted_data, last_time
+
+
 class MarketDataViewSet(viewsets.ViewSet):
     """
     一个用于获取历史市场数据的ViewSet (已修正)。
+
+    响应按 (货币, 起止日期, 周期, 格式) 缓存为编码好的字节串，数据获取任务写入新数据后
+    会使该货币的缓存失效。缓存值的第一行是其中最后一根K线的时间；
+    没有 end_date 的请求（截至当前）在缓存之外再查询这个时间之后的少量新数据拼接返回。
+
+    大范围数据可以分页（after=上一页的 next 游标、limit=每页行数）或流式返回
+    （stream=json / ndjson），这两种请求不经过缓存。
+
+    已经持有历史数据的客户端可以用 since=上一次返回的 cursor 增量同步，
+    只返回之后写入或更新的K线：{"data": ..., "cursor": ...}；首次可以传 since=0。
     """
 
     def list(self, request, *args, **kwargs):
@@ -65,212 +269,336 @@ class MarketDataViewSet(viewsets.ViewSet):
             aware_end_date = timezone.make_aware(naive_end_date)
             queryset = queryset.filter(time__lte=aware_end_date)
 
+        since, _ = _since_params(request)
+        if since is not None:
+            # 只返回 since 之后写入或更新的K线，以及下一次同步使用的游标
+            cursor = _next_since(since)
+            formatted_data, _ = _format_market_rows(
+                queryset.filter(updated_at__gt=since)
+            )
+            return Response({"data": formatted_data, "cursor": cursor})
+
+        after, limit, stream = _page_params(request)
+        if after is not None:
+            queryset = queryset.filter(time__gt=after)
+        if stream:
+
+            def fetch_batch(batch_after):
+                batch = queryset
+                if batch_after is not None:
+                    batch = batch.filter(time__gt=batch_after)
+                return _format_market_rows(batch[:STREAM_CHUNK_ROWS])
+
+            return _stream_response(
+                request, fetch_batch, stream, prefix=b'{"data":[', suffix=b"]}"
+            )
+        if after is not None or limit is not None:
+            page = list(queryset[: limit + 1] if limit else queryset)
+            has_more = limit is not None and len(page) > limit
+            formatted_data, _ = _format_market_rows(page[:limit])
+            next_cursor = formatted_data[-1][0] if has_more else None
+            return Response({"data": formatted_data, "next": next_cursor})
+
         # 直接返回日线数据
+        cache_parts = (
+            start_date_str or "-",
+            end_date_str or "-",
+            request.query_params.get("interval", "1d"),
+            request.query_params.get("format", "json"),
+        )
+        cached_data = caching.get(
+            caching.MARKET_DATA, currency_coingecko_id, *cache_parts
+        )
+        if cached_data is not None:
+            header, rows = cached_data.split(b"\n", 1)
+            if not end_date_str:
+                # 只查询缓存之后新写入的K线
+                if header:
+                    cutoff = datetime.fromisoformat(header.decode())
+                    queryset = queryset.filter(time__gt=cutoff)
+                tail, _ = _format_market_rows(queryset)
+                if tail:
+                    tail_rows = _json_bytes(tail)[1:-1]
+                    rows = rows + b"," + tail_rows if rows else tail_rows
+            return _cached_response(b'{"data":[' + rows + b"]}")
 
         # 5. 格式化结果
-        formatted_data = []
-        for item in queryset:
-            timestamp = int(item.time.timestamp() * 1000)
-            formatted_data.append(
-                [
-                    timestamp,
-                    float(item.open.amount),
-                    float(item.close.amount),
-                    float(item.low.amount),
-                    float(item.high.amount),
-                    float(item.volume or 0),
-                    float(item.ma_7d) if item.ma_7d is not None else None,
-                    float(item.ma_30d) if item.ma_30d is not None else None,
-                    float(item.rsi) if item.rsi is not None else None,
-                    float(item.macd_line) if item.macd_line is not None else None,
-                    float(item.macd_signal) if item.macd_signal is not None else None,
-                    float(item.macd_hist) if item.macd_hist is not None else None,
-                ]
-            )
+        formatted_data, last_time = _format_market_rows(queryset)
+        rows = _json_bytes(formatted_data)[1:-1]
+        header = last_time.isoformat().encode() if last_time else b""
+        caching.set(
+            caching.MARKET_DATA,
+            currency_coingecko_id,
+            *cache_parts,
+            value=header + b"\n" + rows,
+            timeout=3600,
+        )
+        return _cached_response(b'{"data":[' + rows + b"]}")
 
-        return Response({"data": formatted_data})
 
+def _error_response(message, status):
+    return JsonResponse(
+        {"error": message}, status=status, json_dumps_params={"ensure_ascii": False}
+    )
 
-class CurrencyMetricsView(viewsets.ViewSet):
+
+# 以下两个接口只读缓存或请求 CoinGecko，写成异步视图：在 ASGI worker 下
+# 等待上游响应时不占用 worker，上游请求通过共用的 httpx 连接池发出
+# （WSGI 下每个请求的事件循环都是临时的，改用共用的同步客户端，见 upstream.py）。
+# 中间件链是全异步的（WhiteNoise 不在其中，见 settings.MIDDLEWARE），视图在事件循环中运行；
+# 但 Django 5.0 为每个 ASGI 请求创建一个 ThreadSensitiveContext，request_started 的同步接收者
+# 会让每个进行中的请求（包括长连接的 SSE）各保留一个空闲线程，直到请求结束。
+
+
+@require_GET
+async def currency_metrics_view(request, pk):
     """
     提供单个货币的最新市场指标。
     """
+    currency_coingecko_id = pk
+    cached_data = await caching.aget(caching.METRICS, currency_coingecko_id, "latest")
+    if cached_data is not None:
+        return _cached_response(cached_data)
+
+    try:
+        data = await upstream.fetch_markets(
+            asgi=isinstance(request, ASGIRequest), ids=currency_coingecko_id
+        )
+    except httpx.HTTPError as e:
+        return _error_response(f"请求外部API失败: {e!r}", 502)
+
+    if not data:
+        return _error_response("未找到该货币的数据", 404)
+
+    metrics = data[0]
+    formatted_data = {
+        "current_price": metrics.get("current_price"),
+        "market_cap": metrics.get("market_cap"),
+        "volume_24h": metrics.get("total_volume"),  # 添加24小时交易量
+        "high_24h": metrics.get("high_24h"),
+        "low_24h": metrics.get("low_24h"),
+        "price_change_percentage_24h": metrics.get("price_change_percentage_24h"),
+        "last_updated": metrics.get("last_updated"),
+    }
+
+    body = _json_bytes(formatted_data)
+    await caching.aset(
+        caching.METRICS, currency_coingecko_id, "latest", value=body, timeout=60
+    )
+    return _cached_response(body)
+
+
+@require_GET
+async def market_share_view(request):
+    """
+    提供市值排名前10的加密货币数据，用于饼图。
+    """
+    cached_data = await caching.aget(caching.MARKET_SHARE, "all", "top10")
+    if cached_data is not None:
+        return _cached_response(cached_data)
+
+    try:
+        data = await upstream.fetch_markets(
+            asgi=isinstance(request, ASGIRequest),
+            order="market_cap_desc",
+            per_page=10,
+            page=1,
+        )
+    except httpx.HTTPError as e:
+        return _error_response(f"请求外部API失败: {e!r}", 502)
 
-    def retrieve(self, request, pk=None):
-        currency_coingecko_id = pk
-        cache_key = f"metrics_{currency_coingecko_id}"
+    formatted_data = [
+        {"value": item.get("market_cap"), "name": item.get("name")} for item in data
+    ]
 
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
+    body = _json_bytes(formatted_data)
+    await caching.aset(caching.MARKET_SHARE, "all", "top10", value=body, timeout=300)
+    return _cached_response(body)
 
-        try:
-            url = "https://api.coingecko.com/api/v3/coins/markets"
-            params = {
-                "vs_currency": "usd",
-                "ids": currency_coingecko_id,
-            }
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if not data:
-                return Response({"error": "未找到该货币的数据"}, status=404)
-
-            metrics = data[0]
-            formatted_data = {
-                "current_price": metrics.get("current_price"),
-                "market_cap": metrics.get("market_cap"),
-                "volume_24h": metrics.get("total_volume"),  # 添加24小时交易量
-                "high_24h": metrics.get("high_24h"),
-                "low_24h": metrics.get("low_24h"),
-                "price_change_percentage_24h": metrics.get(
-                    "price_change_percentage_24h"
-                ),
-                "last_updated": metrics.get("last_updated"),
-            }
-
-            cache.set(cache_key, formatted_data, 60)
-
-            return Response(formatted_data)
-        except requests.exceptions.RequestException as e:
-            return Response({"error": f"请求外部API失败: {e}"}, status=502)
-
-
-class MarketShareView(viewsets.ViewSet):
+
+@require_GET
+async def events_view(request):
     """
-    提供市值排名前10的加密货币数据，用于饼图。
+    以 Server-Sent Events 推送新K线和新预测版本的增量事件（格式见 apps/market_data/events.py）。
+    currency_id 可以是逗号分隔的多个货币，省略时推送所有货币的事件。
     """
+    currencies = {c for c in request.GET.get("currency_id", "").split(",") if c}
+
+    async def stream():
+        # 断线后浏览器在 5 秒后自动重连
+        yield b"retry: 5000\n\n"
+        async for item in events.listen(currencies):
+            if item is None:
+                yield b": ping\n\n"
+                continue
+            event_type, _, data = item
+            yield b"event: " + event_type.encode() + b"\ndata: " + data + b"\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # 关闭 nginx 的响应缓冲，事件到达后立即转发
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _active_run(currency_id):
+    """
+    返回货币当前激活模型运行的 (id, version)，没有激活模型时返回 None。
 
-    def list(self, request):
-        cache_key = "market_share_top10"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
-
-        try:
-            url = "https://api.coingecko.com/api/v3/coins/markets"
-            params = {
-                "vs_currency": "usd",
-                "order": "market_cap_desc",
-                "per_page": 10,
-                "page": 1,
-            }
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            formatted_data = [
-                {"value": item.get("market_cap"), "name": item.get("name")}
-                for item in data
-            ]
-
-            cache.set(cache_key, formatted_data, 300)
-            return Response(formatted_data)
-        except requests.exceptions.RequestException as e:
-            return Response({"error": f"请求外部API失败: {e}"}, status=502)
+    结果缓存在该货币的预测缓存范围内，模型激活或预测刷新时随之失效，
+    命中时不查询数据库。
+    """
+    cached = caching.get(caching.FORECASTS, currency_id, "active_run")
+    if cached is not None:
+        run_id, version = cached.split(b":")
+        return int(run_id), int(version)
+
+    active_run = (
+        PredictionModel.objects.filter(
+            currency__coingecko_id=currency_id, is_active=True
+        )
+        .order_by("-version")
+        .values_list("id", "version")
+        .first()
+    )
+    if active_run is None:
+        return None
+    caching.set(
+        caching.FORECASTS,
+        currency_id,
+        "active_run",
+        value=f"{active_run[0]}:{active_run[1]}".encode(),
+        timeout=3600,
+    )
+    return active_run
 
 
 class ForecastViewSet(viewsets.ReadOnlyModelViewSet):
     """
     提供指定货币的最新价格预测数据。
+
+    缓存命中时不查询数据库；未命中时只查询一次激活的模型运行（同样有缓存）
+    和一次预测数据，并用 PricePredictionValuesSerializer 直接序列化为浮点数。
+    layout=columns 时返回按列组织的数据。
+
+    分页请求（after=上一页的 next 游标、limit=每页行数）返回 {"results": ..., "next": ...}，
+    stream=json / ndjson 时逐块流式返回 rows 布局的数据，这两种请求不经过缓存。
+
+    增量同步（since=上一次返回的 cursor，首次可以传 since=0）只返回之后写入或更新的预测：
+    {"results": ..., "cursor": ..., "version": ..., "replace": ...}。游标带模型版本，
+    激活了新版本时返回新版本的全部数据并置 replace=true，客户端应替换而不是合并已有数据。
     """
 
     serializer_class = PricePredictionSerializer
+    # 由 list() 在查出激活的模型运行后设置
+    model_run_id = None
+    include_historical = False
 
     def get_queryset(self):
-        currency_id = self.request.query_params.get("currency_id")
-        include_historical = (
-            self.request.query_params.get("include_historical", "false").lower()
-            == "true"
-        )
-
-        if not currency_id:
-            return PricePrediction.objects.none()
-
-        try:
-            latest_run = PredictionModel.objects.filter(
-                currency__coingecko_id=currency_id, is_active=True
-            ).latest("version")
-        except PredictionModel.DoesNotExist:
-            # 如果没有找到模型，直接返回空查询集
+        if self.model_run_id is None:
             return PricePrediction.objects.none()
 
-        # 根据参数决定返回的数据范围
-        if include_historical:
-            # 返回完整的预测数据（历史拟合+未来预测）
-            print(f"🔍 DEBUG: {currency_id} 请求完整预测数据")
-            return PricePrediction.objects.filter(model_run=latest_run).order_by("time")
-        else:
-            # 只返回未来3天的预测数据
-            print(f"🔍 DEBUG: {currency_id} 请求未来预测数据")
-            return PricePrediction.objects.filter(
-                model_run=latest_run, time__gt=timezone.now()
-            ).order_by("time")
+        queryset = PricePrediction.objects.filter(
+            model_run_id=self.model_run_id
+        ).order_by("time")
+        # 根据参数决定返回的数据范围：完整的预测数据（历史拟合+未来预测）或只有未来预测
+        if not self.include_historical:
+            queryset = queryset.filter(time__gt=timezone.now())
+        return queryset
 
     def list(self, request, *args, **kwargs):
-        """重写list方法以添加缓存控制和调试信息"""
+        """重写list方法以添加缓存控制"""
         currency_id = request.query_params.get("currency_id")
         include_historical = (
             request.query_params.get("include_historical", "false").lower() == "true"
         )
 
+        # rows: 与 PricePredictionSerializer 相同的对象列表；columns: 按列组织的数组
+        layout = request.query_params.get("layout", "rows")
+
         if not currency_id:
             return Response({"error": "缺少currency_id参数"}, status=400)
-
-        print(
-            f"🔍 DEBUG: 请求 {currency_id} 的预测数据 (包含历史: {include_historical})"
-        )
-
-        # 检查货币是否存在
-        try:
-            currency = Currency.objects.get(coingecko_id=currency_id)
-        except Currency.DoesNotExist:
-            return Response({"error": f"未找到货币: {currency_id}"}, status=404)
-
-        # 检查是否存在该货币的模型
-        try:
-            latest_run = PredictionModel.objects.filter(
-                currency__coingecko_id=currency_id, is_active=True
-            ).latest("version")
-            print(
-                f"🔍 DEBUG: 找到模型 - 货币: {latest_run.currency.name}, 版本: {latest_run.version}, 文件: {latest_run.model_file_path}"
-            )
-
-            # 检查预测数据数量
-            pred_count = PricePrediction.objects.filter(model_run=latest_run).count()
-            print(f"🔍 DEBUG: 该模型有 {pred_count} 条预测记录")
-
-        except PredictionModel.DoesNotExist:
+        if layout not in PricePredictionValuesSerializer.layouts:
+            raise ParseError(f"不支持的数据布局: {layout}")
+        since, since_version = _since_params(request)
+        after, limit, stream = _page_params(request)
+        if stream and layout != "rows":
+            raise ParseError("流式响应只支持 rows 布局")
+
+        active_run = _active_run(currency_id)
+        if active_run is None:
+            # 只在出错时区分是货币不存在还是没有模型
+            if not Currency.objects.filter(coingecko_id=currency_id).exists():
+                return Response({"error": f"未找到货币: {currency_id}"}, status=404)
             print(f"🔍 DEBUG: 未找到 {currency_id} 的模型")
             return Response({"error": f"未找到 {currency_id} 的预测模型"}, status=404)
+        run_id, version = active_run
+        self.model_run_id = run_id
+        self.include_historical = include_historical
+
+        if since is not None:
+            cursor = _next_since(since)
+            replace = since_version is not None and since_version != version
+            queryset = self.get_queryset()
+            if not replace:
+                queryset = queryset.filter(updated_at__gt=since)
+            return Response(
+                {
+                    "results": PricePredictionValuesSerializer(queryset, layout).data,
+                    "cursor": f"v{version}:{cursor}",
+                    "version": version,
+                    "replace": replace,
+                }
+            )
 
-        # 使用更具体的缓存键，包含模型版本和历史数据参数
-        historical_suffix = "_with_hist" if include_historical else "_future_only"
-        try:
-            latest_run = PredictionModel.objects.filter(
-                currency__coingecko_id=currency_id, is_active=True
-            ).latest("version")
-            cache_key = f"forecast_data_{currency_id}_v{latest_run.version}{historical_suffix}_{timezone.now().strftime('%Y%m%d_%H')}"
-        except PredictionModel.DoesNotExist:
-            cache_key = f"forecast_data_{currency_id}_nomodel{historical_suffix}_{timezone.now().strftime('%Y%m%d_%H')}"
-
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            print(f"🔍 DEBUG: 返回缓存数据")
-            return Response(cached_data)
+        if after is not None or limit is not None or stream:
+            queryset = self.get_queryset()
+            if after is not None:
+                queryset = queryset.filter(time__gt=after)
+            if stream:
+
+                def fetch_batch(batch_after):
+                    batch = queryset
+                    if batch_after is not None:
+                        batch = batch.filter(time__gt=batch_after)
+                    serializer = PricePredictionValuesSerializer(
+                        batch, "rows", STREAM_CHUNK_ROWS
+                    )
+                    return serializer.data, serializer.last_time
+
+                return _stream_response(request, fetch_batch, stream)
+            serializer = PricePredictionValuesSerializer(queryset, layout, limit)
+            return Response({"results": serializer.data, "next": serializer.next})
+
+        # 缓存键包含模型版本和历史数据参数；模型激活或刷新预测时整个货币的预测缓存会失效。
+        # 只含未来数据的结果按小时分桶，随时间推移自然过期
+        cache_parts = (
+            f"v{version}",
+            "with_hist" if include_historical else "future_only",
+            layout,
+            timezone.now().strftime("%Y%m%d%H"),
+        )
+        cached_data = caching.get(caching.FORECASTS, currency_id, *cache_parts)
+        if cached_data is not None:
+            return _cached_response(cached_data)
 
-        response = super().list(request, *args, **kwargs)
+        data = PricePredictionValuesSerializer(self.get_queryset(), layout).data
 
         print(
-            f"🔍 DEBUG: 生成新数据，响应状态: {response.status_code}, 数据长度: {len(response.data) if response.data else 0}"
+            f"🔍 DEBUG: {currency_id} v{version} 生成新数据 (包含历史: {include_historical}), "
+            f"数据长度: {len(data['time'] if layout == 'columns' else data)}"
         )
 
         # 缓存1小时
-        if response.status_code == 200:
-            cache.set(cache_key, response.data, 3600)
-
-        return response
+        body = _json_bytes(data)
+        caching.set(
+            caching.FORECASTS,
+            currency_id,
+            *cache_parts,
+            value=body,
+            timeout=3600,
+        )
+        return _cached_response(body)
 
 
 class ForecastComponentsView(viewsets.ViewSet):
@@ -288,111 +616,36 @@ class ForecastComponentsView(viewsets.ViewSet):
             model_record = PredictionModel.objects.filter(
                 currency__coingecko_id=currency_id, is_active=True
             ).latest("version")
-            cache_key = f"forecast_components_{currency_id}_v{model_record.version}_{timezone.now().strftime('%Y%m%d_%H')}"
+            cache_parts = (
+                f"v{model_record.version}",
+                timezone.now().strftime("%Y%m%d%H"),
+            )
         except PredictionModel.DoesNotExist:
             return Response({"error": "未找到该货币的训练模型"}, status=404)
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
+        cached_data = caching.get(caching.COMPONENTS, currency_id, *cache_parts)
+        if cached_data is not None:
+            return _cached_response(cached_data)
 
         try:
-            # 1. 加载指定货币的最新模型
-            model = joblib.load(model_record.model_file_path)
-
-            # 2. 获取该货币的历史数据用于预测
-            currency = model_record.currency
-            historical_data = (
-                MarketData.objects.filter(currency=currency)
-                .order_by("time")
-                .values("time", "close")
-            )
+            # 组件计算依赖 pandas / Prophet，只在这里延迟导入
+            from .components import ComponentsError, build_forecast_components
 
-            if len(historical_data) < 30:
-                return Response({"error": "历史数据不足"}, status=400)
-
-            # 准备历史数据DataFrame
-            df = pd.DataFrame(list(historical_data))
-            df.rename(columns={"time": "ds", "close": "y"}, inplace=True)
-            df["ds"] = df["ds"].dt.tz_localize(None)
-
-            # 为多变量模型准备比特币特征数据
-            if "btc_price" in model.extra_regressors and currency_id != "bitcoin":
-                btc_hist_data = (
-                    MarketData.objects.filter(currency__coingecko_id="bitcoin")
-                    .order_by("time")
-                    .values("time", "close")
-                )
-                df_btc_hist = pd.DataFrame(list(btc_hist_data))
-                df_btc_hist.rename(
-                    columns={"time": "ds", "close": "btc_price"}, inplace=True
-                )
-                df_btc_hist["ds"] = df_btc_hist["ds"].dt.tz_localize(None)
-
-                df = pd.merge(df, df_btc_hist, on="ds", how="left").dropna()
-
-            # 创建未来数据帧（预测未来3天）
-            future_df = model.make_future_dataframe(periods=3)
-
-            # 为未来预测添加比特币特征
-            if "btc_price" in model.extra_regressors and currency_id != "bitcoin":
-                try:
-                    btc_model_record = PredictionModel.objects.filter(
-                        currency__coingecko_id="bitcoin", is_active=True
-                    ).latest("version")
-                    btc_predictions = PricePrediction.objects.filter(
-                        model_run=btc_model_record
-                    ).values("time", "predicted_price")
-
-                    df_btc_pred = pd.DataFrame(list(btc_predictions))
-                    df_btc_pred.rename(
-                        columns={"time": "ds", "predicted_price": "btc_price"},
-                        inplace=True,
-                    )
-                    df_btc_pred["ds"] = df_btc_pred["ds"].dt.tz_localize(None)
-
-                    future_df = pd.merge(future_df, df_btc_pred, on="ds", how="left")
-                    future_df["btc_price"] = future_df["btc_price"].fillna(
-                        method="ffill"
-                    )
-                except Exception as e:
-                    print(f"添加比特币特征到未来数据失败: {e}")
-                    return Response({"error": "无法获取比特币预测数据"}, status=500)
-
-            forecast = model.predict(future_df)
-
-            # 2. 生成组件图的figure对象
-            fig = model.plot_components(forecast)
-
-            # 3. 从figure对象中提取数据
-            components_data = {}
-            for i, ax in enumerate(fig.axes):
-                component_name = ax.get_title()
-                if not component_name:
-                    continue
-
-                # 提取线条数据 (预测值)
-                line = ax.lines[0]
-                dates = [d.strftime("%Y-%m-%d") for d in line.get_xdata()]
-                values = line.get_ydata().tolist()
-
-                # 提取置信区间数据 (填充区域)
-                collection = ax.collections[0]
-                path = collection.get_paths()[0]
-                vertices = path.vertices
-                lower_bound = vertices[: len(values), 1].tolist()
-                upper_bound = vertices[len(values) :, 1][::-1].tolist()
-
-                components_data[component_name] = {
-                    "dates": dates,
-                    "values": values,
-                    "lower_bound": lower_bound,
-                    "upper_bound": upper_bound,
-                }
+            try:
+                components_data = build_forecast_components(model_record, currency_id)
+            except ComponentsError as e:
+                return Response({"error": str(e)}, status=e.status)
 
             # 缓存结果1小时
-            cache.set(cache_key, components_data, 3600)
+            body = _json_bytes(components_data)
+            caching.set(
+                caching.COMPONENTS,
+                currency_id,
+                *cache_parts,
+                value=body,
+                timeout=3600,
+            )
 
-            return Response(components_data)
+            return _cached_response(body)
 
         except PredictionModel.DoesNotExist:
             return Response({"error": "未找到该货币的训练模型"}, status=404)
@@ -1,10 +1,12 @@
 import os
+import time
 import requests
 from celery import shared_task
 from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
 from django.utils import timezone
 
+from apps.market_data import caching, events
 from apps.market_data.models import Currency, MarketData
 
 COINGECKO_API_KEY = os.environ.get("COINGECKO_API_KEY")
@@ -36,6 +38,9 @@ def fetch_historical_data_for_coin(self, currency_id):
         # 将交易量数据转换成一个以时间戳为键的字典，方便快速查找
         volumes_dict = {item[0]: item[1] for item in data.get("total_volumes", [])}
 
+        # 新写入的K线，任务结束后作为增量事件推送
+        new_bars = []
+
         # 遍历价格数据，并从字典中匹配对应的交易量
         for price_point in data.get("prices", []):
             timestamp, price = price_point
@@ -49,7 +54,7 @@ def fetch_historical_data_for_coin(self, currency_id):
             aware_record_time = timezone.make_aware(naive_record_time, dt_timezone.utc)
 
             # 使用 update_or_create 确保数据可以被更新
-            MarketData.objects.update_or_create(
+            _, created = MarketData.objects.update_or_create(
                 currency=currency,
                 time=aware_record_time,
                 defaults={
@@ -60,6 +65,14 @@ def fetch_historical_data_for_coin(self, currency_id):
                     "volume": Decimal(volume),  # 使用交易量数据
                 },
             )
+            if created:
+                # 与 /api/market_data/ 每行的前 6 列相同：[时间戳, 开, 收, 低, 高, 量]
+                new_bars.append([timestamp, price, price, price, price, volume])
+
+        # 新数据写入后使该货币的行情缓存失效
+        caching.invalidate(caching.MARKET_DATA, currency.coingecko_id)
+        if new_bars:
+            events.publish(events.BAR, currency.coingecko_id, bars=new_bars)
 
         print(f"成功完成 {currency.name} 的数据获取。")
         return f"Successfully fetched data for {currency.name}"
@@ -85,3 +98,12 @@ def dispatch_market_data_updates():
     for currency in currencies:
         fetch_historical_data_for_coin.delay(currency.id)
     print("所有数据更新任务已成功分发。")
+
+
+@shared_task
+def ingest_probe_task(sent_at):
+    """
+    探针任务：与数据获取任务走同一个 ingest 队列，不做任何工作，
+    返回从发送到开始执行的排队延迟（秒），用于压测训练期间数据获取是否被阻塞。
+    """
+    return time.time() - sent_at
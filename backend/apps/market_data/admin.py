@@ -19,11 +19,13 @@ class CurrencyAdmin(admin.ModelAdmin):
         "name",
         "symbol",
         "coingecko_id",
+        "forecast_engine",
         "data_count",
         "model_status",
         "action_buttons",
     )
     search_fields = ("name", "symbol", "coingecko_id")
+    list_filter = ("forecast_engine",)
 
     def get_urls(self):
         urls = super().get_urls()
@@ -266,12 +268,13 @@ class PredictionModelAdmin(admin.ModelAdmin):
         "id",
         "currency",
         "version",
+        "engine",
         "trained_at",
         "is_active",
         "predictions_count",
     )
     search_fields = ("currency__name",)
-    list_filter = ("currency", "is_active")
+    list_filter = ("currency", "engine", "is_active")
 
     def predictions_count(self, obj):
         """显示该模型的预测数量"""
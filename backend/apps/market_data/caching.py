@@ -0,0 +1,282 @@
+# /backend/apps/market_data/caching.py
+"""
+带命名空间和代数（generation）的缓存键。
+
+所有 web worker 共享 Redis 缓存。缓存键形如：
+
+    <命名空间>:g<命名空间代数>:<范围>:g<范围代数>:<其余部分>
+
+例如 forecasts:g1739...:bitcoin:g1739...:v12:future_only:2026101903。
+使某个货币的预测缓存失效只需把 (forecasts, bitcoin) 的代数加一（一次 INCR，O(1)），
+旧的缓存条目不再被读取，随 TTL 自然过期；使整个命名空间失效则把命名空间代数加一。
+代数的初始值取当前毫秒时间戳，即使代数键被 Redis 淘汰，重新生成的代数也不会与旧值重复。
+
+缓存分两级：
+    - L1：每个进程内按字节数限制大小的 LRU，条目另有较短的 TTL
+    - L2：所有 worker 共享的 Redis
+缓存值统一是已经编码好的响应字节串（JSON），命中时直接作为响应体返回，不再反序列化和重新编码。
+L1 的键同样包含两级代数，代数递增后旧的 L1 条目不会再被命中，按 LRU 或 TTL 淘汰。
+读取时使用的代数在进程内缓存 CACHE_GENERATION_TTL 秒，L1 命中不访问 Redis；
+代价是其他进程（如 Celery 任务）的失效最多延迟这么久才在本进程生效，
+本进程自己调用 invalidate() 则立即生效。写入缓存前总是从 Redis 读取最新代数，
+不会把新数据写到已失效的键下。
+
+命中（分 L1 / L2）与未命中次数先在进程内累计，定期批量写入 Redis，cache_stats() 返回所有 worker 的汇总。
+Redis 不可用时读写都按未命中处理，接口直接查询数据库。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+# 已使用的命名空间
+FORECASTS = "forecasts"
+COMPONENTS = "components"
+MARKET_DATA = "market_data"
+METRICS = "metrics"
+MARKET_SHARE = "market_share"
+NAMESPACES = (FORECASTS, COMPONENTS, MARKET_DATA, METRICS, MARKET_SHARE)
+
+# 进程内统计批量写入 Redis 的间隔（秒）
+STATS_FLUSH_SECONDS = 10
+_OUTCOMES = ("l1_hits", "l2_hits", "misses")
+
+# 进程内缓存的代数：{代数键: (过期时间, 代数)}
+_local_generations = {}
+_generations_lock = threading.Lock()
+
+_local_stats = {}
+_last_flush = time.monotonic()
+# aget/aset 和 ASGI 下的同步视图在不同线程中累计统计
+_stats_lock = threading.Lock()
+
+
+class LocalCache:
+    """进程内的 L1 缓存：按值的字节数限制总大小的 LRU，每个条目带过期时间。"""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()  # {key: (过期时间, 字节串)}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        if len(value) > self.max_bytes:
+            return
+        ttl = self.ttl if timeout is None else min(self.ttl, timeout)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+local_cache = LocalCache(settings.CACHE_L1_MAX_BYTES, settings.CACHE_L1_TTL)
+
+
+def _generation_key(namespace, scope=None):
+    return f"gen:{namespace}" if scope is None else f"gen:{namespace}:{scope}"
+
+
+def _stats_key(namespace, outcome):
+    return f"stats:{namespace}:{outcome}"
+
+
+def _new_generation():
+    return int(time.time() * 1000)
+
+
+def _generations(namespace, scope, fresh=False):
+    """
+    返回命名空间代数和范围代数。fresh 为 False 时优先使用进程内未过期的代数，
+    其余的一次往返从 Redis 读取，缺失的代数会被初始化。
+    """
+    keys = [_generation_key(namespace), _generation_key(namespace, scope)]
+    now = time.monotonic()
+    found = {}
+    if not fresh:
+        with _generations_lock:
+            for key in keys:
+                entry = _local_generations.get(key)
+                if entry is not None and entry[0] > now:
+                    found[key] = entry[1]
+    missing = [key for key in keys if key not in found]
+    if missing:
+        found.update(cache.get_many(missing))
+        for key in missing:
+            if key not in found:
+                # add 只在键不存在时写入，并发初始化时以先写入的为准
+                cache.add(key, _new_generation(), timeout=None)
+                found[key] = cache.get(key)
+        expires_at = now + settings.CACHE_GENERATION_TTL
+        with _generations_lock:
+            for key in missing:
+                _local_generations[key] = (expires_at, found[key])
+    return [found[key] for key in keys]
+
+
+def make_key(namespace, scope, *parts, fresh=False):
+    namespace_generation, scope_generation = _generations(namespace, scope, fresh)
+    suffix = ":".join(str(part) for part in parts)
+    return f"{namespace}:g{namespace_generation}:{scope}:g{scope_generation}:{suffix}"
+
+
+def _record(namespace, outcome):
+    key = _stats_key(namespace, outcome)
+    with _stats_lock:
+        _local_stats[key] = _local_stats.get(key, 0) + 1
+        due = time.monotonic() - _last_flush >= STATS_FLUSH_SECONDS
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """把进程内累计的命中/未命中次数写入 Redis。"""
+    global _last_flush
+    # 只在锁内取走计数，写 Redis 时不阻塞其他线程
+    with _stats_lock:
+        _last_flush = time.monotonic()
+        pending = dict(_local_stats)
+        _local_stats.clear()
+    for key, count in pending.items():
+        try:
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                if not cache.add(key, count, timeout=None):
+                    cache.incr(key, count)
+        except Exception as e:
+            print(f"🛑 写入缓存统计失败: {e}")
+
+
+def get(namespace, scope, *parts):
+    """依次读取 L1、L2，返回缓存的字节串；未命中（或缓存不可用）时返回 None。"""
+    try:
+        key = make_key(namespace, scope, *parts)
+    except Exception as e:
+        print(f"🛑 读取缓存失败: {e}")
+        _record(namespace, "misses")
+        return None
+
+    value = local_cache.get(key)
+    if value is not None:
+        _record(namespace, "l1_hits")
+        return value
+
+    try:
+        value = cache.get(key)
+    except Exception as e:
+        print(f"🛑 读取缓存失败: {e}")
+        value = None
+    if value is None:
+        _record(namespace, "misses")
+        return None
+    local_cache.set(key, value)
+    _record(namespace, "l2_hits")
+    return value
+
+
+def set(namespace, scope, *parts, value, timeout):
+    """写入两级缓存，value 为已编码的响应字节串。"""
+    try:
+        key = make_key(namespace, scope, *parts, fresh=True)
+        cache.set(key, value, timeout)
+    except Exception as e:
+        print(f"🛑 写入缓存失败: {e}")
+        return
+    local_cache.set(key, value, timeout)
+
+
+async def aget(namespace, scope, *parts):
+    """get() 的异步版本，在线程池中读取缓存，不阻塞事件循环。"""
+    return await sync_to_async(get, thread_sensitive=False)(namespace, scope, *parts)
+
+
+async def aset(namespace, scope, *parts, value, timeout):
+    await sync_to_async(set, thread_sensitive=False)(
+        namespace, scope, *parts, value=value, timeout=timeout
+    )
+
+
+def invalidate(namespace, scope=None):
+    """
+    使一个命名空间（scope 为 None）或其中一个范围的所有缓存失效。
+    只递增代数，不扫描也不删除任何缓存条目。
+    """
+    key = _generation_key(namespace, scope)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _new_generation(), timeout=None)
+    except Exception as e:
+        print(f"🛑 使缓存 {key} 失效失败: {e}")
+    # 递增之后再丢弃进程内的旧代数，本进程随后的读取立即使用新代数
+    with _generations_lock:
+        _local_generations.pop(key, None)
+
+
+def cache_stats():
+    """返回所有 worker 汇总的 {命名空间: {l1_hits, l2_hits, hits, misses, hit_rate}}。"""
+    flush_stats()
+    keys = [
+        _stats_key(namespace, outcome)
+        for namespace in NAMESPACES
+        for outcome in _OUTCOMES
+    ]
+    values = cache.get_many(keys)
+    stats = {}
+    for namespace in NAMESPACES:
+        l1_hits = values.get(_stats_key(namespace, "l1_hits"), 0)
+        l2_hits = values.get(_stats_key(namespace, "l2_hits"), 0)
+        misses = values.get(_stats_key(namespace, "misses"), 0)
+        hits = l1_hits + l2_hits
+        total = hits + misses
+        stats[namespace] = {
+            "l1_hits": l1_hits,
+            "l2_hits": l2_hits,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _local_stats.clear()
+    cache.delete_many(
+        [
+            _stats_key(namespace, outcome)
+            for namespace in NAMESPACES
+            for outcome in _OUTCOMES
+        ]
+    )
@@ -0,0 +1,133 @@
+# /backend/apps/market_data/events.py
+"""
+实时增量事件。
+
+Celery 任务写入新数据后把一条精简的 JSON 事件发布到 Redis 频道（EVENTS_CHANNEL），
+每个 web 进程只用一个 Redis 连接订阅该频道，再分发给进程内所有的 SSE 连接
+（见 apps/api/views.py 的 events_view）。事件格式：
+
+    {"type": "bar", "currency": "bitcoin", "bars": [[时间戳(ms), 开, 收, 低, 高, 量], ...]}
+    {"type": "forecast", "currency": "bitcoin", "version": 12}
+
+bar 中每根K线的格式与 /api/market_data/ 返回的每行前 6 列相同，客户端按时间戳追加或替换；
+forecast 在模型激活或预测刷新后发送，只带当前的模型版本，客户端再请求预测接口（此时缓存已在预热）。
+
+发布失败只打印日志，不影响任务本身；Redis 不可用时 SSE 连接会结束，由浏览器自动重连。
+"""
+
+import asyncio
+import json
+import weakref
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+# 事件类型
+BAR = "bar"
+FORECAST = "forecast"
+
+_publisher = None
+# {事件循环: _Hub}，与 apps/api/upstream.py 中的客户端一样按事件循环共用
+_hubs = weakref.WeakKeyDictionary()
+
+
+def encode(event_type, currency, **payload):
+    return json.dumps(
+        {"type": event_type, "currency": currency, **payload},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+
+def publish(event_type, currency, **payload):
+    """在 Celery 任务中发布一条事件。"""
+    global _publisher
+    try:
+        if _publisher is None:
+            _publisher = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        _publisher.publish(
+            settings.EVENTS_CHANNEL, encode(event_type, currency, **payload)
+        )
+    except Exception as e:
+        print(f"🛑 发布 {event_type} 事件失败: {e}")
+
+
+class _Hub:
+    """一个事件循环内的订阅者：从 Redis 读取事件，放入每个监听者的队列。"""
+
+    def __init__(self):
+        self.queues = set()
+        self.task = None
+
+    def add(self):
+        queue = asyncio.Queue(maxsize=settings.EVENTS_CLIENT_BUFFER)
+        self.queues.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        return queue
+
+    def discard(self, queue):
+        self.queues.discard(queue)
+
+    def _close(self, queue):
+        # 清空积压的事件并放入结束标记 None，对应的 SSE 连接随之结束
+        self.queues.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def _run(self):
+        client = aioredis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(settings.EVENTS_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except ValueError:
+                    continue
+                item = (event.get("type"), event.get("currency"), message["data"])
+                for queue in list(self.queues):
+                    try:
+                        queue.put_nowait(item)
+                    except asyncio.QueueFull:
+                        # 客户端读取太慢，断开后由浏览器重连并重新加载数据
+                        self._close(queue)
+        except Exception as e:
+            print(f"🛑 订阅实时事件失败: {e}")
+        finally:
+            for queue in list(self.queues):
+                self._close(queue)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+async def listen(currencies=None):
+    """
+    异步迭代 (事件类型, 货币, 原始 JSON 字节串)；currencies 不为空时只返回这些货币的事件。
+    空闲超过 EVENTS_HEARTBEAT_SECONDS 时产出 None，调用方据此发送心跳。
+    """
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = _Hub()
+    queue = hub.add()
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(
+                    queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if item is None:
+                return
+            if currencies and item[1] not in currencies:
+                continue
+            yield item
+    finally:
+        hub.discard(queue)
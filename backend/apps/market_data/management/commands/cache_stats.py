@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from apps.market_data import caching
+
+
+class Command(BaseCommand):
+    help = "查看各缓存命名空间的命中/未命中统计，或使某个命名空间的缓存失效"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--invalidate",
+            choices=caching.NAMESPACES,
+            help="使指定命名空间的缓存失效",
+        )
+        parser.add_argument(
+            "--scope",
+            type=str,
+            help="与 --invalidate 一起使用，只使该范围（如货币的 coingecko_id）的缓存失效",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="输出统计后清零计数",
+        )
+
+    def handle(self, *args, **options):
+        if options["invalidate"]:
+            caching.invalidate(options["invalidate"], options["scope"])
+            target = options["invalidate"]
+            if options["scope"]:
+                target = f"{target}:{options['scope']}"
+            self.stdout.write(self.style.SUCCESS(f"✅ 已使 {target} 缓存失效"))
+            return
+
+        for namespace, stats in caching.cache_stats().items():
+            hit_rate = (
+                f"{stats['hit_rate']:.1%}" if stats["hit_rate"] is not None else "-"
+            )
+            self.stdout.write(
+                f"{namespace:<14} 命中 {stats['hits']:>8} "
+                f"(L1 {stats['l1_hits']}, L2 {stats['l2_hits']})  "
+                f"未命中 {stats['misses']:>8}  命中率 {hit_rate}"
+            )
+
+        if options["reset"]:
+            caching.reset_stats()
+            self.stdout.write(self.style.SUCCESS("✅ 统计已清零"))
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market_data", "0003_marketdata_ma_30d_marketdata_ma_7d_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="currency",
+            name="forecast_engine",
+            field=models.CharField(
+                choices=[
+                    ("prophet", "Prophet"),
+                    ("holt", "Holt 指数平滑"),
+                    ("ar", "AR 最小二乘"),
+                    ("drift", "朴素漂移"),
+                ],
+                default="prophet",
+                help_text="该货币使用的预测引擎",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="currency",
+            name="forecast_params",
+            field=models.JSONField(
+                blank=True, default=dict, help_text="传给预测引擎的参数"
+            ),
+        ),
+        migrations.AddField(
+            model_name="predictionmodel",
+            name="engine",
+            field=models.CharField(
+                choices=[
+                    ("prophet", "Prophet"),
+                    ("holt", "Holt 指数平滑"),
+                    ("ar", "AR 最小二乘"),
+                    ("drift", "朴素漂移"),
+                ],
+                default="prophet",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market_data", "0004_currency_forecast_engine"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="currency",
+            name="tuned_at",
+            field=models.DateTimeField(
+                blank=True, help_text="最近一次超参数搜索的时间", null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market_data", "0005_currency_tuned_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="currency",
+            name="training_lookback_days",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="训练只使用最近多少天的数据，留空使用全局配置",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="currency",
+            name="training_max_rows",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="训练最多使用多少行数据，留空使用全局配置",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market_data", "0006_currency_training_window"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="currency",
+            name="forecast_engine",
+            field=models.CharField(
+                choices=[
+                    ("prophet", "Prophet"),
+                    ("holt", "Holt 指数平滑"),
+                    ("ar", "AR 最小二乘"),
+                    ("drift", "朴素漂移"),
+                    ("global_ridge", "全局岭回归"),
+                ],
+                default="prophet",
+                help_text="该货币使用的预测引擎",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="predictionmodel",
+            name="engine",
+            field=models.CharField(
+                choices=[
+                    ("prophet", "Prophet"),
+                    ("holt", "Holt 指数平滑"),
+                    ("ar", "AR 最小二乘"),
+                    ("drift", "朴素漂移"),
+                    ("global_ridge", "全局岭回归"),
+                ],
+                default="prophet",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-19 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market_data", "0007_global_ridge_engine"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="marketdata",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="最近一次写入的时间，增量同步（since=）按它过滤",
+            ),
+        ),
+        migrations.AddField(
+            model_name="priceprediction",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="最近一次写入的时间，增量同步（since=）按它过滤",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="marketdata",
+            index=models.Index(
+                fields=["currency", "updated_at"], name="marketdata_currency_updated"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="priceprediction",
+            index=models.Index(
+                fields=["model_run", "updated_at"], name="prediction_run_updated"
+            ),
+        ),
+    ]
@@ -2,6 +2,14 @@
 from django.db import models
 from djmoney.models.fields import MoneyField
 
+# 可选的预测引擎，实现位于 apps.ml_predictions.engines
+FORECAST_ENGINE_CHOICES = [
+    ("prophet", "Prophet"),
+    ("holt", "Holt 指数平滑"),
+    ("ar", "AR 最小二乘"),
+    ("drift", "朴素漂移"),
+    ("global_ridge", "全局岭回归"),
+]
 
 class Currency(models.Model):
     """
@@ -16,6 +24,24 @@ class Currency(models.Model):
     )  #
     symbol = models.CharField(max_length=20, help_text="货币符号，如 'btc'")  #
     name = models.CharField(max_length=100, help_text="货币全名，如 'Bitcoin'")  #
+    forecast_engine = models.CharField(
+        max_length=20,
+        choices=FORECAST_ENGINE_CHOICES,
+        default="prophet",
+        help_text="该货币使用的预测引擎",
+    )
+    forecast_params = models.JSONField(
+        default=dict, blank=True, help_text="传给预测引擎的参数"
+    )
+    tuned_at = models.DateTimeField(
+        null=True, blank=True, help_text="最近一次超参数搜索的时间"
+    )
+    training_lookback_days = models.PositiveIntegerField(
+        null=True, blank=True, help_text="训练只使用最近多少天的数据，留空使用全局配置"
+    )
+    training_max_rows = models.PositiveIntegerField(
+        null=True, blank=True, help_text="训练最多使用多少行数据，留空使用全局配置"
+    )
 
     class Meta:
         verbose_name = "Currency"
@@ -38,6 +64,9 @@ class PredictionModel(models.Model):
     version = models.IntegerField()  #
     trained_at = models.DateTimeField(auto_now_add=True)  #
     metrics = models.JSONField(default=dict)  #
+    engine = models.CharField(
+        max_length=20, choices=FORECAST_ENGINE_CHOICES, default="prophet"
+    )
     is_active = models.BooleanField(default=True)
 
     class Meta:
@@ -79,10 +108,18 @@ class MarketData(models.Model):
     macd_hist = models.DecimalField(
         max_digits=20, decimal_places=8, null=True, blank=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, help_text="最近一次写入的时间，增量同步（since=）按它过滤"
+    )
 
     class Meta:
         unique_together = ("time", "currency")
         ordering = ["-time"]
+        indexes = [
+            models.Index(
+                fields=["currency", "updated_at"], name="marketdata_currency_updated"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.currency.name} at {self.time}"
@@ -121,10 +158,18 @@ class PricePrediction(models.Model):
     currency = models.ForeignKey(
         Currency, on_delete=models.CASCADE, related_name="predictions"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, help_text="最近一次写入的时间，增量同步（since=）按它过滤"
+    )
 
     class Meta:
         unique_together = ("time", "model_run", "currency")
         ordering = ["-time"]
+        indexes = [
+            models.Index(
+                fields=["model_run", "updated_at"], name="prediction_run_updated"
+            ),
+        ]
 
     def __str__(self):
         return f"Prediction for {self.currency.name} at {self.time}"
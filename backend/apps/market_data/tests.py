@@ -1,3 +1,241 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from . import caching, events
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CACHE_GENERATION_TTL=2.0,
+)
+class GenerationCacheTests(SimpleTestCase):
+    """两级缓存的代数失效、命中统计和 Redis 故障降级。"""
+
+    def setUp(self):
+        cache.clear()
+        caching.local_cache.clear()
+        caching._local_generations.clear()
+        # 测试期间不批量写入命中统计
+        patcher = mock.patch.object(caching, "STATS_FLUSH_SECONDS", 3600)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caching.set(caching.FORECASTS, "bitcoin", "v1", value=b"[1]", timeout=60)
+
+    def _bump_elsewhere(self, scope="bitcoin"):
+        """模拟其他进程（如 Celery 任务）递增 Redis 中的代数。"""
+        cache.incr(caching._generation_key(caching.FORECASTS, scope))
+
+    def test_l1_hit_makes_no_redis_calls(self):
+        with mock.patch.object(caching, "cache", mock.Mock(wraps=cache)) as redis:
+            value = caching.get(caching.FORECASTS, "bitcoin", "v1")
+        self.assertEqual(value, b"[1]")
+        self.assertEqual(redis.mock_calls, [])
+
+    def test_invalidation_elsewhere_is_seen_within_generation_ttl(self):
+        self._bump_elsewhere()
+        self.assertEqual(caching.get(caching.FORECASTS, "bitcoin", "v1"), b"[1]")
+
+        later = time.monotonic() + 2.1
+        with mock.patch.object(caching.time, "monotonic", return_value=later):
+            self.assertIsNone(caching.get(caching.FORECASTS, "bitcoin", "v1"))
+
+    def test_local_invalidation_is_immediate(self):
+        caching.invalidate(caching.FORECASTS, "bitcoin")
+        self.assertIsNone(caching.get(caching.FORECASTS, "bitcoin", "v1"))
+
+    def test_namespace_invalidation_covers_every_scope(self):
+        caching.set(caching.FORECASTS, "ethereum", "v1", value=b"[2]", timeout=60)
+        caching.invalidate(caching.FORECASTS)
+        self.assertIsNone(caching.get(caching.FORECASTS, "bitcoin", "v1"))
+        self.assertIsNone(caching.get(caching.FORECASTS, "ethereum", "v1"))
+
+    def test_set_after_invalidation_elsewhere_uses_current_generation(self):
+        self._bump_elsewhere()
+        caching.set(caching.FORECASTS, "bitcoin", "v1", value=b"[3]", timeout=60)
+
+        self.assertEqual(caching.get(caching.FORECASTS, "bitcoin", "v1"), b"[3]")
+        caching.local_cache.clear()
+        self.assertEqual(caching.get(caching.FORECASTS, "bitcoin", "v1"), b"[3]")
+
+    def test_stats_count_each_level(self):
+        caching.reset_stats()
+        caching.get(caching.FORECASTS, "bitcoin", "v1")
+        caching.local_cache.clear()
+        caching.get(caching.FORECASTS, "bitcoin", "v1")
+        caching.get(caching.FORECASTS, "bitcoin", "v2")
+
+        self.assertEqual(
+            caching.cache_stats()[caching.FORECASTS],
+            {"l1_hits": 1, "l2_hits": 1, "hits": 2, "misses": 1, "hit_rate": 0.6667},
+        )
+        self.assertIsNone(caching.cache_stats()[caching.METRICS]["hit_rate"])
+
+    def test_async_round_trip(self):
+        async_to_sync(caching.aset)(
+            caching.METRICS, "global", "top", value=b"{}", timeout=60
+        )
+        caching.local_cache.clear()
+        value = async_to_sync(caching.aget)(caching.METRICS, "global", "top")
+        self.assertEqual(value, b"{}")
+
+    def test_redis_failure_is_a_miss(self):
+        caching.reset_stats()
+        caching._local_generations.clear()
+        broken = mock.Mock(
+            **{
+                f"{method}.side_effect": ConnectionError("redis down")
+                for method in ("get", "get_many", "set", "add", "incr")
+            }
+        )
+        with mock.patch.object(caching, "cache", broken):
+            self.assertIsNone(caching.get(caching.FORECASTS, "bitcoin", "v1"))
+            caching.set(caching.FORECASTS, "bitcoin", "v3", value=b"[3]", timeout=60)
+            caching.invalidate(caching.FORECASTS, "bitcoin")
+
+        self.assertEqual(caching.cache_stats()[caching.FORECASTS]["misses"], 1)
+        self.assertIsNone(caching.get(caching.FORECASTS, "bitcoin", "v3"))
+
+
+class LocalCacheTests(SimpleTestCase):
+    """进程内 L1 缓存的容量和过期。"""
+
+    def test_evicts_least_recently_used_by_size(self):
+        local = caching.LocalCache(max_bytes=10, ttl=60)
+        local.set("a", b"1234")
+        local.set("b", b"1234")
+        local.get("a")
+        local.set("c", b"1234")
+
+        self.assertEqual(local.get("a"), b"1234")
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(local.size, 8)
+
+    def test_entries_expire(self):
+        local = caching.LocalCache(max_bytes=10, ttl=60)
+        local.set("a", b"1", timeout=5)
+        later = time.monotonic() + 6
+        with mock.patch.object(caching.time, "monotonic", return_value=later):
+            self.assertIsNone(local.get("a"))
+        self.assertEqual(local.size, 0)
+
+
+class FakePubSub:
+    """按测试放入的顺序返回消息的 Redis pub/sub，放入 None 表示连接断开。"""
+
+    def __init__(self):
+        self.messages = asyncio.Queue()
+        self.channels = []
+        self.closed = False
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def listen(self):
+        while True:
+            message = await self.messages.get()
+            if message is None:
+                return
+            yield message
+
+    async def aclose(self):
+        self.closed = True
+
+    def send(self, event_type, currency):
+        data = events.encode(event_type, currency).encode("utf-8")
+        self.messages.put_nowait({"type": "message", "data": data})
+
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+@override_settings(EVENTS_CHANNEL="test:events", EVENTS_HEARTBEAT_SECONDS=15)
+class EventsTests(SimpleTestCase):
+    """事件的发布，以及每个事件循环共用一个订阅分发给所有 SSE 连接。"""
+
+    def setUp(self):
+        self.pubsub = FakePubSub()
+        client = mock.Mock(pubsub=lambda: self.pubsub, aclose=mock.AsyncMock())
+        patcher = mock.patch.object(
+            events.aioredis.Redis, "from_url", return_value=client
+        )
+        self.from_url = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _disconnect(self):
+        self.pubsub.messages.put_nowait(None)
+        await events._hubs[asyncio.get_running_loop()].task
+
+    def test_publish_sends_compact_json(self):
+        redis_client = mock.Mock()
+        with mock.patch.object(events, "_publisher", None), mock.patch.object(
+            events.redis.Redis, "from_url", return_value=redis_client
+        ):
+            events.publish(events.FORECAST, "bitcoin", version=12)
+
+        channel, data = redis_client.publish.call_args.args
+        self.assertEqual(channel, "test:events")
+        self.assertEqual(data, '{"type":"forecast","currency":"bitcoin","version":12}')
+
+    def test_publish_failure_does_not_raise(self):
+        with mock.patch.object(events, "_publisher", None), mock.patch.object(
+            events.redis.Redis, "from_url", side_effect=ConnectionError("down")
+        ):
+            events.publish(events.BAR, "bitcoin", bars=[])
+
+    async def test_one_subscription_fans_out_to_every_listener(self):
+        everything = events.listen()
+        bitcoin = events.listen({"bitcoin"})
+        first = asyncio.create_task(anext(everything))
+        first_bitcoin = asyncio.create_task(anext(bitcoin))
+        await asyncio.sleep(0)
+
+        self.pubsub.messages.put_nowait({"type": "subscribe", "data": 1})
+        self.pubsub.messages.put_nowait({"type": "message", "data": b"not json"})
+        self.pubsub.send(events.BAR, "ethereum")
+        self.pubsub.send(events.FORECAST, "bitcoin")
+
+        self.assertEqual((await first)[:2], (events.BAR, "ethereum"))
+        bitcoin_event = await first_bitcoin
+        self.assertEqual(await anext(everything), bitcoin_event)
+        self.assertEqual(bitcoin_event[:2], (events.FORECAST, "bitcoin"))
+        self.assertEqual(
+            json.loads(bitcoin_event[2]), {"type": "forecast", "currency": "bitcoin"}
+        )
+        self.assertEqual(self.from_url.call_count, 1)
+        self.assertEqual(self.pubsub.channels, ["test:events"])
+
+        # Redis 断开后所有连接随之结束
+        await self._disconnect()
+        self.assertEqual(await _collect(everything), [])
+        self.assertEqual(await _collect(bitcoin), [])
+        self.assertTrue(self.pubsub.closed)
+
+    @override_settings(EVENTS_HEARTBEAT_SECONDS=0.01)
+    async def test_idle_listener_gets_heartbeat(self):
+        stream = events.listen()
+        self.assertIsNone(await anext(stream))
+        await stream.aclose()
+        await self._disconnect()
+
+    @override_settings(EVENTS_CLIENT_BUFFER=1)
+    async def test_slow_listener_is_disconnected(self):
+        stream = events.listen()
+        pending = asyncio.create_task(anext(stream))
+        await asyncio.sleep(0)
+
+        for _ in range(3):
+            self.pubsub.send(events.BAR, "bitcoin")
+        with self.assertRaises(StopAsyncIteration):
+            await pending
+
+        hub = events._hubs[asyncio.get_running_loop()]
+        self.assertEqual(hub.queues, set())
+        self.assertFalse(hub.task.done())
+        await self._disconnect()
@@ -0,0 +1,160 @@
+# /backend/apps/market_data/timeseries.py
+"""
+时间序列加载工具。
+
+直接用 ``pd.DataFrame(list(queryset.values("time", "close")))`` 会先为每一行构造
+包含 Decimal 和带时区 datetime 的字典，再整体转换，行数一多内存和耗时都很可观。
+这里改为用服务端游标分块读取，并在 SQL 中把时间转换为 epoch 微秒、把价格转换为
+双精度浮点数，每个分块直接落入类型化的 NumPy 数组。
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.utils import timezone
+
+from .models import MarketData
+
+# 每次从服务端游标拉取的行数
+CHUNK_SIZE = 20000
+
+# 各数据库后端中把时间列转换为 epoch 微秒整数的 SQL 表达式
+_EPOCH_US_SQL = {
+    "postgresql": "CAST(EXTRACT(EPOCH FROM {column}) * 1000000 AS BIGINT)",
+    "sqlite": "CAST(strftime('%%s', {column}) AS INTEGER) * 1000000",
+}
+
+
+def _column(field_name):
+    return connection.ops.quote_name(MarketData._meta.get_field(field_name).column)
+
+
+def load_price_arrays(currency_ids, field="close", start=None, end=None):
+    """
+    一次查询读取多个货币的价格序列。
+
+    返回 ``{currency_id: (epoch_us, prices)}``，其中 epoch_us 为 int64 的 UTC 微秒时间戳，
+    prices 为 float64 价格，均按时间升序排列。没有数据的货币不会出现在结果中。
+    """
+    currency_ids = [int(currency_id) for currency_id in currency_ids]
+    if not currency_ids:
+        return {}
+
+    time_column = _column("time")
+    currency_column = _column("currency")
+    sql = (
+        f"SELECT {currency_column}, "
+        f"{_EPOCH_US_SQL[connection.vendor].format(column=time_column)}, "
+        f"CAST({_column(field)} AS DOUBLE PRECISION) "
+        f"FROM {connection.ops.quote_name(MarketData._meta.db_table)} "
+        f"WHERE {currency_column} IN ({', '.join(['%s'] * len(currency_ids))})"
+    )
+    params = list(currency_ids)
+    if start is not None:
+        sql += f" AND {time_column} >= %s"
+        params.append(connection.ops.adapt_datetimefield_value(start))
+    if end is not None:
+        sql += f" AND {time_column} <= %s"
+        params.append(connection.ops.adapt_datetimefield_value(end))
+    sql += f" ORDER BY {currency_column}, {time_column}"
+
+    # epoch 微秒小于 2**53，可以无损地放进 float64 矩阵，之后再按列转换类型
+    chunks = []
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype="float64"))
+
+    if not chunks:
+        return {}
+
+    matrix = np.concatenate(chunks)
+    owners = matrix[:, 0].astype("int64")
+    epoch_us = matrix[:, 1].astype("int64")
+    prices = matrix[:, 2].copy()
+
+    # 结果已按货币排序，按边界切分即可
+    boundaries = np.flatnonzero(np.diff(owners)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(owners)]))
+    return {
+        int(owners[begin]): (epoch_us[begin:stop], prices[begin:stop])
+        for begin, stop in zip(starts, ends)
+    }
+
+
+def _to_frame(epoch_us, prices, value_name):
+    return pd.DataFrame(
+        {
+            # 与原来的 tz_localize(None) 一致：UTC 无时区时间
+            "ds": epoch_us.astype("datetime64[us]").astype("datetime64[ns]"),
+            value_name: prices,
+        }
+    )
+
+
+def load_price_frame(currency_id, field="close", value_name="y", start=None, end=None):
+    """读取单个货币的价格序列，返回包含 ds 和 value_name 两列的 DataFrame。"""
+    arrays = load_price_arrays([currency_id], field=field, start=start, end=end)
+    epoch_us, prices = arrays.get(
+        int(currency_id), (np.empty(0, "int64"), np.empty(0, "float64"))
+    )
+    return _to_frame(epoch_us, prices, value_name)
+
+
+def load_price_frames(currency_ids, field="close", start=None, end=None, align=False):
+    """
+    一次查询读取多个货币的价格序列，返回 ``{currency_id: DataFrame(ds, y)}``。
+    align=True 时只保留所有货币都有数据的时间点，使各个 DataFrame 逐行对齐。
+    """
+    arrays = load_price_arrays(currency_ids, field=field, start=start, end=end)
+    if align and arrays:
+        common = None
+        for epoch_us, _ in arrays.values():
+            common = epoch_us if common is None else np.intersect1d(common, epoch_us)
+        for currency_id, (epoch_us, prices) in arrays.items():
+            mask = np.isin(epoch_us, common)
+            arrays[currency_id] = (epoch_us[mask], prices[mask])
+    return {
+        currency_id: _to_frame(epoch_us, prices, "y")
+        for currency_id, (epoch_us, prices) in arrays.items()
+    }
+
+
+def window_start(currency_id, lookback_days=None, max_rows=None):
+    """
+    计算训练窗口的起始时间：取"最近 lookback_days 天"与"最近 max_rows 行"两者中较晚的一个。
+    两者都未设置时返回 None，表示使用全部历史。
+    """
+    starts = []
+    if lookback_days:
+        starts.append(timezone.now() - timedelta(days=lookback_days))
+    if max_rows:
+        cutoff = (
+            MarketData.objects.filter(currency_id=currency_id)
+            .order_by("-time")
+            .values_list("time", flat=True)[max_rows - 1 : max_rows]
+            .first()
+        )
+        if cutoff is not None:
+            starts.append(cutoff)
+    return max(starts) if starts else None
+
+
+def trim_frame(df, lookback_days=None, max_rows=None, end=None):
+    """
+    window_start 的内存版本：从已读取的序列中截取以 end（默认当前时间）结束的
+    最近 lookback_days 天与最近 max_rows 行。df 的 ds 列为 UTC 无时区时间。
+    """
+    if lookback_days:
+        if end is None:
+            end = pd.Timestamp.utcnow().tz_localize(None)
+        df = df[df["ds"] >= end - pd.Timedelta(days=lookback_days)]
+    if max_rows:
+        df = df.iloc[-max_rows:]
+    return df.reset_index(drop=True)
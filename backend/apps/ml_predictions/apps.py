@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MlPredictionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.ml_predictions'
+
+    # 在应用就绪时导入并连接 Celery worker 信号
+    def ready(self):
+        import apps.ml_predictions.signals
@@ -0,0 +1,192 @@
+# /backend/apps/ml_predictions/artifacts.py
+"""
+模型文件存储。
+
+每次训练都会产生一个新模型。这里不再为每次运行写一个 joblib 文件，而是：
+    - Prophet 模型使用官方的 JSON 序列化（model_to_json），轻量引擎把内部状态
+      （NumPy 数组、标量）编码为 JSON，二者都比 pickle 更小、加载更快，也不依赖类的 pickle 布局
+    - 用 zstd 压缩后，以未压缩内容的 sha256 作为文件名保存在 models/artifacts/ 下，
+      内容完全相同的模型只保存一份
+    - 旧的模型运行被清理后，没有任何 PredictionModel 再引用的文件会被删除；
+      gc_artifacts 命令还会清理超出保留数量的未激活版本和早期遗留的 .joblib 文件
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import zstandard
+from django.conf import settings
+
+from apps.market_data.models import PredictionModel
+
+from .engines import ENGINES, ProphetEngine
+
+MODELS_DIR = os.path.join(settings.BASE_DIR, "models")
+ARTIFACTS_DIR = os.path.join(MODELS_DIR, "artifacts")
+os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+ARTIFACT_SUFFIX = ".json.zst"
+ZSTD_LEVEL = 10
+# 垃圾回收时跳过最近修改过的文件，避免删除已保存但尚未写入数据库的模型
+GC_GRACE_SECONDS = 3600
+# 垃圾回收会处理的文件类型（包括早期的 joblib 文件和写入中断留下的临时文件）
+_COLLECTABLE_SUFFIXES = (ARTIFACT_SUFFIX, ".joblib", ".tmp")
+
+
+def _encode(value):
+    """把引擎状态中的 NumPy 数组和标量转换为可 JSON 序列化的结构。"""
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, np.ndarray):
+        data = value.view("int64") if value.dtype.kind in "mM" else value
+        return {"__ndarray__": data.tolist(), "dtype": str(value.dtype)}
+    if isinstance(value, (np.datetime64, np.timedelta64)):
+        return {"__scalar__": int(value.view("int64")), "dtype": str(value.dtype)}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "__ndarray__" in value:
+        dtype = np.dtype(value["dtype"])
+        if dtype.kind in "mM":
+            return np.array(value["__ndarray__"], dtype="int64").view(dtype)
+        return np.array(value["__ndarray__"], dtype=dtype)
+    if "__scalar__" in value:
+        return np.array(value["__scalar__"], dtype="int64").view(value["dtype"])[()]
+    return {key: _decode(item) for key, item in value.items()}
+
+
+def serialize_engine(engine):
+    """把引擎序列化为确定性的 JSON 字节串（相同的模型得到相同的字节）。"""
+    state = {key: value for key, value in vars(engine).items() if key != "model"}
+    payload = {"engine": engine.name, "state": _encode(state)}
+    if isinstance(engine, ProphetEngine):
+        from prophet.serialize import model_to_json
+
+        payload["prophet"] = model_to_json(engine.model)
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def deserialize_engine(data):
+    payload = json.loads(data)
+    engine_class = ENGINES[payload["engine"]]
+    engine = engine_class.__new__(engine_class)
+    engine.__dict__.update(_decode(payload["state"]))
+    if "prophet" in payload:
+        from prophet.serialize import model_from_json
+
+        engine.model = model_from_json(payload["prophet"])
+    return engine
+
+
+def save_artifact(engine):
+    """
+    保存引擎并返回文件路径。文件名是内容的 sha256，
+    已存在相同内容的文件时直接复用（只更新修改时间）。
+    """
+    data = serialize_engine(engine)
+    digest = hashlib.sha256(data).hexdigest()
+    path = os.path.join(ARTIFACTS_DIR, digest[:2], f"{digest}{ARTIFACT_SUFFIX}")
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data))
+    # 原子替换，并发保存同一个模型时也不会读到写了一半的文件
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_artifact(path):
+    with open(path, "rb") as fh:
+        data = zstandard.ZstdDecompressor().decompress(fh.read())
+    return deserialize_engine(data)
+
+
+def _remove(path):
+    """删除文件并返回释放的字节数，文件已不存在时返回 0。"""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+def remove_unreferenced(paths, grace_seconds=GC_GRACE_SECONDS):
+    """
+    删除给定路径中已不被任何 PredictionModel 引用的文件（内容寻址下多个运行可能共享同一文件）。
+    与 collect_artifacts 一样跳过最近 grace_seconds 秒内修改过的文件：并发的 save_artifact
+    可能刚复用了这个文件，而引用它的运行还没有写入数据库。
+    返回 (删除的文件数, 释放的字节数)。
+    """
+    paths = set(paths)
+    referenced = set(
+        PredictionModel.objects.filter(model_file_path__in=paths).values_list(
+            "model_file_path", flat=True
+        )
+    )
+    cutoff = time.time() - grace_seconds
+    removed = reclaimed = 0
+    for path in paths - referenced:
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        size = _remove(path)
+        if size:
+            removed += 1
+            reclaimed += size
+    return removed, reclaimed
+
+
+def live_artifacts(keep=None):
+    """每个货币的激活运行以及最近 keep 个运行所引用的文件路径。"""
+    keep = keep or settings.ML_MODEL_RUNS_TO_KEEP
+    live = set()
+    seen = {}
+    runs = PredictionModel.objects.order_by("currency_id", "-version").values_list(
+        "currency_id", "is_active", "model_file_path"
+    )
+    for currency_id, is_active, path in runs:
+        seen[currency_id] = seen.get(currency_id, 0) + 1
+        if is_active or seen[currency_id] <= keep:
+            live.add(os.path.abspath(path))
+    return live
+
+
+def collect_artifacts(keep=None, dry_run=False, grace_seconds=GC_GRACE_SECONDS):
+    """
+    清理 models 目录：删除不属于任何激活运行、也不在每个货币最近 keep 个运行之内的文件，
+    包括早期遗留的 .joblib 文件。返回 {"files": 删除数, "bytes": 释放字节数, "kept": 保留数}。
+    """
+    live = live_artifacts(keep)
+    cutoff = time.time() - grace_seconds
+    result = {"files": 0, "bytes": 0, "kept": 0}
+
+    for root, _, filenames in os.walk(MODELS_DIR):
+        for filename in filenames:
+            if not filename.endswith(_COLLECTABLE_SUFFIXES):
+                continue
+            path = os.path.abspath(os.path.join(root, filename))
+            if path in live or os.path.getmtime(path) > cutoff:
+                result["kept"] += 1
+                continue
+            size = os.path.getsize(path) if dry_run else _remove(path)
+            result["files"] += 1
+            result["bytes"] += size
+    return result
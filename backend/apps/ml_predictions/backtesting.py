@@ -0,0 +1,210 @@
+# /backend/apps/ml_predictions/backtesting.py
+"""
+滚动原点（rolling-origin）回测。
+
+对每个货币只从数据库读取一次价格序列，然后在多个时间原点上切分训练集和紧随其后的
+horizon 天测试集，把每个 (引擎, 原点) 组合作为独立作业交给进程池并行执行，
+最后汇总 MAE / MAPE / 区间覆盖率以及训练、预测耗时，写入该货币激活模型的
+PredictionModel.metrics["backtest"]。
+
+山寨币的 Prophet 回测在测试期把训练集最后一天的比特币价格向前延续作为外部特征，
+不使用测试期真实的比特币价格，避免前视偏差让带外部特征的候选在评分和超参数搜索中占优。
+每个折的训练集按与正式训练相同的训练窗口（ML_TRAINING_LOOKBACK_DAYS / ML_TRAINING_MAX_ROWS
+或货币上的覆盖值）截取，以原点为窗口终点，评估的数据量与上线后训练时一致。
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django import db
+
+from apps.market_data.models import Currency, PredictionModel
+from apps.market_data.timeseries import load_price_frames, trim_frame
+
+from .engines import ENGINES, get_engine
+from .feature_store import BITCOIN_GECKO_ID
+from .tasks import _training_window
+
+# 最少需要的训练样本数，与训练任务保持一致
+MIN_TRAIN_ROWS = 50
+
+# 进程池中每个工作进程持有一份全部货币的序列，作业只传递货币ID
+_worker_series = {}
+
+
+def _init_worker(series):
+    _worker_series.update(series)
+
+
+def rolling_origins(n_rows, horizon, folds, min_train=MIN_TRAIN_ROWS):
+    """
+    返回各个回测原点（训练集结束位置，不含）。
+    最后一个原点的测试集恰好覆盖序列末尾，之前的原点依次向前移动 horizon 步。
+    """
+    origins = [n_rows - horizon * (k + 1) for k in range(folds)]
+    return sorted(origin for origin in origins if origin >= min_train)
+
+
+def evaluate_fold(engine_name, params, currency_id, origin, horizon):
+    """
+    在单个原点上训练并评估一个引擎，返回该折的误差和耗时。
+    该函数在进程池中执行，只读取工作进程内的序列，不访问数据库。
+    """
+    ds, y, btc_price, (lookback_days, max_rows) = _worker_series[currency_id]
+    frame = pd.DataFrame({"ds": ds, "y": y})
+    engine = get_engine(engine_name, **params)
+    if btc_price is not None and engine.supports_regressors:
+        frame["btc_price"] = btc_price
+        engine.add_regressor("btc_price")
+
+    train = trim_frame(
+        frame.iloc[:origin],
+        lookback_days=lookback_days,
+        max_rows=max_rows,
+        end=frame["ds"].iloc[origin - 1],
+    )
+    test = frame.iloc[origin : origin + horizon].copy()
+    if "btc_price" in test:
+        # 测试期看不到未来的比特币价格，沿用训练集最后一个值
+        test["btc_price"] = train["btc_price"].iloc[-1]
+
+    started = time.perf_counter()
+    engine.fit(train)
+    fitted_at = time.perf_counter()
+    forecast = engine.predict(test.drop(columns="y"))
+    predicted_at = time.perf_counter()
+
+    actual = test["y"].to_numpy()
+    yhat = forecast["yhat"].to_numpy()
+    lower = forecast["yhat_lower"].to_numpy()
+    upper = forecast["yhat_upper"].to_numpy()
+    return {
+        "abs_errors": np.abs(actual - yhat).tolist(),
+        "pct_errors": (np.abs(actual - yhat) / np.abs(actual) * 100).tolist(),
+        "covered": ((actual >= lower) & (actual <= upper)).tolist(),
+        "fit_seconds": fitted_at - started,
+        "predict_seconds": predicted_at - fitted_at,
+    }
+
+
+def summarize_folds(results):
+    """把多个折的结果汇总为一组指标。"""
+    abs_errors = np.concatenate([r["abs_errors"] for r in results])
+    pct_errors = np.concatenate([r["pct_errors"] for r in results])
+    covered = np.concatenate([r["covered"] for r in results])
+    return {
+        "mae": round(float(abs_errors.mean()), 6),
+        "mape": round(float(pct_errors.mean()), 4),
+        "coverage": round(float(covered.mean()), 4),
+        "fit_seconds": round(float(np.mean([r["fit_seconds"] for r in results])), 4),
+        "predict_seconds": round(
+            float(np.mean([r["predict_seconds"] for r in results])), 4
+        ),
+        "folds": len(results),
+    }
+
+
+def load_backtest_series(currencies):
+    """
+    一次查询读取所有待回测货币（以及比特币）的价格序列，
+    返回 {currency_id: (ds, y, btc_price 或 None, 训练窗口 (lookback_days, max_rows))}。
+    """
+    btc = Currency.objects.filter(coingecko_id=BITCOIN_GECKO_ID).first()
+    ids = {currency.id for currency in currencies}
+    if btc:
+        ids.add(btc.id)
+    frames = load_price_frames(ids)
+    btc_frame = frames.get(btc.id) if btc else None
+
+    series = {}
+    for currency in currencies:
+        frame = frames.get(currency.id)
+        if frame is None:
+            continue
+        btc_price = None
+        if btc_frame is not None and currency.id != btc.id:
+            frame = frame.merge(
+                btc_frame.rename(columns={"y": "btc_price"}), on="ds", how="inner"
+            )
+            btc_price = frame["btc_price"].to_numpy()
+        series[currency.id] = (
+            frame["ds"].to_numpy(),
+            frame["y"].to_numpy(),
+            btc_price,
+            _training_window(currency),
+        )
+    return series
+
+
+def run_backtests(currencies, engines=None, folds=5, horizon=3, workers=None):
+    """
+    对给定货币和引擎执行并行回测，返回 {currency_id: {engine: 指标}}，
+    并把结果写入各货币激活模型的 metrics["backtest"]。
+    """
+    engines = engines or list(ENGINES)
+    currencies = list(currencies)
+    series = load_backtest_series(currencies)
+
+    # fork 出的子进程不能复用父进程的数据库连接
+    db.connections.close_all()
+
+    jobs = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(series,)
+    ) as executor:
+        for currency in currencies:
+            if currency.id not in series:
+                continue
+            params = currency.forecast_params or {}
+            n_rows = len(series[currency.id][1])
+            for origin in rolling_origins(n_rows, horizon, folds):
+                for engine_name in engines:
+                    engine_params = (
+                        params if engine_name == currency.forecast_engine else {}
+                    )
+                    future = executor.submit(
+                        evaluate_fold,
+                        engine_name,
+                        engine_params,
+                        currency.id,
+                        origin,
+                        horizon,
+                    )
+                    jobs.setdefault((currency.id, engine_name), []).append(future)
+
+        results = {}
+        for (currency_id, engine_name), futures in jobs.items():
+            fold_results = []
+            for future in futures:
+                try:
+                    fold_results.append(future.result())
+                except Exception as e:
+                    print(f"🛑 货币 {currency_id} 的 {engine_name} 回测折失败: {e}")
+            if fold_results:
+                results.setdefault(currency_id, {})[engine_name] = summarize_folds(
+                    fold_results
+                )
+
+    evaluated_at = datetime.now(dt_timezone.utc).isoformat()
+    for currency_id, engine_metrics in results.items():
+        active_run = (
+            PredictionModel.objects.filter(currency_id=currency_id, is_active=True)
+            .order_by("-version")
+            .first()
+        )
+        if active_run is None:
+            continue
+        active_run.metrics = {
+            **(active_run.metrics or {}),
+            "backtest": {
+                "evaluated_at": evaluated_at,
+                "horizon": horizon,
+                "engines": engine_metrics,
+            },
+        }
+        active_run.save(update_fields=["metrics"])
+
+    return results
@@ -0,0 +1,494 @@
+# /backend/apps/ml_predictions/engines.py
+"""
+可插拔的预测引擎。
+
+所有引擎对外暴露与 Prophet 相同的使用方式：用包含 ds、y 两列（以及可选的外部特征列）
+的 DataFrame 训练，用 make_future_dataframe() 生成的时间点预测，返回包含
+ds、yhat、yhat_lower、yhat_upper 的 DataFrame，因此可以直接写入 PricePrediction。
+
+除 Prophet 外，这里还提供几个纯 NumPy 实现的轻量引擎，训练耗时在毫秒级，
+适合短期（3天）预测：
+    - holt:  Brown 双重指数平滑（EWMA + 线性趋势），平滑系数按一步预测误差网格搜索
+    - ar:    对数收益率上的 AR(p) 模型，最小二乘求解
+    - drift: 朴素漂移模型（最后观测值 + 历史平均斜率）
+    - global_ridge: 所有货币共享滞后系数的全局岭回归（见 global_model.py）
+"""
+
+import os
+from collections import OrderedDict
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# 与 Prophet 默认 interval_width=0.8 对应的标准正态分位数
+INTERVAL_Z = 1.2816
+# 每个进程缓存的已加载模型数量
+ENGINE_CACHE_SIZE = 16
+
+# 进程内模型缓存：{模型文件路径: (文件修改时间, 引擎实例)}
+_engine_cache = OrderedDict()
+
+
+class ForecastEngine:
+    """预测引擎基类。"""
+
+    name = None
+    # 是否支持外部特征（如比特币价格）
+    supports_regressors = False
+    # 是否支持组件图分解（趋势、季节性等）
+    supports_components = False
+
+    def __init__(self, **params):
+        self.params = params
+
+    @property
+    def regressors(self):
+        return []
+
+    def add_regressor(self, name):
+        raise NotImplementedError(f"{self.name} 引擎不支持外部特征")
+
+    def fit(self, df):
+        raise NotImplementedError
+
+    def make_future_dataframe(self, periods, freq="D"):
+        raise NotImplementedError
+
+    def predict(self, future_df):
+        raise NotImplementedError
+
+    def update(self, df):
+        """
+        用最新数据重新锚定预测起点，不重新搜索参数，供不重新训练的预测刷新使用。
+        默认不做任何事，模型照原样外推。
+        """
+        return self
+
+    def configure_prediction(self, uncertainty_samples=None, analytic_intervals=False):
+        """
+        按预测成本配置调整预测方式。
+        轻量引擎的预测区间本身就是按残差解析计算的，默认无需调整。
+        """
+
+
+class ProphetEngine(ForecastEngine):
+    """对 Prophet 的封装。"""
+
+    name = "prophet"
+    supports_regressors = True
+    supports_components = True
+
+    def __init__(self, model=None, **params):
+        super().__init__(**params)
+        if model is None:
+            from prophet import Prophet
+
+            model = Prophet(**{"daily_seasonality": False, **params})
+        self.model = model
+        self.analytic_intervals = False
+        self._sigma = None
+
+    @property
+    def regressors(self):
+        return list(self.model.extra_regressors)
+
+    def add_regressor(self, name):
+        self.model.add_regressor(name)
+
+    def fit(self, df):
+        self.model.fit(df)
+        self._sigma = None
+        return self
+
+    def make_future_dataframe(self, periods, freq="D"):
+        return self.model.make_future_dataframe(periods=periods, freq=freq)
+
+    def configure_prediction(self, uncertainty_samples=None, analytic_intervals=False):
+        if uncertainty_samples is not None:
+            self.model.uncertainty_samples = uncertainty_samples
+        self.analytic_intervals = analytic_intervals
+        if analytic_intervals:
+            # 解析区间不需要不确定性采样
+            self.model.uncertainty_samples = 0
+
+    def _residual_sigma(self):
+        """训练集上的残差标准差，只做一次不含采样的历史预测，结果随模型一起保存。"""
+        if getattr(self, "_sigma", None) is None:
+            samples = self.model.uncertainty_samples
+            self.model.uncertainty_samples = 0
+            try:
+                fitted = self.model.predict()
+            finally:
+                self.model.uncertainty_samples = samples
+            residuals = self.model.history["y"].to_numpy() - fitted["yhat"].to_numpy()
+            self._sigma = float(residuals.std())
+        return self._sigma
+
+    def predict(self, future_df):
+        forecast = self.model.predict(future_df)
+        if getattr(self, "analytic_intervals", False):
+            # 历史区间取残差标准差，未来区间按距训练集末尾的天数平方根放大
+            last_ds = self.model.history["ds"].max()
+            days = ((forecast["ds"] - last_ds).dt.total_seconds() / 86400).clip(lower=0)
+            sigma = self._residual_sigma() * np.sqrt(1 + days.to_numpy())
+            z = NormalDist().inv_cdf(0.5 + self.model.interval_width / 2)
+            forecast["yhat_lower"] = forecast["yhat"] - z * sigma
+            forecast["yhat_upper"] = forecast["yhat"] + z * sigma
+        elif not self.model.uncertainty_samples:
+            forecast["yhat_lower"] = forecast["yhat"]
+            forecast["yhat_upper"] = forecast["yhat"]
+        return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+
+class NumpyEngine(ForecastEngine):
+    """
+    轻量引擎的公共部分：保存训练期的一步预测拟合值和残差标准差，
+    预测时历史时间点返回拟合值，未来时间点按步数 h 调用 _forecast(h)。
+    """
+
+    def fit(self, df):
+        self._history_ds = pd.DatetimeIndex(df["ds"]).to_numpy()
+        y = df["y"].to_numpy(dtype="float64")
+        # 以历史时间间隔的中位数作为数据频率
+        self._step = (
+            np.median(np.diff(self._history_ds))
+            if len(self._history_ds) > 1
+            else np.timedelta64(1, "D")
+        )
+        self._history_y = y
+        self._fitted = self._fit(y)
+        residuals = (y - self._fitted)[np.isfinite(self._fitted)]
+        self._sigma = float(residuals.std()) if len(residuals) > 1 else 0.0
+        return self
+
+    def update(self, df):
+        # 轻量引擎的训练本身只需毫秒，直接在最新数据上按已选参数重新拟合
+        return self.fit(df)
+
+    def _fit(self, y):
+        """训练模型并返回历史每个时间点的一步预测拟合值（无法拟合的位置为 NaN）。"""
+        raise NotImplementedError
+
+    def _forecast(self, steps):
+        """返回未来第 steps 步（int 数组，>=1）的 (预测值, 预测标准差)。"""
+        raise NotImplementedError
+
+    def make_future_dataframe(self, periods, freq="D"):
+        future = pd.date_range(
+            start=self._history_ds[-1], periods=periods + 1, freq=freq
+        )[1:]
+        return pd.DataFrame({"ds": np.concatenate([self._history_ds, future])})
+
+    def predict(self, future_df):
+        ds = pd.DatetimeIndex(future_df["ds"]).to_numpy()
+        steps = np.rint((ds - self._history_ds[-1]) / self._step).astype("int64")
+
+        yhat = np.empty(len(ds), dtype="float64")
+        sigma = np.full(len(ds), self._sigma, dtype="float64")
+
+        in_history = steps <= 0
+        positions = np.clip(
+            np.searchsorted(self._history_ds, ds[in_history]),
+            0,
+            len(self._history_ds) - 1,
+        )
+        fitted = self._fitted[positions]
+        # 最初几个无法拟合的时间点直接使用观测值
+        yhat[in_history] = np.where(
+            np.isfinite(fitted), fitted, self._history_y[positions]
+        )
+
+        if (~in_history).any():
+            yhat[~in_history], sigma[~in_history] = self._forecast(steps[~in_history])
+
+        return pd.DataFrame(
+            {
+                "ds": ds,
+                "yhat": yhat,
+                "yhat_lower": yhat - INTERVAL_Z * sigma,
+                "yhat_upper": yhat + INTERVAL_Z * sigma,
+            }
+        )
+
+
+class HoltEngine(NumpyEngine):
+    """Brown 双重指数平滑：两次 EWMA 得到水平和线性趋势，全程向量化。"""
+
+    name = "holt"
+    ALPHA_GRID = np.linspace(0.1, 0.9, 17)
+
+    def _smooth(self, y, alpha):
+        first = pd.Series(y).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        second = pd.Series(first).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        level = 2 * first - second
+        trend = alpha / (1 - alpha) * (first - second)
+        return level, trend
+
+    def _fit(self, y):
+        alphas = [self.params["alpha"]] if "alpha" in self.params else self.ALPHA_GRID
+        best = None
+        for alpha in alphas:
+            level, trend = self._smooth(y, alpha)
+            # t 时刻的一步预测来自 t-1 时刻的水平与趋势
+            fitted = np.concatenate([[np.nan], (level + trend)[:-1]])
+            sse = np.nansum((y - fitted) ** 2)
+            if best is None or sse < best[0]:
+                best = (sse, alpha, level[-1], trend[-1], fitted)
+
+        _, self.alpha, self._level, self._trend, fitted = best
+        return fitted
+
+    def update(self, df):
+        # 沿用训练时选出的平滑系数，不再做网格搜索
+        self.params = {**self.params, "alpha": self.alpha}
+        return self.fit(df)
+
+    def _forecast(self, steps):
+        yhat = self._level + steps * self._trend
+        # 指数平滑的 h 步预测方差近似随 h 线性增长
+        sigma = self._sigma * np.sqrt(1 + (steps - 1) * self.alpha**2)
+        return yhat, sigma
+
+
+class ARLeastSquaresEngine(NumpyEngine):
+    """对数收益率上的 AR(p) 模型，用滞后矩阵一次最小二乘求解。"""
+
+    name = "ar"
+
+    def _fit(self, y):
+        order = int(self.params.get("order", 5))
+        log_y = np.log(y)
+        returns = np.diff(log_y)
+        order = max(1, min(order, len(returns) // 4))
+
+        lags = np.lib.stride_tricks.sliding_window_view(returns[:-1], order)[:, ::-1]
+        design = np.column_stack([np.ones(len(lags)), lags])
+        target = returns[order:]
+        self._coef, *_ = np.linalg.lstsq(design, target, rcond=None)
+        self._order = order
+        self._last_log = log_y[-1]
+        self._recent_returns = returns[-order:][::-1]
+
+        fitted_returns = design @ self._coef
+        return_residuals = target - fitted_returns
+        self._return_sigma = (
+            float(return_residuals.std()) if len(return_residuals) > 1 else 0.0
+        )
+
+        fitted = np.full(len(y), np.nan)
+        # returns[k] 是 y[k] -> y[k+1] 的收益，target 从 returns[order] 开始
+        fitted[order + 1 :] = np.exp(log_y[order:-1] + fitted_returns)
+        return fitted
+
+    def _forecast(self, steps):
+        horizon = int(steps.max())
+        history = list(self._recent_returns)
+        predicted_returns = []
+        for _ in range(horizon):
+            next_return = self._coef[0] + np.dot(self._coef[1:], history[: self._order])
+            predicted_returns.append(next_return)
+            history.insert(0, next_return)
+
+        cumulative = np.cumsum(predicted_returns)
+        log_yhat = self._last_log + cumulative[steps - 1]
+        yhat = np.exp(log_yhat)
+        # 收益率方差按步数累加，再近似换算回价格尺度
+        sigma = yhat * self._return_sigma * np.sqrt(steps)
+        return yhat, sigma
+
+
+class NaiveDriftEngine(NumpyEngine):
+    """朴素漂移模型：最后观测值加上历史平均每步变化量。"""
+
+    name = "drift"
+
+    def _fit(self, y):
+        self._last = y[-1]
+        self._drift = (y[-1] - y[0]) / (len(y) - 1) if len(y) > 1 else 0.0
+        self._n = len(y)
+        return np.concatenate([[np.nan], y[:-1] + self._drift])
+
+    def _forecast(self, steps):
+        yhat = self._last + steps * self._drift
+        sigma = self._sigma * np.sqrt(steps * (1 + steps / self._n))
+        return yhat, sigma
+
+
+def lag_design(z, order):
+    """返回 (滞后矩阵, 目标)：第 t 行为 z[t-1], ..., z[t-order]，目标为 z[t]。"""
+    lags = np.lib.stride_tricks.sliding_window_view(z[:-1], order)[:, ::-1]
+    return lags, z[order:]
+
+
+def standardize_returns(y, scale=None):
+    """
+    返回 (对数价格, 按波动率标准化的对数收益率, 波动率)。
+    未给定 scale 时以该序列对数收益率的标准差作为波动率。
+    """
+    log_y = np.log(np.asarray(y, dtype="float64"))
+    returns = np.diff(log_y)
+    if scale is None:
+        scale = float(returns.std()) or 1.0
+    return log_y, returns / scale, scale
+
+
+def solve_ridge_ar(blocks, order, l2):
+    """
+    在多个序列上联合求解带各自截距的岭回归 AR：所有序列共享滞后系数，每个序列一个截距。
+
+    blocks 为 [(滞后矩阵, 目标), ...]。截距对应的独热列不显式展开，而是直接累加
+    正规方程的分块（L'L、L'y、各序列的列和、行数），求解规模只有 (order + 序列数) 维。
+    返回 (共享系数, 各序列截距数组)。
+    """
+    n_series = len(blocks)
+    lhs = np.zeros((order + n_series, order + n_series))
+    rhs = np.zeros(order + n_series)
+    for index, (lags, target) in enumerate(blocks):
+        column = order + index
+        lhs[:order, :order] += lags.T @ lags
+        rhs[:order] += lags.T @ target
+        lhs[column, :order] = lhs[:order, column] = lags.sum(axis=0)
+        lhs[column, column] = len(target)
+        rhs[column] = target.sum()
+
+    # 只惩罚共享的滞后系数，截距只加一个极小的数保证可解
+    lhs[np.diag_indices(order)] += l2
+    lhs[np.arange(order, order + n_series), np.arange(order, order + n_series)] += 1e-9
+    solution = np.linalg.solve(lhs, rhs)
+    return solution[:order], solution[order:]
+
+
+class GlobalRidgeEngine(NumpyEngine):
+    """
+    全局岭回归引擎：对数收益率按各货币自身的波动率标准化后，所有货币共享一组滞后系数，
+    每个货币只保留自己的截距和波动率。共享系数由 global_model.fit_global_ridge 在全部货币上
+    一次求解后传入；没有共享系数时（例如回测或单独训练某个货币）退化为该货币自身的岭回归 AR。
+    """
+
+    name = "global_ridge"
+    DEFAULT_ORDER = 7
+    DEFAULT_L2 = 1.0
+
+    def __init__(self, coef=None, intercept=None, scale=None, **params):
+        super().__init__(**params)
+        self._coef = None if coef is None else np.asarray(coef, dtype="float64")
+        self._intercept = intercept
+        self._scale = scale
+
+    @property
+    def order(self):
+        return int(self.params.get("order", self.DEFAULT_ORDER))
+
+    def _fit(self, y):
+        order = self.order
+        log_y, z, self._scale = standardize_returns(y, self._scale)
+        if len(z) <= order + 1:
+            raise ValueError(f"数据过少，无法拟合 {order} 阶全局岭回归")
+
+        lags, target = lag_design(z, order)
+        if self._coef is None:
+            l2 = float(self.params.get("l2", self.DEFAULT_L2))
+            self._coef, intercepts = solve_ridge_ar([(lags, target)], order, l2)
+            self._intercept = float(intercepts[0])
+
+        fitted_z = self._intercept + lags @ self._coef
+        residuals = target - fitted_z
+        self._return_sigma = (
+            float(residuals.std()) * self._scale if len(residuals) > 1 else 0.0
+        )
+        self._last_log = log_y[-1]
+        self._recent = z[-order:][::-1]
+
+        fitted = np.full(len(y), np.nan)
+        fitted[order + 1 :] = np.exp(log_y[order:-1] + fitted_z * self._scale)
+        return fitted
+
+    def _forecast(self, steps):
+        yhat, sigma = forecast_ridge_batch([self], int(steps.max()))
+        return yhat[0, steps - 1], sigma[0, steps - 1]
+
+
+def forecast_ridge_batch(engines, periods):
+    """
+    对多个已拟合的 GlobalRidgeEngine 一次性递推预测未来 periods 步。
+    所有货币的滞后状态堆叠成矩阵，每一步只需一次矩阵乘法。
+    返回形状均为 (货币数, periods) 的 (预测值, 预测标准差)。
+    """
+    coef = engines[0]._coef
+    order = len(coef)
+    recent = np.vstack([engine._recent for engine in engines])
+    intercept = np.array([engine._intercept for engine in engines])
+    scale = np.array([engine._scale for engine in engines])
+    last_log = np.array([engine._last_log for engine in engines])
+    return_sigma = np.array([engine._return_sigma for engine in engines])
+
+    predicted = np.empty((len(engines), periods))
+    for step in range(periods):
+        next_z = intercept + recent[:, :order] @ coef
+        predicted[:, step] = next_z
+        recent = np.column_stack([next_z, recent[:, : order - 1]])
+
+    log_yhat = last_log[:, None] + np.cumsum(predicted * scale[:, None], axis=1)
+    yhat = np.exp(log_yhat)
+    # 与 AR 引擎一致：收益率方差按步数累加，再近似换算回价格尺度
+    sigma = yhat * return_sigma[:, None] * np.sqrt(np.arange(1, periods + 1))
+    return yhat, sigma
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (
+        ProphetEngine,
+        HoltEngine,
+        ARLeastSquaresEngine,
+        NaiveDriftEngine,
+        GlobalRidgeEngine,
+    )
+}
+
+
+def get_engine(name, **params):
+    """按名称创建预测引擎实例。"""
+    try:
+        engine_class = ENGINES[name]
+    except KeyError:
+        raise ValueError(f"未知的预测引擎: {name}")
+    return engine_class(**params)
+
+
+def load_engine(path):
+    """
+    加载预测引擎：模型存储中的压缩 JSON 文件，或早期版本的 joblib 文件。
+    更早的版本直接保存的是 Prophet 对象，这里统一包装为 ProphetEngine。
+    """
+    from .artifacts import ARTIFACT_SUFFIX, load_artifact
+
+    if path.endswith(ARTIFACT_SUFFIX):
+        return load_artifact(path)
+
+    import joblib
+
+    obj = joblib.load(path)
+    if isinstance(obj, ForecastEngine):
+        return obj
+    return ProphetEngine(model=obj)
+
+
+def load_cached_engine(path):
+    """
+    带进程内缓存的 load_engine：以文件修改时间判断缓存是否失效，
+    同一个模型文件在一个进程里只反序列化一次。
+    """
+    mtime = os.path.getmtime(path)
+    cached = _engine_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        _engine_cache.move_to_end(path)
+        return cached[1]
+
+    engine = load_engine(path)
+    _engine_cache[path] = (mtime, engine)
+    _engine_cache.move_to_end(path)
+    while len(_engine_cache) > ENGINE_CACHE_SIZE:
+        _engine_cache.popitem(last=False)
+    return engine
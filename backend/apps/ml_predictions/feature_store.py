@@ -0,0 +1,146 @@
+# /backend/apps/ml_predictions/feature_store.py
+"""
+比特币特征存储。
+
+所有山寨币模型都使用比特币价格作为外部特征：训练时需要比特币的历史收盘价，
+预测未来时需要比特币模型的预测值。这里把这两组数据在每次流水线运行中只从
+数据库读取一次，保存为以比特币模型版本为键的压缩 NumPy 文件，供所有山寨币
+训练任务和组件图接口直接读取。
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from apps.market_data.models import PredictionModel, PricePrediction
+from apps.market_data.timeseries import load_price_arrays
+
+BITCOIN_GECKO_ID = "bitcoin"
+FEATURES_DIR = os.path.join(settings.BASE_DIR, "features")
+os.makedirs(FEATURES_DIR, exist_ok=True)
+# 磁盘上保留的特征文件数量（当前版本 + 上一个版本）
+FEATURE_FILES_TO_KEEP = 2
+
+# 进程内缓存：{(比特币模型版本, 文件修改时间): (历史特征DataFrame, 预测特征DataFrame)}
+# 预测刷新会在同一版本下重新物化特征文件，因此缓存键包含文件修改时间
+_loaded_features = {}
+
+
+def _feature_path(version):
+    return os.path.join(FEATURES_DIR, f"btc_features_v{version}.npz")
+
+
+def get_active_btc_run():
+    """返回比特币当前激活的模型运行，不存在时抛出 PredictionModel.DoesNotExist。"""
+    return PredictionModel.objects.filter(
+        currency__coingecko_id=BITCOIN_GECKO_ID, is_active=True
+    ).latest("version")
+
+
+def _to_naive_utc_ns(times):
+    """将带时区的 datetime 序列转换为 UTC 无时区的 int64 纳秒时间戳数组。"""
+    return pd.to_datetime(times, utc=True).tz_localize(None).asi8
+
+
+def _mtime_or_zero(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0
+
+
+def materialize_btc_features(btc_run=None):
+    """
+    从数据库读取比特币历史收盘价与指定模型运行的预测值，写入特征文件。
+    返回该特征文件对应的比特币模型版本。
+    """
+    btc_run = btc_run or get_active_btc_run()
+
+    hist_epoch_us, hist_prices = load_price_arrays([btc_run.currency_id]).get(
+        btc_run.currency_id, (np.empty(0, "int64"), np.empty(0, "float64"))
+    )
+    pred_rows = list(
+        PricePrediction.objects.filter(model_run=btc_run)
+        .order_by("time")
+        .values_list("time", "predicted_price")
+    )
+    if not pred_rows:
+        raise ValueError(f"比特币模型 v{btc_run.version} 没有预测数据")
+    pred_times, pred_prices = zip(*pred_rows)
+
+    path = _feature_path(btc_run.version)
+    # 并行的山寨币任务可能同时物化同一个文件，每个进程写自己的临时文件
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as fh:
+            np.savez_compressed(
+                fh,
+                hist_ds=hist_epoch_us * 1000,
+                hist_price=hist_prices,
+                pred_ds=_to_naive_utc_ns(pred_times),
+                pred_price=np.asarray(pred_prices, dtype="float64"),
+            )
+        # 原子替换，避免其他进程读到写了一半的文件
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    stale_files = sorted(
+        glob.glob(os.path.join(FEATURES_DIR, "btc_features_v*.npz")),
+        key=_mtime_or_zero,
+        reverse=True,
+    )[FEATURE_FILES_TO_KEEP:]
+    for stale_path in stale_files:
+        try:
+            os.remove(stale_path)
+        except FileNotFoundError:
+            # 其他进程已经删除
+            pass
+
+    print(
+        f"✅ 比特币特征已物化 (v{btc_run.version}): 历史 {len(hist_prices)} 条, "
+        f"预测 {len(pred_rows)} 条 -> {path}"
+    )
+    return btc_run.version
+
+
+def load_btc_features(btc_run=None):
+    """
+    读取比特币特征，返回 (历史特征, 预测特征) 两个 DataFrame，列均为 ds 和 btc_price。
+    特征文件不存在时（例如单独训练某个山寨币）会先从数据库物化一次。
+    """
+    btc_run = btc_run or get_active_btc_run()
+    path = _feature_path(btc_run.version)
+    if not os.path.exists(path):
+        try:
+            materialize_btc_features(btc_run)
+        except OSError:
+            # 另一个进程同时物化并替换了同一个文件时，直接读取它写好的文件
+            if not os.path.exists(path):
+                raise
+
+    key = (btc_run.version, os.path.getmtime(path))
+    if key in _loaded_features:
+        return _loaded_features[key]
+
+    with np.load(path) as blob:
+        df_hist = pd.DataFrame(
+            {
+                "ds": pd.to_datetime(blob["hist_ds"]),
+                "btc_price": blob["hist_price"],
+            }
+        )
+        df_pred = pd.DataFrame(
+            {
+                "ds": pd.to_datetime(blob["pred_ds"]),
+                "btc_price": blob["pred_price"],
+            }
+        )
+
+    _loaded_features.clear()
+    _loaded_features[key] = (df_hist, df_pred)
+    return df_hist, df_pred
@@ -0,0 +1,93 @@
+# /backend/apps/ml_predictions/global_model.py
+"""
+全局多序列模型。
+
+逐个货币训练 Prophet 的耗时随货币数量线性增长。全局模型把所有货币的对数收益率按各自
+波动率标准化后合并为一个训练集，一次求解一组共享的滞后系数（外加每个货币一个截距，
+相当于货币的独热嵌入），再把所有货币的滞后状态堆叠成矩阵，一次批量递推出全部预测。
+
+求解后每个货币得到一个 GlobalRidgeEngine（共享系数 + 自己的截距、波动率和最新状态），
+和其他引擎一样单独保存、加载和刷新。
+"""
+
+import pandas as pd
+
+from .engines import (
+    INTERVAL_Z,
+    GlobalRidgeEngine,
+    forecast_ridge_batch,
+    lag_design,
+    solve_ridge_ar,
+    standardize_returns,
+)
+
+
+def fit_global_ridge(frames, order=None, l2=None):
+    """
+    在多个货币上联合训练全局岭回归。
+    frames 为 {currency_id: DataFrame(ds, y)}，返回 {currency_id: 已拟合的 GlobalRidgeEngine}；
+    数据少于滞后阶数的货币会被跳过。
+    """
+    order = order or GlobalRidgeEngine.DEFAULT_ORDER
+    l2 = GlobalRidgeEngine.DEFAULT_L2 if l2 is None else l2
+
+    scales = {}
+    blocks = []
+    for currency_id, frame in frames.items():
+        if len(frame) <= order + 2:
+            continue
+        _, z, scales[currency_id] = standardize_returns(frame["y"].to_numpy())
+        blocks.append(lag_design(z, order))
+    if not blocks:
+        return {}
+
+    coef, intercepts = solve_ridge_ar(blocks, order, l2)
+    engines = {}
+    for (currency_id, scale), intercept in zip(scales.items(), intercepts):
+        engine = GlobalRidgeEngine(
+            coef=coef, intercept=float(intercept), scale=scale, order=order, l2=l2
+        )
+        engines[currency_id] = engine.fit(frames[currency_id])
+    return engines
+
+
+def predict_global(engines, future_dfs):
+    """
+    为多个货币生成预测：未来部分由一次批量递推得到，历史部分直接取各自的拟合值。
+    future_dfs 为 {currency_id: 待预测时间点}，返回 {currency_id: 预测 DataFrame}。
+    """
+    currency_ids = list(engines)
+    history_ends = {
+        currency_id: engines[currency_id]._history_ds[-1]
+        for currency_id in currency_ids
+    }
+    periods = max(
+        int((future_dfs[currency_id]["ds"] > history_ends[currency_id]).sum())
+        for currency_id in currency_ids
+    )
+    if periods:
+        yhat, sigma = forecast_ridge_batch(
+            [engines[currency_id] for currency_id in currency_ids], periods
+        )
+
+    forecasts = {}
+    for row, currency_id in enumerate(currency_ids):
+        future_df = future_dfs[currency_id]
+        in_future = (future_df["ds"] > history_ends[currency_id]).to_numpy()
+        parts = [engines[currency_id].predict(future_df[~in_future])]
+        n_future = int(in_future.sum())
+        if n_future:
+            parts.append(
+                pd.DataFrame(
+                    {
+                        "ds": future_df["ds"].to_numpy()[in_future],
+                        "yhat": yhat[row, :n_future],
+                        "yhat_lower": yhat[row, :n_future]
+                        - INTERVAL_Z * sigma[row, :n_future],
+                        "yhat_upper": yhat[row, :n_future]
+                        + INTERVAL_Z * sigma[row, :n_future],
+                    }
+                )
+            )
+        forecasts[currency_id] = pd.concat(parts, ignore_index=True)
+    return forecasts
@@ -0,0 +1,94 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.market_data.models import Currency
+from apps.ml_predictions.backtesting import run_backtests
+from apps.ml_predictions.engines import ENGINES
+
+
+class Command(BaseCommand):
+    help = "对所有货币执行滚动原点回测，并把指标写入激活模型的 metrics"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--currency",
+            type=str,
+            help="指定货币的coingecko_id，不指定则处理所有货币",
+        )
+        parser.add_argument(
+            "--engines",
+            type=str,
+            default=",".join(ENGINES),
+            help="参与回测的引擎，逗号分隔（默认全部）",
+        )
+        parser.add_argument(
+            "--folds",
+            type=int,
+            default=5,
+            help="回测原点数量（默认5）",
+        )
+        parser.add_argument(
+            "--horizon",
+            type=int,
+            default=3,
+            help="每个原点之后的预测天数（默认3）",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="并行进程数（默认等于CPU核数）",
+        )
+
+    def handle(self, *args, **options):
+        engines = [name.strip() for name in options["engines"].split(",") if name]
+        unknown = [name for name in engines if name not in ENGINES]
+        if unknown:
+            self.stdout.write(self.style.ERROR(f"❌ 未知的引擎: {', '.join(unknown)}"))
+            return
+
+        if options["currency"]:
+            currencies = Currency.objects.filter(coingecko_id=options["currency"])
+            if not currencies.exists():
+                self.stdout.write(
+                    self.style.ERROR(f'❌ 未找到货币: {options["currency"]}')
+                )
+                return
+        else:
+            currencies = Currency.objects.all()
+
+        self.stdout.write(
+            f"开始回测 {len(currencies)} 个货币 × {len(engines)} 个引擎 "
+            f"({options['folds']} 折, 预测 {options['horizon']} 天, "
+            f"{options['workers']} 个进程)..."
+        )
+        started = time.perf_counter()
+        results = run_backtests(
+            currencies,
+            engines=engines,
+            folds=options["folds"],
+            horizon=options["horizon"],
+            workers=options["workers"],
+        )
+        elapsed = time.perf_counter() - started
+
+        for currency in currencies:
+            engine_metrics = results.get(currency.id)
+            if not engine_metrics:
+                self.stdout.write(self.style.WARNING(f"{currency.name}: 数据不足"))
+                continue
+            self.stdout.write(f"\n=== {currency.name} ===")
+            for engine_name, metrics in sorted(
+                engine_metrics.items(), key=lambda item: item[1]["mape"]
+            ):
+                self.stdout.write(
+                    f"  {engine_name:<8} MAE {metrics['mae']:>12.4f}  "
+                    f"MAPE {metrics['mape']:>7.2f}%  "
+                    f"覆盖率 {metrics['coverage']:>5.0%}  "
+                    f"训练 {metrics['fit_seconds']:.3f}s  "
+                    f"预测 {metrics['predict_seconds']:.3f}s"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"\n🎉 回测完成，用时 {elapsed:.1f}s"))
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.ml_predictions.artifacts import GC_GRACE_SECONDS, collect_artifacts
+
+
+class Command(BaseCommand):
+    help = "清理不再使用的模型文件（超出保留数量的未激活版本、遗留的 joblib 文件）"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=settings.ML_MODEL_RUNS_TO_KEEP,
+            help="每个货币保留最近多少个模型运行的文件（默认与 ML_MODEL_RUNS_TO_KEEP 相同）",
+        )
+        parser.add_argument(
+            "--grace-seconds",
+            type=int,
+            default=GC_GRACE_SECONDS,
+            help="跳过最近多少秒内修改过的文件（默认3600）",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="只统计可以删除的文件，不实际删除",
+        )
+
+    def handle(self, *args, **options):
+        result = collect_artifacts(
+            keep=options["keep"],
+            dry_run=options["dry_run"],
+            grace_seconds=options["grace_seconds"],
+        )
+        action = "可删除" if options["dry_run"] else "已删除"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"🧹 {action} {result['files']} 个模型文件, "
+                f"释放 {result['bytes'] / 1024 / 1024:.2f} MiB, "
+                f"保留 {result['kept']} 个"
+            )
+        )
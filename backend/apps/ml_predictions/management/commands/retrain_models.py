@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
+from apps.market_data import caching
 from apps.market_data.models import Currency, PredictionModel, PricePrediction
 from apps.ml_predictions.tasks import train_and_predict_task
 import time
@@ -28,14 +28,9 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         if options["clear_cache"]:
             self.stdout.write("清除缓存...")
-            # 清除所有与预测相关的缓存
-            cache.delete_many(
-                [
-                    key
-                    for key in cache._cache.keys()
-                    if "forecast" in key or "prediction" in key
-                ]
-            )
+            # 递增命名空间代数即可使所有与预测相关的缓存失效
+            caching.invalidate(caching.FORECASTS)
+            caching.invalidate(caching.COMPONENTS)
             self.stdout.write(self.style.SUCCESS("✅ 缓存已清除"))
 
         if options["clear_data"]:
@@ -0,0 +1,111 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.market_data.models import Currency
+from apps.ml_predictions.engines import GlobalRidgeEngine
+from apps.ml_predictions.tuning import build_candidates, tune_currencies
+
+
+class Command(BaseCommand):
+    help = "为每个货币搜索最佳预测引擎和超参数，结果供每晚训练直接复用"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--currency",
+            type=str,
+            help="指定货币的coingecko_id，不指定则处理所有货币",
+        )
+        parser.add_argument(
+            "--folds",
+            type=int,
+            default=6,
+            help="最多使用的回测折数（默认6）",
+        )
+        parser.add_argument(
+            "--horizon",
+            type=int,
+            default=3,
+            help="每个回测折的预测天数（默认3）",
+        )
+        parser.add_argument(
+            "--eta",
+            type=int,
+            default=3,
+            help="每一轮保留 1/eta 的候选（默认3）",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="并行进程数（默认等于CPU核数）",
+        )
+        parser.add_argument(
+            "--max-age-days",
+            type=int,
+            default=30,
+            help="只重新搜索超过该天数未搜索过的货币（默认30天）",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="忽略已缓存的搜索结果，全部重新搜索",
+        )
+
+    def handle(self, *args, **options):
+        currencies = Currency.objects.all()
+        if options["currency"]:
+            currencies = currencies.filter(coingecko_id=options["currency"])
+            if not currencies.exists():
+                self.stdout.write(
+                    self.style.ERROR(f'❌ 未找到货币: {options["currency"]}')
+                )
+                return
+        if not options["force"]:
+            stale_before = timezone.now() - timedelta(days=options["max_age_days"])
+            currencies = currencies.filter(
+                Q(tuned_at__isnull=True) | Q(tuned_at__lt=stale_before)
+            )
+
+        # 使用全局模型的货币与其他货币共同训练，不参与按货币的搜索
+        global_names = list(
+            currencies.filter(forecast_engine=GlobalRidgeEngine.name).values_list(
+                "name", flat=True
+            )
+        )
+        if global_names:
+            self.stdout.write(f"跳过使用全局模型的货币: {', '.join(global_names)}")
+        currencies = list(currencies.exclude(forecast_engine=GlobalRidgeEngine.name))
+        if not currencies:
+            self.stdout.write(self.style.SUCCESS("✅ 所有货币的搜索结果都在有效期内"))
+            return
+
+        self.stdout.write(
+            f"开始为 {len(currencies)} 个货币搜索 {len(build_candidates())} 个候选配置 "
+            f"({options['workers']} 个进程)..."
+        )
+        started = time.perf_counter()
+        winners = tune_currencies(
+            currencies,
+            folds=options["folds"],
+            horizon=options["horizon"],
+            workers=options["workers"],
+            eta=options["eta"],
+        )
+        elapsed = time.perf_counter() - started
+
+        for currency in currencies:
+            winner = winners.get(currency.id)
+            if winner is None:
+                self.stdout.write(self.style.WARNING(f"{currency.name}: 数据不足"))
+                continue
+            self.stdout.write(
+                f"{currency.name}: {winner['engine']} {winner['params']} "
+                f"MAPE {winner['mape']:.2f}% ({winner['folds']} 折)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"\n🎉 搜索完成，用时 {elapsed:.1f}s"))
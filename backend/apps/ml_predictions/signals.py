@@ -0,0 +1,146 @@
+"""
+训练 worker 的预热与任务耗时记录。
+
+每个 prefork 子进程的第一次 Prophet 训练都要付出导入 prophet / cmdstanpy、加载 Stan 模型
+等一次性开销，子进程被回收（max-tasks-per-child / max-memory-per-child）后又会重来一遍。
+开启 ML_WORKER_PRELOAD 后：
+    - worker 主进程在创建子进程前导入 ML 依赖，子进程通过 fork 直接继承
+    - 每个子进程启动时加载 Stan 后端，用一个很小的序列各训练两次，分别记录冷启动与预热后的耗时，
+      再把各货币激活模型的文件预先读入进程内缓存
+另外，训练相关任务每次执行后都会记录耗时，并标明是否为本进程执行的第一个任务，
+便于对比冷、热两种情况下的任务延迟。
+"""
+
+import os
+import time
+
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+)
+from django.conf import settings
+
+# 记录耗时的任务
+TIMED_TASKS = {
+    "apps.ml_predictions.tasks.train_and_predict_task",
+    "apps.ml_predictions.tasks.train_global_model_task",
+    "apps.ml_predictions.tasks.refresh_forecasts_task",
+}
+
+# 本进程内：{task_id: 开始时间}、{任务名: 已执行次数}
+_task_started = {}
+_task_counts = {}
+
+
+def _import_ml_stack():
+    started = time.perf_counter()
+    import cmdstanpy  # noqa: F401
+    import pandas  # noqa: F401
+    import prophet  # noqa: F401
+
+    return time.perf_counter() - started
+
+
+def _tiny_fit():
+    """在一个很小的合成序列上训练一次 Prophet，返回耗时。"""
+    import numpy as np
+    import pandas as pd
+
+    from .engines import ProphetEngine
+
+    frame = pd.DataFrame(
+        {
+            "ds": pd.date_range("2024-01-01", periods=30, freq="D"),
+            # 完全线性的序列会让优化器迭代很久，这里叠加一点确定性的波动
+            "y": 100.0 + np.sin(np.arange(30)),
+        }
+    )
+    started = time.perf_counter()
+    ProphetEngine(uncertainty_samples=0).fit(frame)
+    return time.perf_counter() - started
+
+
+def _preload_active_models():
+    """
+    把最近训练的激活模型文件读入进程内缓存，返回 (加载的模型数, 跳过的模型数)。
+    进程内缓存最多保存 ENGINE_CACHE_SIZE 个模型，超出的部分加载后会立即被淘汰，因此不预加载。
+    """
+    from django import db
+
+    from apps.market_data.models import PredictionModel
+
+    from .engines import ENGINE_CACHE_SIZE, load_cached_engine
+
+    paths = list(
+        dict.fromkeys(
+            PredictionModel.objects.filter(is_active=True)
+            .order_by("-trained_at")
+            .values_list("model_file_path", flat=True)
+        )
+    )
+    skipped = max(len(paths) - ENGINE_CACHE_SIZE, 0)
+    loaded = 0
+    # 从较早的开始加载，最近训练的模型在 LRU 中最新
+    for path in reversed(paths[:ENGINE_CACHE_SIZE]):
+        try:
+            load_cached_engine(path)
+            loaded += 1
+        except Exception as e:
+            print(f"🛑 预加载模型 {path} 失败: {e}")
+    # 不把预热时打开的数据库连接带进任务
+    db.connections.close_all()
+    return loaded, skipped
+
+
+@worker_init.connect
+def preload_ml_stack(**kwargs):
+    """worker 主进程：在 fork 子进程之前导入 ML 依赖。"""
+    if not settings.ML_WORKER_PRELOAD:
+        return
+    print(f"🔥 worker 主进程已导入 ML 依赖，用时 {_import_ml_stack():.2f}s")
+
+
+@worker_process_init.connect
+def warm_worker_process(**kwargs):
+    """worker 子进程：加载 Stan 后端、预热一次训练并预加载激活模型。"""
+    if not settings.ML_WORKER_PRELOAD:
+        return
+    from django import db
+
+    # fork 出的子进程不能复用父进程的数据库连接
+    db.connections.close_all()
+    try:
+        import_seconds = _import_ml_stack()
+        cold_fit = _tiny_fit()
+        warm_fit = _tiny_fit()
+        loaded, skipped = _preload_active_models()
+    except Exception as e:
+        print(f"🛑 worker 子进程 {os.getpid()} 预热失败: {e}")
+        return
+    print(
+        f"🔥 worker 子进程 {os.getpid()} 预热完成: 导入 {import_seconds:.2f}s, "
+        f"首次训练 {cold_fit:.2f}s, 再次训练 {warm_fit:.2f}s, 预加载模型 {loaded} 个"
+        f"（超出缓存容量跳过 {skipped} 个）"
+    )
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, task=None, **kwargs):
+    if task is not None and task.name in TIMED_TASKS:
+        _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_latency(task_id=None, task=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    count = _task_counts[task.name] = _task_counts.get(task.name, 0) + 1
+    state = "冷启动" if count == 1 and not settings.ML_WORKER_PRELOAD else "已预热"
+    print(
+        f"⏱️ [进程 {os.getpid()}] {task.name.rsplit('.', 1)[-1]} "
+        f"第 {count} 次执行用时 {elapsed:.2f}s（{state}）"
+    )
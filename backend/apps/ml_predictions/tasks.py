@@ -1,29 +1,163 @@
-import os
+import copy
+import resource
 import pandas as pd
-from celery import shared_task, chain
+from celery import shared_task, chain, group
 from datetime import datetime, timezone as dt_timezone
-import joblib
-from prophet import Prophet
 import time
 
 from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 
+from apps.api.tasks import warm_forecast_cache_task
+from apps.market_data import caching, events
 from apps.market_data.models import (
-    MarketData,
     Currency,
     PredictionModel,
     PricePrediction,
 )
 
-MODELS_DIR = os.path.join(settings.BASE_DIR, "models")
-os.makedirs(MODELS_DIR, exist_ok=True)
-BITCOIN_GECKO_ID = "bitcoin"
+from apps.market_data.timeseries import (
+    load_price_frame,
+    load_price_frames,
+    trim_frame,
+    window_start,
+)
+
+from .artifacts import remove_unreferenced, save_artifact
+from .engines import GlobalRidgeEngine, get_engine, load_cached_engine
+from .global_model import fit_global_ridge, predict_global
+from .feature_store import (
+    BITCOIN_GECKO_ID,
+    load_btc_features,
+    materialize_btc_features,
+)
+
+# 批量写入预测数据时每条 INSERT 语句包含的行数
+PREDICTION_BULK_BATCH_SIZE = 2000
+
+
+def _forecast_to_predictions(currency, model_record, forecast):
+    """
+    将 Prophet 的预测结果 DataFrame 向量化地转换为 PricePrediction 对象列表，
+    避免逐行 iterrows() 带来的开销。
+    """
+    times = (
+        pd.DatetimeIndex(forecast["ds"]).tz_localize(dt_timezone.utc).to_pydatetime()
+    )
+    values = (
+        forecast[["yhat", "yhat_lower", "yhat_upper"]]
+        .to_numpy(dtype="float64")
+        .round(4)
+        .tolist()
+    )
+    return [
+        PricePrediction(
+            currency=currency,
+            model_run=model_record,
+            time=aware_time,
+            predicted_price=yhat,
+            prediction_lower_bound=yhat_lower,
+            prediction_upper_bound=yhat_upper,
+        )
+        for aware_time, (yhat, yhat_lower, yhat_upper) in zip(times, values)
+    ]
+
+
+def _training_window(currency):
+    """返回货币的训练窗口 (lookback_days, max_rows)，未配置时使用全局配置，None 表示不限制。"""
+    lookback_days = (
+        currency.training_lookback_days or settings.ML_TRAINING_LOOKBACK_DAYS
+    )
+    max_rows = currency.training_max_rows or settings.ML_TRAINING_MAX_ROWS
+    return lookback_days or None, max_rows or None
+
+
+def _training_window_start(currency):
+    """按货币的训练窗口计算训练数据的起始时间。"""
+    lookback_days, max_rows = _training_window(currency)
+    return window_start(currency.id, lookback_days=lookback_days, max_rows=max_rows)
+
+
+def _trim_training_frame(currency, df):
+    """按与 _training_window_start 相同的窗口配置，在内存中截取已读取的序列。"""
+    lookback_days, max_rows = _training_window(currency)
+    return trim_frame(df, lookback_days=lookback_days, max_rows=max_rows)
+
+
+def _downcast_frame(df):
+    """把特征帧中的 float64 列降为 float32，减少训练期间的内存占用。"""
+    if not settings.ML_TRAINING_FLOAT32:
+        return df
+    float_columns = df.select_dtypes("float64").columns
+    return df.astype({column: "float32" for column in float_columns})
+
+
+def _prediction_frame(model, periods):
+    """
+    按预测成本配置生成需要预测的时间点。
+    关闭历史预测时只保留未来 periods 天和最近 ML_PREDICT_OVERLAP_DAYS 天的重叠区间，
+    预测耗时和写入的 PricePrediction 行数都随之减少。
+    """
+    model.configure_prediction(
+        uncertainty_samples=settings.ML_PREDICT_UNCERTAINTY_SAMPLES,
+        analytic_intervals=settings.ML_PREDICT_ANALYTIC_INTERVALS,
+    )
+    future_df = model.make_future_dataframe(periods=periods, freq="D")
+    if not settings.ML_PREDICT_HISTORY:
+        history_end = future_df["ds"].iloc[-1] - pd.Timedelta(days=periods)
+        overlap_start = history_end - pd.Timedelta(
+            days=settings.ML_PREDICT_OVERLAP_DAYS
+        )
+        future_df = future_df[future_df["ds"] > overlap_start].reset_index(drop=True)
+    return future_df
+
+
+def _attach_btc_forecast(future_df, df_btc_hist, df_btc_pred):
+    """
+    为待预测的时间点合并比特币特征：比特币已有真实收盘价的时间点使用历史价格（与训练时一致），
+    之后的时间点使用比特币预测。每个货币最新一根K线的时间戳各不相同，预测时间点通常
+    与比特币的时间点对不上，因此按时间向前对齐，取不晚于该时间点的最近一个比特币值。
+    """
+    if not df_btc_hist.empty:
+        df_btc_pred = df_btc_pred[df_btc_pred["ds"] > df_btc_hist["ds"].max()]
+    df_btc = pd.concat([df_btc_hist, df_btc_pred], ignore_index=True)
+    if df_btc.empty:
+        raise ValueError("没有可用的比特币特征数据")
+    df_btc = df_btc.astype({"ds": "datetime64[ns]", "btc_price": "float64"})
+
+    future_df = pd.merge_asof(
+        future_df.astype({"ds": "datetime64[ns]"}),
+        df_btc.sort_values("ds"),
+        on="ds",
+        direction="backward",
+    )
+    # 早于比特币第一条数据的时间点取第一条比特币数据
+    future_df["btc_price"] = future_df["btc_price"].bfill()
+    return future_df
+
+
+def _current_rss_mib():
+    """
+    当前进程的常驻内存（MiB）。ru_maxrss 是进程整个生命周期的峰值，在长期运行的
+    prefork 子进程里无法反映单个任务，因此读取 /proc/self/statm；非 Linux 系统返回 None。
+    """
+    try:
+        with open("/proc/self/statm") as fh:
+            resident_pages = int(fh.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * resource.getpagesize() / 1024 / 1024
+
+
+def _format_rss_change(before, after):
+    if before is None or after is None:
+        return "RSS 未知"
+    return f"RSS {before:.0f} -> {after:.0f} MiB ({after - before:+.0f} MiB)"
 
 
 @shared_task
-def train_and_predict_task(currency_id, periods=3, max_attempts=3):
+def train_and_predict_task(currency_id, periods=3):
     """
     【全新单体任务】
     为一个指定的货币完成完整的"训练-预测"流程。
@@ -33,47 +167,43 @@ def train_and_predict_task(currency_id, periods=3, max_attempts=3):
         currency = Currency.objects.get(id=currency_id)
         print(f"--- [START] 开始为 {currency.name} 处理训练和预测 ---")
 
-        # 1. 获取数据
-        data = (
-            MarketData.objects.filter(currency=currency)
-            .order_by("time")
-            .values("time", "close")
-        )
-        if len(data) < 50:
+        # 1. 获取训练窗口内的数据
+        rss_before = _current_rss_mib()
+        train_start = _training_window_start(currency)
+        df = _downcast_frame(load_price_frame(currency.id, start=train_start))
+        if len(df) < 50:
             print(f"数据不足，跳过 {currency.name}。")
             return
 
-        df = pd.DataFrame(list(data))
-        df.rename(columns={"time": "ds", "close": "y"}, inplace=True)
-        df["ds"] = df["ds"].dt.tz_localize(None)
-
-        # 2. 训练模型
-        model = Prophet(daily_seasonality=False)
+        # 2. 按货币配置创建预测引擎
+        model = get_engine(currency.forecast_engine, **currency.forecast_params)
+        print(f"🔍 DEBUG: {currency.name} 使用预测引擎: {model.name}")
 
-        # 2.1 如果是山寨币，添加外部特征
-        if currency.coingecko_id != BITCOIN_GECKO_ID:
+        # 2.1 如果是山寨币，添加外部特征（读取本次流水线共享的比特币特征文件）
+        df_btc_hist = df_btc_pred = None
+        if currency.coingecko_id != BITCOIN_GECKO_ID and model.supports_regressors:
             try:
-                # 从数据库查询比特币的历史价格作为训练特征
-                btc_hist_data = MarketData.objects.filter(
-                    currency__coingecko_id=BITCOIN_GECKO_ID
-                ).values("time", "close")
-                df_btc_hist = pd.DataFrame(list(btc_hist_data))
-                df_btc_hist.rename(
-                    columns={"time": "ds", "close": "btc_price"}, inplace=True
-                )
-                df_btc_hist["ds"] = df_btc_hist["ds"].dt.tz_localize(None)
-
-                df = pd.merge(df, df_btc_hist, on="ds", how="left").dropna()
+                df_btc_hist, df_btc_pred = load_btc_features()
+                df = pd.merge(
+                    df, _downcast_frame(df_btc_hist), on="ds", how="left"
+                ).dropna()
                 model.add_regressor("btc_price")
                 print(f"✅ 已为 {currency.name} 添加比特币历史价格作为训练特征。")
             except Exception as e:
                 print(f"🛑 添加比特币特征失败: {e}，将作为单变量模型训练。")
 
+        fit_started = time.perf_counter()
         model.fit(df)
+        fit_seconds = time.perf_counter() - fit_started
         print(f"✅ {currency.name} 的模型训练完成。")
+        print(
+            f"⏱️ {currency.name} 训练: {len(df)} 行 (窗口起点 {train_start or '全部历史'}), "
+            f"特征帧 {df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MiB, "
+            f"训练 {fit_seconds:.2f}s, {_format_rss_change(rss_before, _current_rss_mib())}"
+        )
 
-        # 3. 创建未来数据帧（明确指定日频率）
-        future_df = model.make_future_dataframe(periods=periods, freq="D")
+        # 3. 创建未来数据帧（明确指定日频率），按预测成本配置决定是否包含全部历史
+        future_df = _prediction_frame(model, periods)
         print(
             f"🔍 DEBUG: {currency.name} 未来数据帧范围: {future_df['ds'].min()} 到 {future_df['ds'].max()}"
         )
@@ -81,74 +211,11 @@ def train_and_predict_task(currency_id, periods=3, max_attempts=3):
             f"🔍 DEBUG: {currency.name} 历史数据最新: {df['ds'].max()}, 当前时间: {timezone.now()}"
         )
 
-        # 3.1 如果是山寨币，为未来数据帧添加比特币特征
-        if "btc_price" in model.extra_regressors:
-            # 添加重试逻辑查找比特币预测数据
-            attempts = 0
-            while attempts < max_attempts:
-                try:
-                    btc_currency = Currency.objects.get(coingecko_id=BITCOIN_GECKO_ID)
-                    btc_latest_run = PredictionModel.objects.filter(
-                        currency=btc_currency, is_active=True
-                    ).latest("version")
-                    btc_predictions = PricePrediction.objects.filter(
-                        model_run=btc_latest_run
-                    ).values("time", "predicted_price")
-
-                    if list(btc_predictions):
-                        df_btc_pred = pd.DataFrame(list(btc_predictions))
-                        df_btc_pred.rename(
-                            columns={"time": "ds", "predicted_price": "btc_price"},
-                            inplace=True,
-                        )
-                        df_btc_pred["ds"] = df_btc_pred["ds"].dt.tz_localize(None)
-
-                        future_df = pd.merge(
-                            future_df, df_btc_pred, on="ds", how="left"
-                        )
-                        # 使用向前填充处理缺失值
-                        future_df["btc_price"] = future_df["btc_price"].ffill()
-                        # 如果还有NaN，使用向后填充
-                        future_df["btc_price"] = future_df["btc_price"].bfill()
-                        # 如果仍然有NaN，用最后一个有效值填充
-                        if future_df["btc_price"].isna().any():
-                            last_valid_price = (
-                                future_df["btc_price"].dropna().iloc[-1]
-                                if not future_df["btc_price"].dropna().empty
-                                else 50000
-                            )
-                            future_df["btc_price"] = future_df["btc_price"].fillna(
-                                last_valid_price
-                            )
-                        print(
-                            f"🔍 DEBUG: {currency.name} 合并后数据帧行数: {len(future_df)}"
-                        )
-                        print(
-                            f"✅ 已为 {currency.name} 的未来数据帧添加比特币预测特征。"
-                        )
-                        break
-                    else:
-                        attempts += 1
-                        if attempts < max_attempts:
-                            print(
-                                f"尝试 {attempts}/{max_attempts}: 比特币预测数据尚未准备好，等待10秒后重试..."
-                            )
-                            time.sleep(10)  # 等待10秒后重试
-                        else:
-                            raise ValueError(
-                                f"在{max_attempts}次尝试后仍未找到比特币的预测数据"
-                            )
-                except Exception as e:
-                    attempts += 1
-                    if attempts < max_attempts:
-                        print(
-                            f"尝试 {attempts}/{max_attempts}: 获取比特币数据时出错: {e}，等待10秒后重试..."
-                        )
-                        time.sleep(10)
-                    else:
-                        raise ValueError(
-                            f"在{max_attempts}次尝试后仍未能获取比特币预测数据: {e}"
-                        )
+        # 3.1 如果是山寨币，为未来数据帧添加比特币预测特征
+        if "btc_price" in model.regressors:
+            future_df = _attach_btc_forecast(future_df, df_btc_hist, df_btc_pred)
+            print(f"🔍 DEBUG: {currency.name} 合并后数据帧行数: {len(future_df)}")
+            print(f"✅ 已为 {currency.name} 的未来数据帧添加比特币预测特征。")
 
         # 4. 生成最终预测
         final_forecast = model.predict(future_df)
@@ -160,64 +227,141 @@ def train_and_predict_task(currency_id, periods=3, max_attempts=3):
             f"🔍 DEBUG: {currency.name} 预测时间范围: {final_forecast['ds'].min()} 到 {final_forecast['ds'].max()}"
         )
 
-        # 5. 原子化地保存所有结果
+        # 5. 保存模型文件和预测数据，并激活新版本
+        save_model_run(currency, model, final_forecast)
+
+        print(f"--- [SUCCESS] {currency.name} 的模型和预测数据已全部保存。---")
+
+    except Exception as e:
+        print(f"🛑 处理 {currency.name} 时发生严重错误: {e}")
+
+
+def save_model_run(currency, model, forecast):
+    """
+    在关键区之外保存模型文件，以未激活状态写入新的模型运行及其预测，
+    全部写好后再激活。返回新的 PredictionModel。
+    """
+    model_path = save_artifact(model)
+    print(f"🔍 DEBUG: {currency.name} 模型保存到: {model_path}")
+
+    latest_model_version = (
+        PredictionModel.objects.filter(currency=currency).order_by("-version").first()
+    )
+    new_version = (latest_model_version.version + 1) if latest_model_version else 1
+
+    model_record = PredictionModel.objects.create(
+        currency=currency,
+        model_file_path=model_path,
+        version=new_version,
+        engine=model.name,
+        is_active=False,
+    )
+    print(f"🔍 DEBUG: {currency.name} 模型记录创建 - 版本: {new_version}")
+
+    try:
+        # 保存新预测数据（向量化构建 + 批量插入）
+        write_started = time.perf_counter()
+        predictions = _forecast_to_predictions(currency, model_record, forecast)
+        built_at = time.perf_counter()
         with transaction.atomic():
-            # 保存模型 - 确保每个货币有唯一的模型文件
-            model_path = os.path.join(
-                MODELS_DIR, f"{currency.coingecko_id}_model_v{int(time.time())}.joblib"
-            )
-            joblib.dump(model, model_path)
-            print(f"🔍 DEBUG: {currency.name} 模型保存到: {model_path}")
-
-            # 确保清除旧模型
-            PredictionModel.objects.filter(currency=currency).update(is_active=False)
-            latest_model_version = (
-                PredictionModel.objects.filter(currency=currency)
-                .order_by("-version")
-                .first()
-            )
-            new_version = (
-                (latest_model_version.version + 1) if latest_model_version else 1
+            PricePrediction.objects.bulk_create(
+                predictions, batch_size=PREDICTION_BULK_BATCH_SIZE
             )
+        write_finished = time.perf_counter()
+    except Exception:
+        # 写入失败时移除这个尚未激活的运行，当前激活的模型不受影响
+        model_record.delete()
+        raise
+
+    print(
+        f"⏱️ {currency.name} 写入 {len(predictions)} 条新预测记录: "
+        f"构建 {built_at - write_started:.3f}s, "
+        f"批量插入 {write_finished - built_at:.3f}s"
+    )
+
+    # 激活新版本（单行指针翻转），旧运行交给异步任务分批清理
+    activate_model_run(model_record)
+    print(f"🔍 DEBUG: {currency.name} 已激活模型版本: {new_version}")
+    prune_model_runs_task.delay(currency.id)
+    return model_record
+
+
+def activate_model_run(model_record):
+    """
+    激活一个已写好预测数据的模型运行。
 
-            model_record = PredictionModel.objects.create(
-                currency=currency,
-                model_file_path=model_path,
-                version=new_version,
-                is_active=True,
-            )
-            print(f"🔍 DEBUG: {currency.name} 模型记录创建 - 版本: {new_version}")
+    读取方总是取 is_active=True 中版本号最高的运行，因此把新运行置为激活
+    这一行更新就是真正的切换点；随后在同一个短事务里把旧版本标记为未激活。
+    整个过程不涉及预测数据的删除或重写，读取不会被训练阻塞。
+    """
+    with transaction.atomic():
+        PredictionModel.objects.filter(pk=model_record.pk).update(is_active=True)
+        PredictionModel.objects.filter(
+            currency_id=model_record.currency_id, is_active=True
+        ).exclude(pk=model_record.pk).update(is_active=False)
+    model_record.is_active = True
+
+    # 新版本生效后，使该货币的预测和组件缓存失效
+    coingecko_id = model_record.currency.coingecko_id
+    caching.invalidate(caching.FORECASTS, coingecko_id)
+    caching.invalidate(caching.COMPONENTS, coingecko_id)
+    # 在 analytics 队列中限速预热新版本的接口缓存
+    warm_forecast_cache_task.delay(coingecko_id)
+    # 通知已连接的客户端有新的预测版本
+    events.publish(events.FORECAST, coingecko_id, version=model_record.version)
 
-            # 清除该货币的旧预测数据
-            deleted_count = PricePrediction.objects.filter(
-                model_run__currency=currency
-            ).delete()[0]
-            print(f"🔍 DEBUG: {currency.name} 删除了 {deleted_count} 条旧预测记录")
 
-            # 保存新预测数据（保存完整的预测数据）
-            predictions_created = 0
-            for _, row in final_forecast.iterrows():
-                aware_time = timezone.make_aware(
-                    row["ds"].to_pydatetime(), dt_timezone.utc
-                )
-                PricePrediction.objects.create(
-                    currency=currency,
-                    model_run=model_record,
-                    time=aware_time,
-                    predicted_price=row["yhat"],
-                    prediction_lower_bound=row["yhat_lower"],
-                    prediction_upper_bound=row["yhat_upper"],
-                )
-                predictions_created += 1
+@shared_task
+def prune_model_runs_task(currency_id, keep=None, batch_size=None):
+    """
+    异步分批清理某个货币的旧模型运行及其预测数据。
+    保留当前激活版本在内的最近 keep 个运行，比激活版本更新的运行（可能正在写入）不会被清理。
+    """
+    keep = keep or settings.ML_MODEL_RUNS_TO_KEEP
+    batch_size = batch_size or settings.ML_PRUNE_BATCH_SIZE
 
-            print(
-                f"🔍 DEBUG: {currency.name} 创建了 {predictions_created} 条新预测记录"
+    try:
+        active_run = PredictionModel.objects.filter(
+            currency_id=currency_id, is_active=True
+        ).latest("version")
+    except PredictionModel.DoesNotExist:
+        return "No active model run, nothing to prune"
+
+    stale_runs = dict(
+        PredictionModel.objects.filter(
+            currency_id=currency_id,
+            is_active=False,
+            version__lt=active_run.version,
+        )
+        .order_by("-version")
+        .values_list("id", "model_file_path")[max(keep - 1, 0) :]
+    )
+    stale_run_ids = list(stale_runs)
+
+    deleted_predictions = 0
+    for run_id in stale_run_ids:
+        while True:
+            batch_ids = list(
+                PricePrediction.objects.filter(model_run_id=run_id).values_list(
+                    "id", flat=True
+                )[:batch_size]
             )
+            if not batch_ids:
+                break
+            deleted_predictions += PricePrediction.objects.filter(
+                id__in=batch_ids
+            ).delete()[0]
+        PredictionModel.objects.filter(id=run_id).delete()
 
-        print(f"--- [SUCCESS] {currency.name} 的模型和预测数据已全部保存。---")
+    # 删除不再被任何运行引用的模型文件
+    removed_files, reclaimed_bytes = remove_unreferenced(stale_runs.values())
 
-    except Exception as e:
-        print(f"🛑 处理 {currency.name} 时发生严重错误: {e}")
+    print(
+        f"🧹 货币 {currency_id}: 清理了 {len(stale_run_ids)} 个旧模型运行, "
+        f"{deleted_predictions} 条旧预测记录, {removed_files} 个模型文件 "
+        f"({reclaimed_bytes / 1024:.1f} KiB)"
+    )
+    return f"Pruned {len(stale_run_ids)} runs, {deleted_predictions} predictions"
 
 
 # --- 【全新】主调度任务 ---
@@ -233,22 +377,43 @@ def run_all_pipelines_task():
         btc = Currency.objects.get(coingecko_id=BITCOIN_GECKO_ID)
         print(f"--- 正在为 {btc.name} 派发任务 ---")
 
-        # 2. 先处理比特币，等待任务完成
-        btc_task = train_and_predict_task.apply_async(args=[btc.id])
-
-        # 3. 获取所有山寨币
-        altcoins = Currency.objects.exclude(coingecko_id=BITCOIN_GECKO_ID)
+        # 2. 获取所有山寨币；使用全局模型的货币由一个全局训练任务统一处理
+        altcoins = Currency.objects.exclude(coingecko_id=BITCOIN_GECKO_ID).exclude(
+            forecast_engine=GlobalRidgeEngine.name
+        )
+        global_ids = list(
+            Currency.objects.filter(forecast_engine=GlobalRidgeEngine.name)
+            .exclude(coingecko_id=BITCOIN_GECKO_ID)
+            .values_list("id", flat=True)
+        )
 
-        # 4. 为每个山寨币创建依赖于比特币任务的预测任务
+        # 3. 任务链：比特币训练 -> 物化比特币特征 -> 并行训练所有山寨币
+        #    山寨币任务读取同一份特征文件，不再各自查询比特币的历史与预测数据
+        altcoin_tasks = []
         for coin in altcoins:
             print(f"--- 为 {coin.name} 创建依赖于比特币的预测任务 ---")
-            # 使用link参数创建任务链，确保山寨币任务仅在比特币任务成功后执行
-            train_and_predict_task.apply_async(
-                args=[coin.id],
-                countdown=5,  # 小延迟以确保比特币数据已完全写入数据库
-                link_error=handle_prediction_error.s(coin.name),
+            altcoin_tasks.append(
+                train_and_predict_task.si(coin.id).on_error(
+                    handle_prediction_error.s(coin.name)
+                )
             )
 
+        if btc.forecast_engine == GlobalRidgeEngine.name:
+            # 比特币也使用全局模型时，全局模型必须先于山寨币完成，以便物化比特币特征
+            btc_task = train_global_model_task.si([btc.id] + global_ids)
+        else:
+            btc_task = train_and_predict_task.si(btc.id)
+            if global_ids:
+                print(
+                    f"--- 为 {len(global_ids)} 个使用全局模型的货币创建一个全局训练任务 ---"
+                )
+                altcoin_tasks.append(train_global_model_task.si(global_ids))
+
+        pipeline = [btc_task, materialize_btc_features_task.si()]
+        if altcoin_tasks:
+            pipeline.append(group(altcoin_tasks))
+        chain(*pipeline).apply_async()
+
         print("--- [MASTER] 所有工作流已派发完毕 ---")
 
     except Currency.DoesNotExist:
@@ -256,6 +421,177 @@ def run_all_pipelines_task():
         return
 
 
+@shared_task
+def materialize_btc_features_task():
+    """在比特币模型激活后，为本次流水线物化一次共享的比特币特征文件。"""
+    try:
+        version = materialize_btc_features()
+        return f"BTC features materialized for v{version}"
+    except Exception as e:
+        # 山寨币任务在找不到特征文件时会自行物化，这里失败不阻断流水线
+        print(f"🛑 物化比特币特征失败: {e}")
+        return f"BTC feature materialization failed: {e}"
+
+
+@shared_task
+def train_global_model_task(currency_ids=None, periods=3):
+    """
+    训练一个覆盖多个货币的全局模型（默认是所有 forecast_engine 为 global_ridge 的货币）。
+
+    一次查询读取全部序列，一次求解共享系数，一次批量递推生成所有货币的未来预测，
+    然后按货币分别写入 PredictionModel 和 PricePrediction 并激活。
+    """
+    currencies = Currency.objects.all()
+    if currency_ids is None:
+        currencies = currencies.filter(forecast_engine=GlobalRidgeEngine.name)
+    else:
+        currencies = currencies.filter(id__in=currency_ids)
+    currencies = {currency.id: currency for currency in currencies}
+    if not currencies:
+        return "No currencies configured for the global model"
+
+    print(f"--- [START] 开始训练覆盖 {len(currencies)} 个货币的全局模型 ---")
+    started = time.perf_counter()
+    frames = {
+        currency_id: _trim_training_frame(currencies[currency_id], frame)
+        for currency_id, frame in load_price_frames(list(currencies)).items()
+    }
+    frames = {
+        currency_id: frame for currency_id, frame in frames.items() if len(frame) >= 50
+    }
+    loaded_at = time.perf_counter()
+
+    engines = fit_global_ridge(frames)
+    fitted_at = time.perf_counter()
+    if not engines:
+        print("全局模型没有足够数据的货币，跳过。")
+        return "No currency has enough data for the global model"
+
+    future_dfs = {
+        currency_id: _prediction_frame(engine, periods)
+        for currency_id, engine in engines.items()
+    }
+    forecasts = predict_global(engines, future_dfs)
+    predicted_at = time.perf_counter()
+    print(
+        f"⏱️ 全局模型: {len(engines)} 个货币, 共 {sum(map(len, frames.values()))} 行, "
+        f"读取 {loaded_at - started:.2f}s, 训练 {fitted_at - loaded_at:.3f}s, "
+        f"批量预测 {predicted_at - fitted_at:.3f}s"
+    )
+
+    saved = 0
+    for currency_id, forecast in forecasts.items():
+        currency = currencies[currency_id]
+        try:
+            save_model_run(currency, engines[currency_id], forecast)
+            saved += 1
+        except Exception as e:
+            print(f"🛑 保存 {currency.name} 的全局模型预测时发生错误: {e}")
+
+    print(f"--- [SUCCESS] 全局模型已为 {saved} 个货币保存预测 ---")
+    return f"Global model saved predictions for {saved} currencies"
+
+
+@shared_task
+def refresh_forecasts_task(currency_id, periods=3):
+    """
+    只预测、不重新训练的预测刷新。
+
+    从进程内缓存加载当前激活的模型，以最新一根K线为起点重新生成未来 periods 天的预测，
+    山寨币使用最新物化的比特币预测作为外部特征，结果按 (time, model_run, currency)
+    覆盖写入当前激活的模型运行。轻量引擎会先在最新数据上重新锚定，Prophet 直接外推。
+    """
+    try:
+        currency = Currency.objects.get(id=currency_id)
+        model_record = PredictionModel.objects.filter(
+            currency=currency, is_active=True
+        ).latest("version")
+    except (Currency.DoesNotExist, PredictionModel.DoesNotExist):
+        print(f"货币 {currency_id} 没有激活的模型，跳过预测刷新。")
+        return f"No active model for currency {currency_id}"
+
+    started = time.perf_counter()
+    # 缓存中的引擎由同一进程内的所有读取方共用，update() 和 configure_prediction() 会修改引擎，
+    # 因此在副本上操作
+    model = copy.deepcopy(load_cached_engine(model_record.model_file_path))
+
+    df = load_price_frame(currency.id, start=_training_window_start(currency))
+    if df.empty:
+        print(f"{currency.name} 没有行情数据，跳过预测刷新。")
+        return f"No market data for {currency.name}"
+    model.update(df)
+    model.configure_prediction(
+        uncertainty_samples=settings.ML_PREDICT_UNCERTAINTY_SAMPLES,
+        analytic_intervals=settings.ML_PREDICT_ANALYTIC_INTERVALS,
+    )
+
+    future_df = pd.DataFrame(
+        {
+            "ds": pd.date_range(start=df["ds"].iloc[-1], periods=periods + 1, freq="D")[
+                1:
+            ]
+        }
+    )
+    if "btc_price" in model.regressors:
+        df_btc_hist, df_btc_pred = load_btc_features()
+        future_df = _attach_btc_forecast(future_df, df_btc_hist, df_btc_pred)
+
+    forecast = model.predict(future_df)
+    predictions = _forecast_to_predictions(currency, model_record, forecast)
+    last_bar = df["ds"].iloc[-1].tz_localize(dt_timezone.utc).to_pydatetime()
+    with transaction.atomic():
+        # 最新一根K线通常不在整点（CoinGecko 的当前价格），每次刷新的未来时间点都不同，
+        # 先删除上一次刷新留下、不在新预测范围内的未来预测，避免多次刷新的结果交错
+        PricePrediction.objects.filter(
+            model_run=model_record, time__gt=last_bar
+        ).exclude(time__in=[prediction.time for prediction in predictions]).delete()
+        PricePrediction.objects.bulk_create(
+            predictions,
+            update_conflicts=True,
+            unique_fields=["time", "model_run", "currency"],
+            update_fields=[
+                "predicted_price",
+                "prediction_lower_bound",
+                "prediction_upper_bound",
+                "updated_at",
+            ],
+        )
+    caching.invalidate(caching.FORECASTS, currency.coingecko_id)
+    warm_forecast_cache_task.delay(currency.coingecko_id, components=False)
+    events.publish(events.FORECAST, currency.coingecko_id, version=model_record.version)
+
+    print(
+        f"🔄 {currency.name} 预测已刷新 (v{model_record.version}, {model.name}): "
+        f"{forecast['ds'].min()} 到 {forecast['ds'].max()}, "
+        f"用时 {time.perf_counter() - started:.3f}s"
+    )
+    return f"Refreshed {len(predictions)} predictions for {currency.name}"
+
+
+@shared_task
+def refresh_all_forecasts_task():
+    """
+    两次完整训练之间的预测刷新调度：比特币刷新 -> 重新物化比特币特征 -> 并行刷新山寨币。
+    """
+    try:
+        btc = Currency.objects.get(coingecko_id=BITCOIN_GECKO_ID)
+    except Currency.DoesNotExist:
+        print("🛑 错误：数据库中未找到比特币，无法刷新预测。")
+        return
+
+    altcoin_tasks = [
+        refresh_forecasts_task.si(coin.id).on_error(
+            handle_prediction_error.s(coin.name)
+        )
+        for coin in Currency.objects.exclude(coingecko_id=BITCOIN_GECKO_ID)
+    ]
+    pipeline = [refresh_forecasts_task.si(btc.id), materialize_btc_features_task.si()]
+    if altcoin_tasks:
+        pipeline.append(group(altcoin_tasks))
+    chain(*pipeline).apply_async()
+    print(f"--- [MASTER] 已派发 {len(altcoin_tasks) + 1} 个货币的预测刷新任务 ---")
+
+
 # 添加错误处理任务
 @shared_task
 def handle_prediction_error(request, exc, traceback, coin_name):
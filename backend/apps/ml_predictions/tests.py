@@ -1,3 +1,583 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.market_data.models import (
+    Currency,
+    MarketData,
+    PredictionModel,
+    PricePrediction,
+)
+
+from . import artifacts, backtesting, feature_store, tasks, tuning
+from .engines import NaiveDriftEngine, ProphetEngine, get_engine, load_cached_engine
+from .global_model import fit_global_ridge, predict_global
+
+
+def _bars(currency, times, prices):
+    return [
+        MarketData(
+            time=bar_time,
+            currency=currency,
+            open=Decimal(str(round(price, 4))),
+            high=Decimal(str(round(price, 4))),
+            low=Decimal(str(round(price, 4))),
+            close=Decimal(str(round(price, 4))),
+            volume=Decimal("1"),
+        )
+        for bar_time, price in zip(times, prices)
+    ]
+
+
+def _linear_frame(periods=200):
+    return pd.DataFrame(
+        {
+            "ds": pd.date_range("2024-01-01", periods=periods, freq="D"),
+            "y": 100 + 2 * np.arange(periods, dtype="float64"),
+        }
+    )
+
+
+def _ar_frame(phi=0.5, periods=2000, seed=0):
+    """对数收益率服从 AR(1)：r[t] = 0.001 + phi * r[t-1] + 噪声。"""
+    rng = np.random.default_rng(seed)
+    returns = np.zeros(periods)
+    for t in range(1, periods):
+        returns[t] = 0.001 + phi * returns[t - 1] + rng.normal(0, 0.01)
+    return pd.DataFrame(
+        {
+            "ds": pd.date_range("2020-01-01", periods=periods, freq="D"),
+            "y": 100 * np.exp(np.cumsum(returns)),
+        }
+    )
+
+
+class TempStorageMixin:
+    """把模型文件和比特币特征文件写到临时目录。"""
+
+    def setUp(self):
+        super().setUp()
+        storage = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, storage, ignore_errors=True)
+        for module, name, path in (
+            (artifacts, "ARTIFACTS_DIR", f"{storage}/models/artifacts"),
+            (artifacts, "MODELS_DIR", f"{storage}/models"),
+            (feature_store, "FEATURES_DIR", storage),
+        ):
+            patcher = mock.patch.object(module, name, path)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        feature_store._loaded_features.clear()
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    ML_TRAINING_MAX_ROWS=0,
+    ML_PREDICT_UNCERTAINTY_SAMPLES=0,
+)
+class RefreshForecastsTests(TempStorageMixin, TestCase):
+    """不重新训练的预测刷新。"""
+
+    def setUp(self):
+        super().setUp()
+        self.btc, self.eth = Currency.objects.bulk_create(
+            [
+                Currency(coingecko_id="bitcoin", symbol="btc", name="Bitcoin"),
+                Currency(coingecko_id="ethereum", symbol="eth", name="Ethereum"),
+            ]
+        )
+        midnight = datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+        days = [midnight + timedelta(days=offset) for offset in range(60)]
+        btc_prices = [40 + 0.5 * offset for offset in range(60)]
+        eth_prices = [
+            1.2 * price + np.sin(offset) for offset, price in enumerate(btc_prices)
+        ]
+        # 两个货币最新的一根K线都是不在整点的当前价格，且时间戳互不相同
+        MarketData.objects.bulk_create(
+            _bars(self.btc, days + [days[-1] + timedelta(hours=9)], btc_prices + [70])
+            + _bars(
+                self.eth,
+                days + [days[-1] + timedelta(hours=13, minutes=27)],
+                eth_prices + [1.2 * 70],
+            )
+        )
+
+        btc_run = PredictionModel.objects.create(
+            currency=self.btc, model_file_path="unused", version=1
+        )
+        self.btc_last_bar = days[-1] + timedelta(hours=9)
+        PricePrediction.objects.bulk_create(
+            [
+                PricePrediction(
+                    time=self.btc_last_bar + timedelta(days=step),
+                    predicted_price=Decimal(70 + 2 * step),
+                    prediction_lower_bound=Decimal(70 + 2 * step),
+                    prediction_upper_bound=Decimal(70 + 2 * step),
+                    model_run=btc_run,
+                    currency=self.btc,
+                )
+                for step in range(1, 5)
+            ]
+        )
+
+        engine = ProphetEngine(uncertainty_samples=0)
+        engine.add_regressor("btc_price")
+        engine.fit(
+            pd.DataFrame(
+                {
+                    "ds": pd.DatetimeIndex(days).tz_localize(None),
+                    "y": eth_prices,
+                    "btc_price": btc_prices,
+                }
+            )
+        )
+        self.eth_run = PredictionModel.objects.create(
+            currency=self.eth,
+            model_file_path=artifacts.save_artifact(engine),
+            version=1,
+        )
+
+    def _refresh(self):
+        with mock.patch.object(tasks, "warm_forecast_cache_task"), mock.patch.object(
+            tasks.events, "publish"
+        ), mock.patch.object(
+            ProphetEngine, "predict", autospec=True, side_effect=ProphetEngine.predict
+        ) as predict:
+            tasks.refresh_forecasts_task(self.eth.id)
+        return predict.call_args.args[1]
+
+    def test_misaligned_timestamps_use_latest_btc_value(self):
+        future_df = self._refresh()
+
+        # ETH 的预测时间点（13:27）与 BTC 的预测时间点（09:00）不同，取之前最近的 BTC 预测
+        self.assertEqual(future_df["btc_price"].tolist(), [72.0, 74.0, 76.0])
+        forecasts = PricePrediction.objects.filter(
+            model_run=self.eth_run, time__gt=self.btc_last_bar
+        )
+        self.assertEqual(forecasts.count(), 3)
+        for prediction in forecasts:
+            self.assertLess(abs(prediction.predicted_price.amount - 90), 10)
+
+    def test_missing_btc_features_fail_instead_of_guessing(self):
+        empty = pd.DataFrame({"ds": pd.DatetimeIndex([]), "btc_price": []})
+        with mock.patch.object(
+            tasks, "load_btc_features", return_value=(empty, empty)
+        ), self.assertRaises(ValueError):
+            self._refresh()
+        self.assertFalse(
+            PricePrediction.objects.filter(model_run=self.eth_run).exists()
+        )
+
+    @override_settings(ML_PREDICT_ANALYTIC_INTERVALS=True)
+    def test_refresh_leaves_cached_engine_untouched(self):
+        cached = load_cached_engine(self.eth_run.model_file_path)
+        self._refresh()
+
+        self.assertIs(load_cached_engine(self.eth_run.model_file_path), cached)
+        self.assertFalse(cached.analytic_intervals)
+        self.assertEqual(len(cached.model.history), 60)
+
+
+class FeatureStoreTests(TempStorageMixin, TestCase):
+    """比特币特征文件的物化与读取。"""
+
+    def setUp(self):
+        super().setUp()
+        (self.btc,) = Currency.objects.bulk_create(
+            [Currency(coingecko_id="bitcoin", symbol="btc", name="Bitcoin")]
+        )
+        start = datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+        self.times = [start + timedelta(days=offset) for offset in range(5)]
+        MarketData.objects.bulk_create(
+            _bars(self.btc, self.times, [10, 11, 12, 13, 14])
+        )
+        self.run = PredictionModel.objects.create(
+            currency=self.btc, model_file_path="unused", version=7
+        )
+        PricePrediction.objects.bulk_create(
+            [
+                PricePrediction(
+                    time=self.times[-1] + timedelta(days=step),
+                    predicted_price=Decimal(14 + step),
+                    prediction_lower_bound=Decimal(14 + step),
+                    prediction_upper_bound=Decimal(14 + step),
+                    model_run=self.run,
+                    currency=self.btc,
+                )
+                for step in (1, 2)
+            ]
+        )
+
+    def test_load_materializes_once_and_round_trips(self):
+        with mock.patch.object(
+            feature_store,
+            "materialize_btc_features",
+            wraps=feature_store.materialize_btc_features,
+        ) as materialize:
+            df_hist, df_pred = feature_store.load_btc_features()
+            feature_store.load_btc_features()
+        self.assertEqual(materialize.call_count, 1)
+
+        naive = pd.DatetimeIndex(self.times).tz_localize(None)
+        self.assertEqual(df_hist["ds"].tolist(), naive.tolist())
+        self.assertEqual(df_hist["btc_price"].tolist(), [10, 11, 12, 13, 14])
+        self.assertEqual(
+            df_pred["ds"].tolist(),
+            [naive[-1] + pd.Timedelta(days=1), naive[-1] + pd.Timedelta(days=2)],
+        )
+        self.assertEqual(df_pred["btc_price"].tolist(), [15, 16])
+
+    def test_lost_replace_reads_the_winning_file(self):
+        replace = os.replace
+        temp_paths = []
+
+        def replace_after_other_process(tmp_path, path):
+            # 另一个进程先完成了替换，本进程的替换随后失败
+            temp_paths.append(tmp_path)
+            replace(tmp_path, path)
+            raise FileNotFoundError(tmp_path)
+
+        with mock.patch.object(
+            feature_store.os, "replace", side_effect=replace_after_other_process
+        ):
+            df_hist, df_pred = feature_store.load_btc_features()
+
+        self.assertTrue(temp_paths[0].endswith(f".{os.getpid()}.tmp"))
+        self.assertEqual(len(df_hist), 5)
+        self.assertEqual(len(df_pred), 2)
+        self.assertEqual(
+            os.listdir(feature_store.FEATURES_DIR), ["btc_features_v7.npz"]
+        )
+
+
+class ArtifactTests(TempStorageMixin, TestCase):
+    """内容寻址的模型文件：序列化往返、去重与垃圾回收。"""
+
+    def setUp(self):
+        super().setUp()
+        (self.currency,) = Currency.objects.bulk_create(
+            [Currency(coingecko_id="ethereum", symbol="eth", name="Ethereum")]
+        )
+        self.df = _linear_frame()
+
+    def _age(self, path, seconds=2 * artifacts.GC_GRACE_SECONDS):
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_numpy_engines_round_trip(self):
+        future = pd.DataFrame({"ds": pd.date_range("2024-07-19", periods=3, freq="D")})
+        for name in ("drift", "holt", "ar"):
+            with self.subTest(engine=name):
+                engine = get_engine(name).fit(self.df)
+                loaded = artifacts.load_artifact(artifacts.save_artifact(engine))
+
+                self.assertIsInstance(loaded, type(engine))
+                pd.testing.assert_frame_equal(
+                    loaded.predict(future), engine.predict(future)
+                )
+
+    def test_prophet_round_trip(self):
+        engine = ProphetEngine(uncertainty_samples=0).fit(self.df.iloc[:60])
+        loaded = artifacts.load_artifact(artifacts.save_artifact(engine))
+
+        future = engine.make_future_dataframe(periods=2)
+        np.testing.assert_allclose(
+            loaded.predict(future)["yhat"], engine.predict(future)["yhat"]
+        )
+
+    def test_identical_models_share_one_file(self):
+        first = artifacts.save_artifact(get_engine("drift").fit(self.df))
+        second = artifacts.save_artifact(get_engine("drift").fit(self.df))
+        other = artifacts.save_artifact(get_engine("drift").fit(self.df.iloc[:-1]))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith(artifacts.ARTIFACTS_DIR))
+        self.assertTrue(first.endswith(artifacts.ARTIFACT_SUFFIX))
+
+    def test_saving_existing_model_refreshes_mtime(self):
+        path = artifacts.save_artifact(get_engine("drift").fit(self.df))
+        self._age(path)
+        artifacts.save_artifact(get_engine("drift").fit(self.df))
+
+        self.assertGreater(os.path.getmtime(path), time.time() - 60)
+
+    def test_remove_unreferenced_respects_grace_period(self):
+        referenced = artifacts.save_artifact(get_engine("drift").fit(self.df))
+        fresh = artifacts.save_artifact(get_engine("holt").fit(self.df))
+        stale = artifacts.save_artifact(get_engine("ar").fit(self.df))
+        PredictionModel.objects.create(
+            currency=self.currency, model_file_path=referenced, version=1
+        )
+        self._age(referenced)
+        self._age(stale)
+
+        removed, reclaimed = artifacts.remove_unreferenced(
+            [referenced, fresh, stale, f"{stale}.missing"]
+        )
+
+        self.assertEqual(removed, 1)
+        self.assertGreater(reclaimed, 0)
+        self.assertTrue(os.path.exists(referenced))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertFalse(os.path.exists(stale))
+
+    def test_collect_artifacts_keeps_live_runs(self):
+        paths = [
+            artifacts.save_artifact(get_engine("drift").fit(self.df.iloc[:-k]))
+            for k in (1, 2, 3)
+        ]
+        for version, path in enumerate(paths, start=1):
+            PredictionModel.objects.create(
+                currency=self.currency,
+                model_file_path=path,
+                version=version,
+                is_active=version == 1,
+            )
+        legacy = os.path.join(artifacts.MODELS_DIR, "legacy.joblib")
+        with open(legacy, "wb") as fh:
+            fh.write(b"old")
+        for path in paths + [legacy]:
+            self._age(path)
+
+        result = artifacts.collect_artifacts(keep=1)
+
+        # 激活的 v1 和最新的 v3 保留，v2 与遗留的 joblib 文件被删除
+        self.assertEqual(result["files"], 2)
+        self.assertEqual(result["kept"], 2)
+        self.assertTrue(os.path.exists(paths[0]))
+        self.assertFalse(os.path.exists(paths[1]))
+        self.assertTrue(os.path.exists(paths[2]))
+        self.assertFalse(os.path.exists(legacy))
+
+
+class TuningTests(TestCase):
+    """按货币的引擎搜索。"""
+
+    def test_global_model_currencies_are_not_tuned(self):
+        (currency,) = Currency.objects.bulk_create(
+            [
+                Currency(
+                    coingecko_id="ethereum",
+                    symbol="eth",
+                    name="Ethereum",
+                    forecast_engine="global_ridge",
+                )
+            ]
+        )
+        with mock.patch.object(tuning, "load_backtest_series") as load_series:
+            winners = tuning.tune_currencies([currency])
+
+        self.assertEqual(winners, {})
+        load_series.assert_not_called()
+        currency.refresh_from_db()
+        self.assertEqual(currency.forecast_engine, "global_ridge")
+        self.assertIsNone(currency.tuned_at)
+
+
+class BacktestWindowTests(SimpleTestCase):
+    """回测折的训练集与正式训练使用相同的训练窗口。"""
+
+    def setUp(self):
+        ds = pd.date_range("2024-01-01", periods=100, freq="D").to_numpy()
+        self.y = 100 + np.arange(100, dtype="float64")
+        self.ds = ds
+        self.addCleanup(backtesting._worker_series.clear)
+
+    def _fit_frame(self, window, origin=80):
+        backtesting._init_worker({1: (self.ds, self.y, None, window)})
+        with mock.patch.object(
+            NaiveDriftEngine, "fit", autospec=True, side_effect=NaiveDriftEngine.fit
+        ) as fit:
+            result = backtesting.evaluate_fold("drift", {}, 1, origin, 3)
+        self.assertEqual(len(result["abs_errors"]), 3)
+        return fit.call_args.args[1]
+
+    def test_max_rows_ends_at_origin(self):
+        train = self._fit_frame((None, 20))
+        self.assertEqual(len(train), 20)
+        self.assertEqual(train["ds"].iloc[-1], pd.Timestamp(self.ds[79]))
+
+    def test_lookback_days_counts_back_from_origin(self):
+        train = self._fit_frame((10, None))
+        self.assertEqual(len(train), 11)
+        self.assertEqual(train["ds"].iloc[0], pd.Timestamp(self.ds[69]))
+
+    def test_unbounded_window_uses_all_history(self):
+        self.assertEqual(len(self._fit_frame((None, None))), 80)
+
+    @override_settings(ML_TRAINING_MAX_ROWS=0, ML_TRAINING_LOOKBACK_DAYS=30)
+    def test_currency_window_overrides_global_settings(self):
+        currency = Currency(id=1, training_max_rows=60)
+        self.assertEqual(tasks._training_window(currency), (30, 60))
+
+
+class BacktestTests(TestCase):
+    """回测原点的切分、指标汇总与结果写入。"""
+
+    def test_rolling_origins_end_at_series_tail(self):
+        self.assertEqual(backtesting.rolling_origins(100, 3, 4), [88, 91, 94, 97])
+        self.assertEqual(backtesting.rolling_origins(60, 3, 5, min_train=55), [57])
+
+    def test_summarize_folds_averages_all_points(self):
+        summary = backtesting.summarize_folds(
+            [
+                {
+                    "abs_errors": [1.0, 3.0],
+                    "pct_errors": [10.0, 30.0],
+                    "covered": [True, False],
+                    "fit_seconds": 1.0,
+                    "predict_seconds": 0.5,
+                },
+                {
+                    "abs_errors": [2.0],
+                    "pct_errors": [20.0],
+                    "covered": [True],
+                    "fit_seconds": 3.0,
+                    "predict_seconds": 1.5,
+                },
+            ]
+        )
+        self.assertEqual(
+            summary,
+            {
+                "mae": 2.0,
+                "mape": 20.0,
+                "coverage": 0.6667,
+                "fit_seconds": 2.0,
+                "predict_seconds": 1.0,
+                "folds": 2,
+            },
+        )
+
+    def test_run_backtests_writes_metrics_to_active_run(self):
+        (currency,) = Currency.objects.bulk_create(
+            [Currency(coingecko_id="ethereum", symbol="eth", name="Ethereum")]
+        )
+        start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        MarketData.objects.bulk_create(
+            _bars(
+                currency,
+                [start + timedelta(days=offset) for offset in range(70)],
+                [100 + 2 * offset for offset in range(70)],
+            )
+        )
+        run = PredictionModel.objects.create(
+            currency=currency,
+            model_file_path="unused",
+            version=1,
+            is_active=True,
+            metrics={"mae": 1.0},
+        )
+        self.addCleanup(backtesting._worker_series.clear)
+
+        # 线程池代替进程池；保留测试数据库连接
+        with mock.patch.object(
+            backtesting, "ProcessPoolExecutor", ThreadPoolExecutor
+        ), mock.patch.object(backtesting.db.connections, "close_all"):
+            results = backtesting.run_backtests(
+                [currency], engines=["drift"], folds=3, horizon=2
+            )
+
+        drift = results[currency.id]["drift"]
+        self.assertEqual(drift["folds"], 3)
+        self.assertAlmostEqual(drift["mae"], 0.0)
+        run.refresh_from_db()
+        self.assertEqual(run.metrics["mae"], 1.0)
+        self.assertEqual(run.metrics["backtest"]["horizon"], 2)
+        self.assertEqual(run.metrics["backtest"]["engines"], {"drift": drift})
+
+
+class NumpyEngineTests(SimpleTestCase):
+    """轻量引擎在已知序列上的预测。"""
+
+    def _future(self, engine, periods=3):
+        forecast = engine.predict(engine.make_future_dataframe(periods=periods))
+        return forecast.iloc[-periods:]
+
+    def test_drift_extrapolates_linear_series_exactly(self):
+        future = self._future(get_engine("drift").fit(_linear_frame()))
+
+        np.testing.assert_allclose(future["yhat"], [500, 502, 504])
+        np.testing.assert_allclose(future["yhat_lower"], future["yhat"])
+        self.assertEqual(
+            future["ds"].tolist(),
+            list(pd.date_range("2024-07-19", periods=3, freq="D")),
+        )
+
+    def test_holt_follows_linear_trend(self):
+        future = self._future(get_engine("holt").fit(_linear_frame()))
+
+        np.testing.assert_allclose(future["yhat"], [500, 502, 504])
+        self.assertTrue((future["yhat_lower"] < future["yhat"]).all())
+        self.assertTrue((future["yhat_upper"] > future["yhat"]).all())
+
+    def test_history_points_return_one_step_fitted_values(self):
+        df = _linear_frame()
+        forecast = get_engine("drift").fit(df).predict(df[["ds"]])
+
+        self.assertEqual(forecast["yhat"].iloc[0], df["y"].iloc[0])
+        np.testing.assert_allclose(forecast["yhat"].iloc[1:], df["y"].iloc[1:])
+
+    def test_ar_recovers_return_coefficient(self):
+        df = _ar_frame()
+        engine = get_engine("ar", order=1).fit(df)
+        self.assertAlmostEqual(engine._coef[1], 0.5, delta=0.05)
+
+        last_return = np.log(df["y"].iloc[-1] / df["y"].iloc[-2])
+        expected = df["y"].iloc[-1] * np.exp(
+            engine._coef[0] + engine._coef[1] * last_return
+        )
+        self.assertAlmostEqual(self._future(engine, 1)["yhat"].item(), expected)
+
+    def test_update_keeps_selected_holt_alpha(self):
+        engine = get_engine("holt").fit(_linear_frame())
+        alpha = engine.alpha
+        engine.update(_ar_frame(periods=100))
+        self.assertEqual(engine.alpha, alpha)
+
+    def test_unknown_engine_raises(self):
+        with self.assertRaises(ValueError):
+            get_engine("unknown")
+
+
+class GlobalRidgeTests(SimpleTestCase):
+    """所有货币共享滞后系数的全局岭回归。"""
+
+    def setUp(self):
+        first = _ar_frame(seed=0)
+        second = _ar_frame(seed=1)
+        second["y"] = second["y"] / 2
+        self.frames = {1: first, 2: second}
+
+    def test_shared_coefficient_is_recovered(self):
+        engines = fit_global_ridge(self.frames, order=1, l2=0.0)
+
+        self.assertIs(engines[1]._coef, engines[2]._coef)
+        self.assertAlmostEqual(engines[1]._coef[0], 0.5, delta=0.05)
+
+    def test_batch_forecast_matches_each_engine(self):
+        engines = fit_global_ridge(self.frames)
+        future_dfs = {
+            currency_id: engine.make_future_dataframe(periods=3)
+            for currency_id, engine in engines.items()
+        }
+        forecasts = predict_global(engines, future_dfs)
+
+        for currency_id, engine in engines.items():
+            expected = engine.predict(future_dfs[currency_id])
+            self.assertEqual(len(forecasts[currency_id]), 2003)
+            np.testing.assert_allclose(forecasts[currency_id]["yhat"], expected["yhat"])
+
+    def test_short_series_are_skipped(self):
+        frames = {**self.frames, 3: _linear_frame(periods=5)}
+        self.assertEqual(set(fit_global_ridge(frames)), {1, 2})
@@ -0,0 +1,157 @@
+# /backend/apps/ml_predictions/tuning.py
+"""
+按货币的超参数与引擎搜索。
+
+候选集合包含 Prophet 的 changepoint_prior_scale / seasonality_prior_scale /
+seasonality_mode 网格，以及各轻量引擎的参数。搜索采用逐级淘汰
+（successive halving）：先在最近的少数几个回测折上评估全部候选，只保留 MAPE
+最好的 1/eta 进入下一轮，下一轮评估更多折，直到用完所有折或只剩一个候选。
+每一轮的 (候选, 折) 作业都在进程池中并行执行，复用 backtesting 的工作进程与数据加载。
+
+胜出的配置写回 Currency.forecast_engine / forecast_params 并记录 tuned_at，
+每晚的训练任务直接读取这些字段，不会重复搜索。使用全局模型（global_ridge）的货币
+与其他货币共同训练，无法按单个货币评估，不参与搜索，其引擎配置保持不变。
+"""
+
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django import db
+from django.utils import timezone
+
+from .backtesting import (
+    _init_worker,
+    evaluate_fold,
+    load_backtest_series,
+    rolling_origins,
+)
+from .engines import GlobalRidgeEngine
+
+PROPHET_GRID = {
+    "changepoint_prior_scale": [0.001, 0.01, 0.05, 0.1, 0.5],
+    "seasonality_prior_scale": [0.1, 1.0, 10.0],
+    "seasonality_mode": ["additive", "multiplicative"],
+}
+
+LIGHT_CANDIDATES = [
+    ("holt", {}),
+    ("ar", {"order": 3}),
+    ("ar", {"order": 5}),
+    ("ar", {"order": 10}),
+    ("drift", {}),
+]
+
+
+def build_candidates():
+    """返回全部候选配置 [(engine, params), ...]。"""
+    keys = list(PROPHET_GRID)
+    prophet_candidates = [
+        ("prophet", dict(zip(keys, values)))
+        for values in itertools.product(*(PROPHET_GRID[key] for key in keys))
+    ]
+    return prophet_candidates + LIGHT_CANDIDATES
+
+
+def _search_currency(executor, currency_id, n_rows, candidates, folds, horizon, eta):
+    """对单个货币执行逐级淘汰搜索，返回 (最佳候选, 最佳MAPE, 评估折数)。"""
+    # 从最近的原点开始评估，早期轮次只看最近的行情
+    origins = rolling_origins(n_rows, horizon, folds)[::-1]
+    if not origins:
+        return None
+
+    pct_errors = {index: [] for index in range(len(candidates))}
+    survivors = list(range(len(candidates)))
+    evaluated_folds = 0
+    rung_folds = 1
+
+    while True:
+        rung_folds = min(rung_folds, len(origins))
+        futures = {
+            executor.submit(
+                evaluate_fold,
+                candidates[index][0],
+                candidates[index][1],
+                currency_id,
+                origin,
+                horizon,
+            ): index
+            for index in survivors
+            for origin in origins[evaluated_folds:rung_folds]
+        }
+        for future, index in futures.items():
+            try:
+                pct_errors[index].extend(future.result()["pct_errors"])
+            except Exception as e:
+                # 失败的候选（例如参数导致拟合发散）直接淘汰
+                engine_name, params = candidates[index]
+                print(f"🛑 候选 {engine_name} {params} 评估失败: {e}")
+                pct_errors[index].append(math.inf)
+        evaluated_folds = rung_folds
+
+        scores = {index: float(np.mean(pct_errors[index])) for index in survivors}
+        survivors = sorted(survivors, key=scores.get)
+        if evaluated_folds == len(origins) or len(survivors) == 1:
+            break
+        survivors = survivors[: max(1, math.ceil(len(survivors) / eta))]
+        rung_folds *= eta
+
+    best = survivors[0]
+    return candidates[best], scores[best], evaluated_folds
+
+
+def tune_currencies(currencies, folds=6, horizon=3, workers=None, eta=3):
+    """
+    为给定货币搜索最佳引擎和参数，并写回 Currency（跳过使用全局模型的货币）。
+    返回 {currency_id: {"engine", "params", "mape", "folds"}}。
+    """
+    currencies = [
+        currency
+        for currency in currencies
+        if currency.forecast_engine != GlobalRidgeEngine.name
+    ]
+    if not currencies:
+        return {}
+    series = load_backtest_series(currencies)
+    candidates = build_candidates()
+
+    # fork 出的子进程不能复用父进程的数据库连接
+    db.connections.close_all()
+
+    winners = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(series,)
+    ) as executor:
+        for currency in currencies:
+            if currency.id not in series:
+                continue
+            result = _search_currency(
+                executor,
+                currency.id,
+                len(series[currency.id][1]),
+                candidates,
+                folds,
+                horizon,
+                eta,
+            )
+            if result is None or not math.isfinite(result[1]):
+                continue
+            (engine_name, params), mape, evaluated_folds = result
+            winners[currency.id] = {
+                "engine": engine_name,
+                "params": params,
+                "mape": round(mape, 4),
+                "folds": evaluated_folds,
+            }
+
+    for currency in currencies:
+        winner = winners.get(currency.id)
+        if winner is None:
+            continue
+        currency.forecast_engine = winner["engine"]
+        currency.forecast_params = winner["params"]
+        currency.tuned_at = timezone.now()
+        currency.save(update_fields=["forecast_engine", "forecast_params", "tuned_at"])
+
+    return winners
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+预测序列化基准测试：对比 PricePredictionSerializer（ModelSerializer + MoneyField）
+与 PricePredictionValuesSerializer（values_list，行/列两种布局）。
+
+在一个会被回滚的事务中为临时货币写入指定行数的 PricePrediction，
+分别测量“查询 + 序列化 + JSON 编码”的耗时和响应体大小。默认测试 1k、10k、100k 行：
+
+    python bench_prediction_serializer.py --rows 1000 10000 100000
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import numpy as np
+from django.db import transaction
+from django.db.models.signals import post_save
+from rest_framework.renderers import JSONRenderer
+
+from apps.api.serializers import (
+    PricePredictionSerializer,
+    PricePredictionValuesSerializer,
+)
+from apps.market_data.models import Currency, PredictionModel, PricePrediction
+from apps.market_data.signals import trigger_initial_training
+
+
+def model_serializer(queryset):
+    return PricePredictionSerializer(queryset, many=True).data
+
+
+def values_rows(queryset):
+    return PricePredictionValuesSerializer(queryset, "rows").data
+
+
+def values_columns(queryset):
+    return PricePredictionValuesSerializer(queryset, "columns").data
+
+
+def measure(label, func, queryset, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = JSONRenderer().render(func(queryset))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<16} 耗时 {best * 1000:9.1f} ms  响应 {len(body) / 1024:9.1f} KiB")
+    return best
+
+
+def write_predictions(currency, model_run, rows):
+    start = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+    prices = 100 * np.exp(np.cumsum(np.random.normal(0, 0.01, rows)))
+    predictions = [
+        PricePrediction(
+            time=start + timedelta(hours=i),
+            predicted_price=price,
+            prediction_lower_bound=round(price * 0.95, 4),
+            prediction_upper_bound=round(price * 1.05, 4),
+            model_run=model_run,
+            currency=currency,
+        )
+        for i, price in enumerate(prices.round(4).tolist())
+    ]
+    PricePrediction.objects.bulk_create(predictions, batch_size=5000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # 基准数据不应触发新货币的自动训练流程
+    post_save.disconnect(trigger_initial_training, sender=Currency)
+
+    with transaction.atomic():
+        currency = Currency.objects.create(
+            coingecko_id="__bench_serializer__", symbol="bench", name="Bench"
+        )
+        for rows in args.rows:
+            model_run = PredictionModel.objects.create(
+                currency=currency,
+                model_file_path="unused",
+                version=rows,
+                is_active=False,
+            )
+            write_predictions(currency, model_run, rows)
+            queryset = PricePrediction.objects.filter(model_run=model_run).order_by(
+                "time"
+            )
+
+            print(f"{rows} 行:")
+            baseline = measure(
+                "ModelSerializer", model_serializer, queryset, args.repeat
+            )
+            for label, func in (
+                ("values 行", values_rows),
+                ("values 列", values_columns),
+            ):
+                elapsed = measure(label, func, queryset, args.repeat)
+                print(f"  {'':<16} 加速 {baseline / elapsed:5.1f}x")
+
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
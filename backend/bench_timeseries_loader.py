@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+时间序列加载基准测试：对比旧的 values() -> DataFrame 方式与 apps.market_data.timeseries 加载器。
+
+在一个会被回滚的事务中为临时货币写入指定行数的 MarketData，然后分别测量两种方式的
+耗时和 Python 堆内存峰值（tracemalloc）。默认 100 万行：
+
+    python bench_timeseries_loader.py --rows 1000000
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from apps.market_data.models import Currency, MarketData
+from apps.market_data.signals import trigger_initial_training
+from apps.market_data.timeseries import load_price_frame
+
+
+def legacy_load(currency):
+    data = (
+        MarketData.objects.filter(currency=currency)
+        .order_by("time")
+        .values("time", "close")
+    )
+    df = pd.DataFrame(list(data))
+    df.rename(columns={"time": "ds", "close": "y"}, inplace=True)
+    df["ds"] = df["ds"].dt.tz_localize(None)
+    df["y"] = df["y"].astype("float64")
+    return df
+
+
+def measure(label, func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    df = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<12} 行数 {len(df):>9}  耗时 {elapsed:8.3f}s  "
+        f"内存峰值 {peak / 1024 / 1024:9.1f} MiB"
+    )
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # 基准数据不应触发新货币的自动训练流程
+    post_save.disconnect(trigger_initial_training, sender=Currency)
+
+    with transaction.atomic():
+        currency = Currency.objects.create(
+            coingecko_id="__bench_timeseries__", symbol="bench", name="Bench"
+        )
+        print(f"写入 {args.rows} 行基准数据...")
+        start = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+        prices = 100 * np.exp(np.cumsum(np.random.normal(0, 0.01, args.rows)))
+        batch = []
+        for i, price in enumerate(prices.round(4).tolist()):
+            batch.append(
+                MarketData(
+                    currency=currency,
+                    time=start + timedelta(minutes=i),
+                    open=price,
+                    high=price,
+                    low=price,
+                    close=price,
+                    volume=0,
+                )
+            )
+            if len(batch) == 10000:
+                MarketData.objects.bulk_create(batch)
+                batch = []
+        MarketData.objects.bulk_create(batch)
+
+        legacy_df = measure("values()", legacy_load, currency)
+        fast_df = measure("loader", load_price_frame, currency.id)
+
+        same = legacy_df["ds"].equals(fast_df["ds"]) and np.allclose(
+            legacy_df["y"].to_numpy(), fast_df["y"].to_numpy()
+        )
+        print(f"结果一致: {same}")
+
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
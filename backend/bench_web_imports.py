@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Web worker 启动基准测试：测量 gunicorn worker 加载 Django 和 URL 配置时的导入耗时与常驻内存。
+
+每种模式在独立的子进程中运行（使用 python -X importtime），分别统计：
+    - lazy:       只加载 config.urls，即现在每个 web worker 启动时的状态
+    - eager:      额外导入 apps.api.components，相当于之前在 views.py 顶部导入 pandas 等 ML 依赖
+    - components: 再实际请求一次组件接口后的状态（加载 Prophet / matplotlib）
+
+    python bench_web_imports.py
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+MODES = {
+    "lazy": "",
+    "eager": "import apps.api.components",
+    "components": (
+        "import apps.api.components\n"
+        "from apps.ml_predictions.engines import ProphetEngine\n"
+        "import prophet.plot"
+    ),
+}
+
+# 在子进程中执行：加载 Django 与 URL 配置，然后输出耗时、RSS 和已加载的重量级模块
+CHILD_CODE = """
+import os, sys, time
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+import config.urls
+{extra}
+elapsed = time.perf_counter() - started
+with open("/proc/self/status") as fh:
+    rss_kib = int(next(line for line in fh if line.startswith("VmRSS")).split()[1])
+heavy = [m for m in ("pandas", "numpy", "joblib", "prophet", "cmdstanpy", "matplotlib") if m in sys.modules]
+print(f"RESULT {{elapsed}} {{rss_kib}} {{','.join(heavy) or '-'}}")
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_mode(extra, top):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE.format(extra=extra)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    elapsed, rss_kib, heavy = proc.stdout.split("RESULT ")[1].split()
+    # 只统计顶层包（缩进最少的行）的累计导入耗时
+    packages = []
+    for match in IMPORTTIME_LINE.finditer(proc.stderr):
+        if len(match.group(3)) == 1:
+            packages.append((int(match.group(2)), match.group(4)))
+    packages.sort(reverse=True)
+    return float(elapsed), int(rss_kib) / 1024, heavy, packages[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--top", type=int, default=5, help="每种模式列出最慢的顶层包数量"
+    )
+    args = parser.parse_args()
+
+    results = {name: run_mode(extra, args.top) for name, extra in MODES.items()}
+
+    print(f"{'模式':<12} {'启动耗时(s)':>12} {'RSS(MiB)':>10}  已加载的重量级模块")
+    for name, (elapsed, rss_mib, heavy, _) in results.items():
+        print(f"{name:<12} {elapsed:>12.2f} {rss_mib:>10.1f}  {heavy}")
+
+    for name, (_, _, _, packages) in results.items():
+        print(f"\n[{name}] 最慢的顶层导入:")
+        for cumulative_us, package in packages:
+            print(f"  {cumulative_us / 1000:>8.1f} ms  {package}")
+
+    lazy_rss = results["lazy"][1]
+    eager_rss = results["eager"][1]
+    print(
+        f"\n每个 web worker 节省 {results['eager'][0] - results['lazy'][0]:.2f}s 启动时间、"
+        f"{eager_rss - lazy_rss:.1f} MiB 常驻内存"
+    )
+
+
+if __name__ == "__main__":
+    main()
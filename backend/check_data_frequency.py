@@ -6,15 +6,14 @@ sys.path.append("/app")
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 django.setup()
 
-from apps.market_data.models import MarketData, Currency
-import pandas as pd
+from apps.market_data.models import Currency
+from apps.market_data.timeseries import load_price_frame
 
 # 检查不同货币的数据频率
 currencies = ["bitcoin", "ethereum"]
 for currency_id in currencies:
     currency = Currency.objects.get(coingecko_id=currency_id)
-    data = MarketData.objects.filter(currency=currency).order_by("time").values("time")
-    df = pd.DataFrame(list(data))
+    df = load_price_frame(currency.id).rename(columns={"ds": "time"})
     print(f"\n{currency.name}:")
     print(f"  数据条数: {len(df)}")
     if len(df) > 1:
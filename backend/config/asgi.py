@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# 静态文件在 Django 中间件链之外处理，中间件链保持全异步（生产环境的 /static/ 由 nginx 提供，
+# 不会到达这里；开发环境 DEBUG=True 时静态文件名不带哈希，可以直接从各应用的 static 目录读取）
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+
+application = ASGIStaticFilesHandler(application)
@@ -13,6 +13,17 @@ app = Celery("config")
 # namespace='CELERY' 意味着所有Celery相关的配置键在settings.py中都必须以 'CELERY_' 为前缀。
 app.config_from_object("django.conf:settings", namespace="CELERY")
 
+# 按工作负载划分队列，每个队列由单独的 worker 消费（见 docker-compose.yml）：
+#   ingest    - 行情数据获取，I/O 密集，需要按时完成
+#   train     - 模型训练与预测刷新，CPU 和内存密集
+#   analytics - 调度、特征物化、清理、接口缓存预热以及管理后台触发的其他任务（默认队列）
+app.conf.task_routes = {
+    "apps.data_ingestion.tasks.*": {"queue": "ingest"},
+    "apps.ml_predictions.tasks.train_and_predict_task": {"queue": "train"},
+    "apps.ml_predictions.tasks.train_global_model_task": {"queue": "train"},
+    "apps.ml_predictions.tasks.refresh_forecasts_task": {"queue": "train"},
+}
+
 # 定期任务配置
 app.conf.beat_schedule = {
     # 每天凌晨2点获取市场数据
@@ -30,6 +41,11 @@ app.conf.beat_schedule = {
         "task": "apps.data_ingestion.tasks.dispatch_market_data_updates",
         "schedule": crontab(minute=0, hour="*/8"),  # 每8小时
     },
+    # 每次数据更新30分钟后，用激活的模型刷新未来预测（不重新训练）
+    "refresh-forecasts-frequent": {
+        "task": "apps.ml_predictions.tasks.refresh_all_forecasts_task",
+        "schedule": crontab(minute=30, hour="*/8"),
+    },
 }
 
 # 时区设置
@@ -62,7 +62,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoiseMiddleware 只支持同步调用，放在这里会让整个中间件链在 ASGI 下以同步方式运行，
+    # 每个异步视图（包括长连接的 SSE）都要占用一个线程。静态文件改为在中间件链之外处理：
+    # ASGI 见 config/asgi.py，WSGI 见 config/wsgi.py，生产环境由 nginx 直接提供 /static/
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -143,6 +145,48 @@ STATICFILES_STORAGE = (
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# --- 缓存 ---
+# 所有 web worker 共享 Redis 缓存（与 Celery 使用同一实例的不同数据库编号），
+# 键的命名空间与失效方式见 apps/market_data/caching.py
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("REDIS_CACHE_URL", default=env("REDIS_URL")),
+        "KEY_PREFIX": "crypto",
+        "TIMEOUT": 300,
+    }
+}
+# 每个进程内 L1 缓存的容量上限（字节）和条目最长存活时间（秒）
+CACHE_L1_MAX_BYTES = env.int("CACHE_L1_MAX_BYTES", default=32 * 1024 * 1024)
+CACHE_L1_TTL = env.int("CACHE_L1_TTL", default=60)
+# 进程内缓存失效代数的时间（秒）：其他进程触发的失效最多延迟这么久生效，期间 L1 命中不访问 Redis
+CACHE_GENERATION_TTL = env.float("CACHE_GENERATION_TTL", default=2.0)
+# 新模型激活后预热接口缓存的任务限速（每个 worker，Celery rate_limit 格式）
+CACHE_WARMUP_RATE_LIMIT = env("CACHE_WARMUP_RATE_LIMIT", default="6/m")
+
+
+# --- 上游接口 ---
+# CoinGecko 接口地址（压测时可指向本地模拟服务）、请求超时（秒）以及每个进程的连接池大小
+COINGECKO_API_URL = env("COINGECKO_API_URL", default="https://api.coingecko.com/api/v3")
+UPSTREAM_TIMEOUT = env.float("UPSTREAM_TIMEOUT", default=10.0)
+UPSTREAM_CONNECT_TIMEOUT = env.float("UPSTREAM_CONNECT_TIMEOUT", default=3.0)
+UPSTREAM_MAX_CONNECTIONS = env.int("UPSTREAM_MAX_CONNECTIONS", default=20)
+
+
+# --- 增量同步 ---
+# since= 返回的游标比当前时间早多少秒，覆盖写入方提交延迟和时钟偏差（这段时间内的行会被重复返回）
+DELTA_SYNC_LAG_SECONDS = env.int("DELTA_SYNC_LAG_SECONDS", default=5)
+
+
+# --- 实时事件 ---
+# Celery 任务通过 Redis pub/sub 发布增量事件，web 进程订阅后以 SSE 推送，见 apps/market_data/events.py
+EVENTS_REDIS_URL = env("EVENTS_REDIS_URL", default=env("REDIS_URL"))
+EVENTS_CHANNEL = env("EVENTS_CHANNEL", default="crypto:events")
+# SSE 连接空闲时发送心跳注释的间隔（秒），以及每个连接最多积压的事件数
+EVENTS_HEARTBEAT_SECONDS = env.int("EVENTS_HEARTBEAT_SECONDS", default=15)
+EVENTS_CLIENT_BUFFER = env.int("EVENTS_CLIENT_BUFFER", default=100)
+
+
 # --- Celery 配置 ---
 # 从 .env 文件中读取 Redis 的 URL 作为 Broker
 CELERY_BROKER_URL = env("REDIS_URL")
@@ -151,6 +195,35 @@ CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+# 未在 config/celery.py 中单独路由的任务进入 analytics 队列
+CELERY_TASK_DEFAULT_QUEUE = "analytics"
+# 任务完成后才确认。预取数量按队列在 docker-compose 的 worker 命令中设置（--prefetch-multiplier）：
+# 训练 worker 每个进程只预取一个任务，避免长时间的训练任务被分给已经忙碌的进程；
+# 数据获取和分析任务短小，预取更多以减少与 broker 的往返
+CELERY_TASK_ACKS_LATE = env.bool("CELERY_TASK_ACKS_LATE", default=True)
+# Redis 会把超过该时间仍未确认的任务重新投递，必须大于最长的训练任务耗时
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": env.int("CELERY_VISIBILITY_TIMEOUT", default=6 * 3600)
+}
+
+# --- 机器学习流水线配置 ---
+# 每个货币保留的模型运行数量（含当前激活版本），更早的运行会被异步清理
+ML_MODEL_RUNS_TO_KEEP = env.int("ML_MODEL_RUNS_TO_KEEP", default=2)
+# 异步清理旧预测数据时每批删除的行数
+ML_PRUNE_BATCH_SIZE = env.int("ML_PRUNE_BATCH_SIZE", default=5000)
+# 训练窗口：只使用最近 N 天 / 最近 N 行数据（0 表示不限制），可在货币上单独覆盖
+ML_TRAINING_LOOKBACK_DAYS = env.int("ML_TRAINING_LOOKBACK_DAYS", default=0)
+ML_TRAINING_MAX_ROWS = env.int("ML_TRAINING_MAX_ROWS", default=0)
+# 训练特征帧是否降为 float32 以减少内存占用
+ML_TRAINING_FLOAT32 = env.bool("ML_TRAINING_FLOAT32", default=True)
+# 预测成本配置：Prophet 不确定性采样次数（0 表示不采样）、是否预测并保存历史拟合部分
+# （关闭时只预测未来 horizon 加最近 N 天的重叠区间）、是否按训练残差解析计算预测区间
+ML_PREDICT_UNCERTAINTY_SAMPLES = env.int("ML_PREDICT_UNCERTAINTY_SAMPLES", default=1000)
+ML_PREDICT_HISTORY = env.bool("ML_PREDICT_HISTORY", default=True)
+ML_PREDICT_OVERLAP_DAYS = env.int("ML_PREDICT_OVERLAP_DAYS", default=7)
+ML_PREDICT_ANALYTIC_INTERVALS = env.bool("ML_PREDICT_ANALYTIC_INTERVALS", default=False)
+# 训练 worker 启动时预热 ML 依赖、Stan 后端和激活模型缓存（在训练 worker 的环境变量中开启）
+ML_WORKER_PRELOAD = env.bool("ML_WORKER_PRELOAD", default=False)
 
 # --- CORS (Cross-Origin Resource Sharing) 配置 ---
 # 在开发环境中，我们允许来自本地Vue开发服务器的请求
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# WhiteNoise 不再作为中间件（见 settings.MIDDLEWARE），WSGI 部署时在外层提供 collectstatic 后的文件
+from django.conf import settings  # noqa: E402
+from whitenoise import WhiteNoise  # noqa: E402
+
+application = WhiteNoise(
+    application, root=settings.STATIC_ROOT, prefix=settings.STATIC_URL
+)
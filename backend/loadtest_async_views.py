@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+同步 / 异步 worker 压测：对比 WSGI 同步 worker 与 ASGI（uvicorn）worker 在上游接口变慢时的吞吐量和延迟。
+
+脚本在本地启动一个模拟 CoinGecko /coins/markets 的服务（每个响应固定延迟 --latency 秒），
+再分别以两种方式启动 web 服务并把 COINGECKO_API_URL 指向模拟服务：
+    sync  - gunicorn config.wsgi:application（同步 worker）
+    async - gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+然后以 --concurrency 个并发连接请求 /api/metrics/<id>/（每次使用不同的 id，确保不命中缓存），
+输出吞吐量和 p50 / p99 延迟：
+
+    python loadtest_async_views.py --latency 0.2 --requests 400 --concurrency 50 --workers 2
+
+需要能连接数据库；未设置 DEBUG 时子进程以 DEBUG=True 启动，以便接受 127.0.0.1 的请求。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SERVERS = {
+    "sync": ["config.wsgi:application"],
+    "async": ["config.asgi:application", "-k", "uvicorn.workers.UvicornWorker"],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_stub(latency):
+    """模拟 CoinGecko 的 ASGI 应用：等待 latency 秒后返回一条市场数据。"""
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        await asyncio.sleep(latency)
+        body = json.dumps(
+            [
+                {
+                    "id": "stub",
+                    "name": "Stub",
+                    "current_price": 100.0,
+                    "market_cap": 1e9,
+                    "total_volume": 1e7,
+                    "high_24h": 101.0,
+                    "low_24h": 99.0,
+                    "price_change_percentage_24h": 0.5,
+                    "last_updated": "2024-01-01T00:00:00Z",
+                }
+            ]
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def start_stub(latency):
+    port = free_port()
+    config = uvicorn.Config(
+        make_stub(latency), host="127.0.0.1", port=port, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def start_server(mode, workers, stub_port):
+    port = free_port()
+    env = dict(os.environ)
+    env["COINGECKO_API_URL"] = f"http://127.0.0.1:{stub_port}"
+    env.setdefault("DEBUG", "True")
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        *SERVERS[mode],
+        "--workers",
+        str(workers),
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--log-level",
+        "warning",
+    ]
+    process = subprocess.Popen(
+        command,
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/currencies/", timeout=1)
+            return process, port
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"{mode} 服务启动超时")
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+
+async def run_load(port, total, concurrency):
+    """以固定并发发出 total 个请求，返回 (每个请求的延迟, 失败数, 总耗时)。"""
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    run_id = time.time_ns()
+
+    async def worker(client):
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.get(f"/api/metrics/loadtest-{run_id}-{i}/")
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return np.array(latencies) * 1000, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="上游延迟（秒）")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2, help="web worker 进程数")
+    parser.add_argument("--modes", nargs="+", default=list(SERVERS), choices=SERVERS)
+    args = parser.parse_args()
+
+    stub, stub_port = start_stub(args.latency)
+    print(
+        f"上游延迟 {args.latency * 1000:.0f} ms, {args.requests} 个请求, "
+        f"并发 {args.concurrency}, {args.workers} 个 worker"
+    )
+    print(
+        f"{'模式':<8} {'吞吐(req/s)':>12} {'p50(ms)':>10} {'p99(ms)':>10} {'失败':>6}"
+    )
+    try:
+        for mode in args.modes:
+            process, port = start_server(mode, args.workers, stub_port)
+            try:
+                # 预热：建立连接、加载视图模块
+                asyncio.run(run_load(port, args.workers * 2, args.workers))
+                latencies, errors, elapsed = asyncio.run(
+                    run_load(port, args.requests, args.concurrency)
+                )
+            finally:
+                stop_server(process)
+            print(
+                f"{mode:<8} {args.requests / elapsed:>12.1f} "
+                f"{np.percentile(latencies, 50):>10.1f} "
+                f"{np.percentile(latencies, 99):>10.1f} {errors:>6}"
+            )
+    finally:
+        stub.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Celery 队列隔离压测：在大量训练任务占满 train 队列时，测量 ingest 队列的排队延迟。
+
+需要 Redis 以及 train / ingest 两个 worker 都在运行（docker-compose up）。脚本先在空闲状态下
+发送一批探针任务作为基线，然后为所有货币派发若干轮训练任务，在训练进行期间持续发送探针，
+最后对比两组延迟的分位数：
+
+    python loadtest_celery_queues.py --train-rounds 3 --probe-interval 0.5
+"""
+
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import numpy as np
+
+from apps.data_ingestion.tasks import ingest_probe_task
+from apps.market_data.models import Currency
+from apps.ml_predictions.tasks import train_and_predict_task
+
+
+def send_probes(count, interval):
+    """按固定间隔发送探针任务，返回 AsyncResult 列表。"""
+    results = []
+    for _ in range(count):
+        results.append(ingest_probe_task.delay(time.time()))
+        time.sleep(interval)
+    return results
+
+
+def probe_while(pending, interval):
+    """在 pending 中的任务全部完成之前持续发送探针任务。"""
+    results = []
+    while not all(result.ready() for result in pending):
+        results.append(ingest_probe_task.delay(time.time()))
+        time.sleep(interval)
+    return results
+
+
+def summarize(name, results, timeout):
+    latencies = np.array([result.get(timeout=timeout) for result in results]) * 1000
+    if not len(latencies):
+        print(f"{name:<10} 没有探针结果")
+        return
+    print(
+        f"{name:<10} {len(latencies):>6} {np.percentile(latencies, 50):>10.1f} "
+        f"{np.percentile(latencies, 95):>10.1f} {latencies.max():>10.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baseline-probes", type=int, default=20)
+    parser.add_argument("--probe-interval", type=float, default=0.5)
+    parser.add_argument(
+        "--train-rounds", type=int, default=3, help="为每个货币派发的训练任务轮数"
+    )
+    parser.add_argument("--timeout", type=float, default=60, help="单个探针的等待上限")
+    args = parser.parse_args()
+
+    currency_ids = list(Currency.objects.values_list("id", flat=True))
+    if not currency_ids:
+        print("❌ 数据库中没有货币，请先运行 init_currencies")
+        return
+
+    print(f"发送 {args.baseline_probes} 个基线探针...")
+    baseline = send_probes(args.baseline_probes, args.probe_interval)
+    summarize_header = (
+        f"{'阶段':<10} {'探针数':>6} {'p50(ms)':>10} {'p95(ms)':>10} {'max(ms)':>10}"
+    )
+
+    print(f"派发 {args.train_rounds} 轮 x {len(currency_ids)} 个货币的训练任务...")
+    started = time.perf_counter()
+    training = [
+        train_and_predict_task.delay(currency_id)
+        for _ in range(args.train_rounds)
+        for currency_id in currency_ids
+    ]
+    under_load = probe_while(training, args.probe_interval)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n训练任务全部完成，用时 {elapsed:.1f}s\n")
+    print(summarize_header)
+    summarize("空闲", baseline, args.timeout)
+    summarize("训练期间", under_load, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
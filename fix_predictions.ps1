@@ -6,7 +6,7 @@ Write-Host ""
 
 # 1. 停止相关服务
 Write-Host "1. 停止后端服务..." -ForegroundColor Yellow
-docker-compose stop backend celery_worker celery_beat
+docker-compose stop backend celery_worker celery_worker_ingest celery_worker_analytics celery_beat
 
 # 2. 清除Redis缓存
 Write-Host "2. 清除Redis缓存..." -ForegroundColor Yellow
@@ -124,7 +124,7 @@ docker-compose run --rm backend python manage.py shell -c $verifyScript
 
 # 7. 重新启动服务
 Write-Host "7. 重新启动服务..." -ForegroundColor Yellow
-docker-compose up -d backend celery_worker celery_beat
+docker-compose up -d backend celery_worker celery_worker_ingest celery_worker_analytics celery_beat
 
 Write-Host ""
 Write-Host "=== 修复完成 ===" -ForegroundColor Green
@@ -7,7 +7,7 @@ echo
 
 # 1. 停止相关服务
 echo "1. 停止后端服务..."
-docker-compose stop backend celery_worker celery_beat
+docker-compose stop backend celery_worker celery_worker_ingest celery_worker_analytics celery_beat
 
 # 2. 清除Redis缓存
 echo "2. 清除Redis缓存..."
@@ -85,7 +85,7 @@ for currency in currencies:
 
 # 7. 重新启动服务
 echo "7. 重新启动服务..."
-docker-compose up -d backend celery_worker celery_beat
+docker-compose up -d backend celery_worker celery_worker_ingest celery_worker_analytics celery_beat
 
 echo
 echo "=== 修复完成 ==="
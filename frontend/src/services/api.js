@@ -67,4 +67,19 @@ export const getCompleteForecastData = (params) => {
  */
 export const getForecastComponents = (params) => {
   return apiClient.get('/forecast_components/', { params });
-};
\ No newline at end of file
+};
+
+/**
+ * 订阅实时增量事件（Server-Sent Events）
+ * @param {string} currencyId CoinGecko ID，多个用逗号分隔；传空值则订阅所有货币
+ * @param {object} handlers e.g., { bar: (event) => {}, forecast: (event) => {} }
+ * @returns EventSource，调用其 close() 取消订阅；断线后浏览器会自动重连
+ */
+export const subscribeEvents = (currencyId, handlers) => {
+  const query = currencyId ? `?currency_id=${encodeURIComponent(currencyId)}` : '';
+  const source = new EventSource(`${apiClient.defaults.baseURL}/events/${query}`);
+  Object.entries(handlers).forEach(([type, handler]) => {
+    source.addEventListener(type, (message) => handler(JSON.parse(message.data)));
+  });
+  return source;
+};